@@ -11,6 +11,8 @@ from requests.utils import parse_dict_header
 from urllib.parse import urlparse
 import requests
 import re
+import threading
+import time
 
 from atomic_reactor.utils.retries import get_retrying_requests_session
 
@@ -26,13 +28,17 @@ class HTTPBearerAuth(AuthBase):
     password).
 
     Once Bearer token is retrieved, it will be cached and used in subsequent
-    requests. Since tokens are specific to repositories, the token cache may
-    store multiple tokens.
+    requests until it expires. Since tokens are specific to repositories, the
+    token cache may store multiple tokens.
 
     Supports registry v2 API only.
     """
     BEARER_PATTERN = re.compile(r'bearer ', flags=re.IGNORECASE)
     V2_REPO_PATTERN = re.compile(r'^/v2/(.*)/(manifests|tags|blobs)/')
+    # token lifetime when the realm does not specify expires_in, as per the distribution spec
+    DEFAULT_TOKEN_EXPIRES_IN = 60
+    # do not use tokens which expire in less than this many seconds
+    TOKEN_EXPIRATION_MARGIN = 10
 
     def __init__(self, username=None, password=None, verify=True, access=None, auth_b64=None):
         """Initialize HTTPBearerAuth object.
@@ -52,15 +58,23 @@ class HTTPBearerAuth(AuthBase):
         self.verify = verify
         self.access = access or ('pull',)
 
-        self._token_cache = {}
+        self._token_cache = {}  # repo -> (token, expiration time)
         self._retry_session = get_retrying_requests_session()   # Used when querying for token
 
+        self.tokens_fetched = 0
+        self.token_cache_hits = 0
+        self.tokens_expired = 0
+
     def __call__(self, response):
         repo = self._get_repo_from_url(response.url)
 
-        if repo in self._token_cache:
-            self._set_header(response, repo)
-            return response
+        cached = self._token_cache.get(repo)
+        if cached is not None:
+            if time.monotonic() < cached[1]:
+                self.token_cache_hits += 1
+                self._set_header(response, repo)
+                return response
+            self.tokens_expired += 1
 
         def handle_401_with_repo(response, **kwargs):
             return self.handle_401(response, repo, **kwargs)
@@ -116,10 +130,18 @@ class HTTPBearerAuth(AuthBase):
         realm_response = self._retry_session.get(realm, params=bearer_info, verify=self.verify,
                                                  auth=realm_auth)
         realm_response.raise_for_status()
-        return realm_response.json()['token']
+        self.tokens_fetched += 1
+
+        token_info = realm_response.json()
+        # access_token is the OAuth 2.0 compatible alias of token
+        token = token_info.get('token') or token_info['access_token']
+        expires_in = token_info.get('expires_in') or self.DEFAULT_TOKEN_EXPIRES_IN
+        expires_at = time.monotonic() + max(expires_in - self.TOKEN_EXPIRATION_MARGIN, 0)
+        return token, expires_at
 
     def _set_header(self, response, repo):
-        response.headers['Authorization'] = 'Bearer {}'.format(self._token_cache[repo])
+        token, _ = self._token_cache[repo]
+        response.headers['Authorization'] = 'Bearer {}'.format(token)
 
     def _get_repo_from_url(self, url):
         url_parts = urlparse(url)
@@ -167,6 +189,17 @@ class HTTPRegistryAuth(AuthBase):
         self.auth_b64 = auth_b64
 
         self.v2_auths = []
+        self._lock = threading.Lock()
+
+    @property
+    def token_stats(self):
+        """Usage of the bearer token cache"""
+        stats = {'tokens_fetched': 0, 'token_cache_hits': 0, 'tokens_expired': 0}
+        for auth in self.v2_auths:
+            if isinstance(auth, HTTPBearerAuth):
+                for key in stats:
+                    stats[key] += getattr(auth, key)
+        return stats
 
     def __call__(self, request):
         url_parts = urlparse(request.url)
@@ -181,14 +214,16 @@ class HTTPRegistryAuth(AuthBase):
             raise NotImplementedError("registry auth only implemented for %s" %
                                       self.V2_URL.pattern)
 
-        if not self.v2_auths:
-            # It's safe to always add bearer auth handler because
-            # it's only activated if indicated by www-authenticate response header
-            self.v2_auths.append(HTTPBearerAuth(self.username, self.password,
-                                                access=self.access, auth_b64=self.auth_b64))
+        # the auth may be shared by sessions used in multiple threads
+        with self._lock:
+            if not self.v2_auths:
+                # It's safe to always add bearer auth handler because
+                # it's only activated if indicated by www-authenticate response header
+                self.v2_auths.append(HTTPBearerAuth(self.username, self.password,
+                                                    access=self.access, auth_b64=self.auth_b64))
 
-            if basic_auth:
-                self.v2_auths.append(basic_auth)
+                if basic_auth:
+                    self.v2_auths.append(basic_auth)
 
         for auth in self.v2_auths:
             request = auth(request)
@@ -20,6 +20,15 @@ def remote_hosts_unlocking_recovery(job_args: dict) -> None:
 
     remote_host_pools = config.remote_hosts.get("pools")
 
+    # all the operations on a host share a single SSH connection
+    try:
+        _unlock_finished_slots(config, osbs, remote_host_pools)
+    finally:
+        logger.info("SSH connections statistics: %s", remote_host.ssh_connection_pool.stats())
+        remote_host.ssh_connection_pool.clear()
+
+
+def _unlock_finished_slots(config: Configuration, osbs, remote_host_pools: dict) -> None:
     for platform in remote_host_pools.keys():
         platform_pool = remote_host.RemoteHostsPool.from_config(config.remote_hosts, platform)
 
@@ -31,8 +40,8 @@ def remote_hosts_unlocking_recovery(job_args: dict) -> None:
             if not host.is_operational:
                 continue
 
-            for slot in range(host.slots):
-                prid = host.prid_in_slot(slot)
+            for slot, slot_data in host.read_slots().items():
+                prid = slot_data.prid
 
                 if not prid:
                     continue
@@ -10,7 +10,15 @@ from copy import deepcopy
 from typing import Optional
 
 from atomic_reactor.utils.cachito import CachitoAPI
-from atomic_reactor.constants import REACTOR_CONFIG_ENV_NAME
+from atomic_reactor.constants import (
+    REACTOR_CONFIG_ENV_NAME,
+    DEFAULT_DOWNLOAD_MAX_WORKERS,
+    DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST,
+    DEFAULT_PLUGINS_MAX_WORKERS,
+    DEFAULT_DIGEST_CACHE_TTL,
+    DEFAULT_DIGEST_CACHE_FLOATING_TAGS,
+    PLUGINS_PROFILING_OFF,
+)
 from atomic_reactor.util import (
     read_yaml,
     read_yaml_from_file_path,
@@ -78,6 +86,27 @@ def get_odcs_session(config):
     return ODCSClient(config.odcs['api_url'], **client_kwargs)
 
 
+def get_download_cache(config):
+    from atomic_reactor.download import ArtifactCache
+
+    downloads = config.downloads
+    if not downloads['cache_dir']:
+        return None
+
+    return ArtifactCache(downloads['cache_dir'], size_limit=downloads['cache_size_limit'])
+
+
+def get_digest_cache(config):
+    from atomic_reactor.utils.digest_cache import DigestCache
+
+    digest_cache = config.digest_cache
+    if not digest_cache['cache_dir']:
+        return None
+
+    return DigestCache(digest_cache['cache_dir'], ttl=digest_cache['ttl'],
+                       floating_tags=digest_cache['floating_tags'])
+
+
 def get_smtp_session(config):
     import smtplib
     return smtplib.SMTP(config.smtp['host'])
@@ -87,6 +116,7 @@ def get_cachito_session(config):
     api_kwargs = {
         'insecure': config.cachito.get('insecure', False),
         'timeout': config.cachito.get('timeout'),
+        'download_segments': config.downloads['segments'],
     }
 
     ssl_certs_dir = config.cachito['auth'].get('ssl_certs_dir')
@@ -187,6 +217,9 @@ class ReactorConfigKeys(object):
     OPERATOR_MANIFESTS_KEY = 'operator_manifests'
     IMAGE_SIZE_LIMIT_KEY = 'image_size_limit'
     BUILDER_CA_BUNDLE_KEY = 'builder_ca_bundle'
+    DOWNLOADS_KEY = 'downloads'
+    PLUGINS_RUNNER_KEY = 'plugins_runner'
+    DIGEST_CACHE_KEY = 'digest_cache'
 
 
 class ODCSConfig(object):
@@ -511,3 +544,33 @@ class Configuration(object):
     @property
     def builder_ca_bundle(self):
         return self._get_value(ReactorConfigKeys.BUILDER_CA_BUNDLE_KEY, fallback=None)
+
+    @property
+    def downloads(self):
+        config = self._get_value(ReactorConfigKeys.DOWNLOADS_KEY, fallback={})
+        return {
+            'max_workers': config.get('max_workers', DEFAULT_DOWNLOAD_MAX_WORKERS),
+            'max_connections_per_host': config.get('max_connections_per_host',
+                                                   DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST),
+            'cache_dir': config.get('cache_dir'),
+            'cache_size_limit': config.get('cache_size_limit', 0),
+            'segments': config.get('segments', 1),
+        }
+
+    @property
+    def plugins_runner(self):
+        config = self._get_value(ReactorConfigKeys.PLUGINS_RUNNER_KEY, fallback={})
+        return {
+            'max_workers': config.get('max_workers', DEFAULT_PLUGINS_MAX_WORKERS),
+            'profiling': config.get('profiling', PLUGINS_PROFILING_OFF),
+        }
+
+    @property
+    def digest_cache(self):
+        config = self._get_value(ReactorConfigKeys.DIGEST_CACHE_KEY, fallback={})
+        return {
+            'cache_dir': config.get('cache_dir'),
+            'ttl': config.get('ttl', DEFAULT_DIGEST_CACHE_TTL),
+            'floating_tags': config.get('floating_tags',
+                                        list(DEFAULT_DIGEST_CACHE_FLOATING_TAGS)),
+        }
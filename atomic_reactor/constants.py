@@ -71,6 +71,30 @@ TOOLS_USED = (
 )
 
 DEFAULT_DOWNLOAD_BLOCK_SIZE = 10 * 1024 * 1024  # 10Mb
+# how many downloaded blocks may wait to be written and hashed
+DOWNLOAD_PIPELINE_DEPTH = 4
+# how many files are downloaded concurrently by default
+DEFAULT_DOWNLOAD_MAX_WORKERS = 8
+# how many concurrent connections are opened to a single host by default
+DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST = 4
+# how many digests of operator pullspecs are looked up concurrently by default
+DEFAULT_DIGEST_PINNING_MAX_WORKERS = 8
+# how many digests are looked up concurrently in a single registry by default
+DEFAULT_DIGEST_PINNING_MAX_CONNECTIONS_PER_REGISTRY = 4
+# seconds for which cached tag -> digest resolutions are used by default
+DEFAULT_DIGEST_CACHE_TTL = 300
+# fnmatch patterns of tags which are never cached by default
+DEFAULT_DIGEST_CACHE_FLOATING_TAGS = ('latest',)
+# how many blobs are mounted or manifests pushed concurrently into a registry
+DEFAULT_REGISTRY_PUSH_MAX_WORKERS = 8
+# how many plugins of a task run concurrently by default
+DEFAULT_PLUGINS_MAX_WORKERS = 1
+# opt-in profiling of plugins
+PLUGINS_PROFILING_OFF = 'off'
+# resource usage of every plugin
+PLUGINS_PROFILING_RESOURCES = 'resources'
+# resource usage and cProfile stats of every plugin
+PLUGINS_PROFILING_CPROFILE = 'cprofile'
 
 IMAGE_TYPE_DOCKER_ARCHIVE = 'docker-archive'
 IMAGE_TYPE_OCI = 'oci'
@@ -152,9 +176,13 @@ KOJI_RESERVE_RETRY_DELAY = 2
 KOJI_MAX_RETRIES = 120
 KOJI_RETRY_INTERVAL = 60
 KOJI_OFFLINE_RETRY_INTERVAL = 120
+# maximum number of calls sent to the koji hub in a single multicall request
+KOJI_MULTICALL_BATCH_SIZE = 100
 # max retries for locking remote host slots
 REMOTE_HOST_MAX_RETRIES = 10
 REMOTE_HOST_RETRY_INTERVAL = 5
+# how many remote hosts are probed for free slots concurrently by default
+DEFAULT_REMOTE_HOST_PROBE_WORKERS = 1
 # max retries for subprocesses (see utils.retries.run_cmd())
 SUBPROCESS_MAX_RETRIES = 5
 # the factor for the exponential backoff series - 5, 10, 20, 40, 80 seconds of waiting
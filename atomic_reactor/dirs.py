@@ -6,12 +6,15 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 import logging
+import threading
 import reflink
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
 from shutil import copytree
-from typing import Dict, List, Callable, Iterable, Optional, TypeVar
+from typing import Dict, List, Callable, Iterable, Optional, Tuple, TypeVar
 
 from dockerfile_parse import DockerfileParser
 
@@ -38,6 +41,81 @@ class DockerfileNotExist(Exception):
     """Dockerfile does not exist."""
 
 
+class _PlatformLogCollector:
+    """Hold back log records emitted by actions running in worker threads.
+
+    While collecting, records emitted from a thread registered for a platform
+    are not passed to the logging handlers but kept per platform. This covers
+    the handlers of all loggers, e.g. the one added to the atomic_reactor
+    logger by set_logging(), not only those of the root logger. ``replay``
+    then passes the records to the handlers platform by platform, so the logs
+    of actions running in parallel are not interleaved and read the same on
+    every run.
+    """
+
+    class _Filter(logging.Filter):
+
+        def __init__(self, collector: "_PlatformLogCollector", handler: logging.Handler):
+            super().__init__()
+            self._collector = collector
+            self._handler = handler
+
+        def filter(self, record: logging.LogRecord) -> bool:
+            return self._collector.hold(self._handler, record)
+
+    def __init__(self) -> None:
+        self._thread_platforms: Dict[int, str] = {}
+        self._records: Dict[str, List[Tuple[logging.Handler, logging.LogRecord]]] = (
+            defaultdict(list)
+        )
+        self._filters: List[Tuple[logging.Handler, logging.Filter]] = []
+
+    @staticmethod
+    def _all_handlers() -> List[logging.Handler]:
+        loggers = [logging.getLogger()] + [
+            logger for logger in logging.Logger.manager.loggerDict.values()
+            if isinstance(logger, logging.Logger)
+        ]
+        handlers: Dict[int, logging.Handler] = {}
+        for logger in loggers:
+            for handler in logger.handlers:
+                handlers.setdefault(id(handler), handler)
+        return list(handlers.values())
+
+    def __enter__(self) -> "_PlatformLogCollector":
+        for handler in self._all_handlers():
+            log_filter = self._Filter(self, handler)
+            handler.addFilter(log_filter)
+            self._filters.append((handler, log_filter))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for handler, log_filter in self._filters:
+            handler.removeFilter(log_filter)
+        self._filters = []
+
+    def register(self, platform: str) -> None:
+        """Collect records emitted from the current thread for platform."""
+        self._thread_platforms[threading.get_ident()] = platform
+
+    def unregister(self) -> None:
+        self._thread_platforms.pop(threading.get_ident(), None)
+
+    def hold(self, handler: logging.Handler, record: logging.LogRecord) -> bool:
+        platform = self._thread_platforms.get(threading.get_ident())
+        if platform is None:
+            return True
+        self._records[platform].append((handler, record))
+        return False
+
+    def replay(self, platforms: Iterable[str]) -> None:
+        """Pass the held records to their handlers in the order of platforms."""
+        for platform in platforms:
+            for handler, record in self._records.pop(platform, []):
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
 class BuildDirIsNotInitialized(Exception):
     """Build directories are not initialized."""
 
@@ -218,7 +296,9 @@ class RootBuildDir(object):
         """Get the build directory for the specified platform."""
         return BuildDir(self.path / platform, platform)
 
-    def for_each_platform(self, action: Callable[[BuildDir], T]) -> Dict[str, T]:
+    def for_each_platform(
+        self, action: Callable[[BuildDir], T], parallel: bool = False
+    ) -> Dict[str, T]:
         """Apply an action on every platform-specific directory.
 
         The action callable will be applied to the platform-specific
@@ -231,21 +311,58 @@ class RootBuildDir(object):
         to the caller. As a result, the action will not be applied to the rest
         of the platforms.
 
+        In parallel mode, the action is applied to all platforms concurrently,
+        each in its own thread, so the action must be thread-safe. A failure
+        does not stop the actions of the other platforms, which all run to
+        completion. The error of the first failed platform, in the order of
+        platforms, is then propagated.
+        Log records emitted by the actions are held back and emitted platform
+        by platform once all actions are done.
+
         :param action: a callable object that will be applied on every
             platform-specific directory. This callable must accept one single
             argument in BuildDir type, and it can return data in any type.
         :type action: Callable
+        :param bool parallel: apply the action to the platforms concurrently.
         :return: a mapping from platform to the value returned from the
             function which is called for that platform.
         :rtype: dict[str, any]
         """
         if not self.has_sources:
             raise BuildDirIsNotInitialized()
+        if parallel and len(self.platforms) > 1:
+            return self._for_each_platform_parallel(action)
         results: Dict[str, T] = {}
         for platform in self.platforms:
             results[platform] = action(self.platform_dir(platform))
         return results
 
+    def _for_each_platform_parallel(self, action: Callable[[BuildDir], T]) -> Dict[str, T]:
+        with _PlatformLogCollector() as log_collector:
+
+            def run_action(platform: str) -> T:
+                log_collector.register(platform)
+                try:
+                    return action(self.platform_dir(platform))
+                finally:
+                    log_collector.unregister()
+
+            # one thread per platform, every action starts right away
+            with ThreadPoolExecutor(max_workers=len(self.platforms)) as executor:
+                futures = {
+                    platform: executor.submit(run_action, platform) for platform in self.platforms
+                }
+
+        log_collector.replay(self.platforms)
+
+        results: Dict[str, T] = {}
+        for platform, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                raise error
+            results[platform] = future.result()
+        return results
+
     def for_all_platforms_copy(self, action: FileCreationFunc) -> List[Path]:
         """Ensure created files are present in all platform-specific directories.
 
@@ -318,6 +435,7 @@ class ContextDir:
             path.mkdir(parents=True)
         self._path = path
         self.workflow_json = path / "workflow.json"
+        self.plugins_profile_dir = path / "plugins-profile"
 
     def get_platform_dir(self, platform: str) -> Path:
         """Get the directory specific to the specified platform.
@@ -8,14 +8,30 @@ of the BSD license. See the LICENSE file for details.
 import base64
 import hashlib
 import logging
+import math
 import os
+import queue
+import re
+import shutil
+import threading
 import time
+import uuid
+import reflink
 import requests
+from pathlib import Path
 from urllib.parse import urlparse
 
-from atomic_reactor.util import get_retrying_requests_session
+from atomic_reactor.util import (
+    _compute_file_checksums,
+    get_retrying_requests_session,
+    human_size,
+    map_concurrently,
+)
 from atomic_reactor.constants import (
     DEFAULT_DOWNLOAD_BLOCK_SIZE,
+    DOWNLOAD_PIPELINE_DEPTH,
+    DEFAULT_DOWNLOAD_MAX_WORKERS,
+    DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST,
     HTTP_BACKOFF_FACTOR,
     HTTP_MAX_RETRIES,
     CACHITO_HASH_ALG,
@@ -25,14 +41,421 @@ from atomic_reactor.constants import (
 
 logger = logging.getLogger(__name__)
 
+# checksum algorithms in the order in which they are used to look up cached files
+CACHE_ALGORITHMS_PREFERENCE = ('sha512', 'sha256', 'sha1', 'md5')
+# directory of cached files looked up by a key instead of their checksums
+CACHE_KEYED_ENTRIES_DIR = 'keys'
+# percentage of downloaded files after which the progress is logged
+DOWNLOAD_PROGRESS_PERCENT = 10
+
+
+def _clone_file(src, dest, hardlink=False):
+    """Make dest a copy of src, as cheap as the filesystem allows
+
+    Reflink is tried first, then (if allowed) a hardlink and a regular copy
+    as the last resort. Only allow a hardlink if neither file is ever
+    modified in place. An existing dest is replaced.
+    """
+    if os.path.lexists(dest):
+        os.unlink(dest)
+    try:
+        reflink.reflink(str(src), str(dest))
+        return
+    except (reflink.ReflinkImpossibleError, OSError):
+        if os.path.lexists(dest):
+            os.unlink(dest)
+    if hardlink:
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dest)
+
+
+class ArtifactCache(object):
+    """
+    Content-addressed cache of downloaded files, shared by builds on a node
+
+    Every file is stored as <path>/<algorithm>/<checksum> for each checksum
+    it was downloaded with, so it can be found by any of them later. Entries
+    are verified before they are used, and once the cache grows over
+    size_limit bytes, the least recently used files are evicted.
+
+    Files whose checksums are not known in advance, but which never change
+    for the same key (e.g. the URL of a signed SRPM in Koji), can be stored
+    under <path>/keys/<sha256 of the key> as well. Such entries cannot be
+    verified, unless they are looked up together with checksums.
+    """
+
+    def __init__(self, path, size_limit=0):
+        """
+        :param path: str, directory holding the cache, created if missing
+        :param size_limit: int, maximum size of the cache in bytes, 0 for unlimited
+        """
+        self.path = Path(path)
+        self.size_limit = size_limit
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._size = sum(size for _, size, _ in self._entries()) if size_limit else 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved}
+
+    def _keys(self, checksums, key=None):
+        """Yield (algorithm, checksum) pairs usable as cache keys, strongest first"""
+        def preference(algorithm):
+            if algorithm in CACHE_ALGORITHMS_PREFERENCE:
+                return CACHE_ALGORITHMS_PREFERENCE.index(algorithm)
+            return len(CACHE_ALGORITHMS_PREFERENCE)
+
+        for algorithm in sorted(checksums, key=preference):
+            checksum = checksums[algorithm].lower()
+            if algorithm not in hashlib.algorithms_available:
+                continue
+            if not re.fullmatch(r'[0-9a-f]+', checksum):
+                continue
+            yield algorithm, checksum
+        if key is not None:
+            yield CACHE_KEYED_ENTRIES_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _entries(self):
+        """Group cached files by inode
+
+        :return: list of [mtime, size, paths] lists
+        """
+        inodes = {}
+        for algorithm_dir in self.path.iterdir():
+            if not algorithm_dir.is_dir():
+                continue
+            for entry in algorithm_dir.iterdir():
+                # temporary files of entries being added
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # evicted by another build meanwhile
+                    continue
+                item = inodes.setdefault((stat.st_dev, stat.st_ino),
+                                         [stat.st_mtime, stat.st_size, []])
+                item[2].append(entry)
+        return list(inodes.values())
+
+    def _verify(self, path, checksums):
+        if not checksums:
+            return True
+        hashers = {algorithm: hashlib.new(algorithm) for algorithm in checksums}
+        _compute_file_checksums(str(path), list(hashers.values()))
+        return all(hasher.hexdigest() == checksums[algorithm].lower()
+                   for algorithm, hasher in hashers.items())
+
+    def fetch(self, checksums, dest_path, key=None):
+        """Create dest_path from a cached file with the given checksums or key
+
+        :param checksums: dict, checksum_type and checksum of the file
+        :param dest_path: str, path where to create the file
+        :param key: str, optional key the file was stored under
+        :return: bool, whether the file was found in the cache
+        """
+        for algorithm, checksum in self._keys(checksums, key):
+            cached = self.path / algorithm / checksum
+            try:
+                if not self._verify(cached, checksums):
+                    logger.warning('removing corrupted file %s from download cache', cached)
+                    cached.unlink()
+                    continue
+                # the modification time is used for LRU eviction
+                os.utime(cached)
+                size = cached.stat().st_size
+                # never hardlink, dest_path may be modified in place later
+                _clone_file(cached, dest_path)
+            except FileNotFoundError:
+                continue
+
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += size
+            return True
+
+        with self._lock:
+            self.misses += 1
+        return False
+
+    def store(self, src_path, checksums, key=None):
+        """Add a file to the cache under all its checksums and key
+
+        Entries are written under a temporary name and renamed, so other
+        builds never see a partially written file.
+
+        :param src_path: str, path of the downloaded file
+        :param checksums: dict, verified checksum_type and checksum of the file
+        :param key: str, optional key identifying content which never changes
+        """
+        keys = list(self._keys(checksums, key))
+        if not keys:
+            return
+        size = os.path.getsize(src_path)
+        if self.size_limit and size > self.size_limit:
+            logger.debug('%s is larger than the download cache, not caching it', src_path)
+            return
+
+        stored = None
+        for algorithm, checksum in keys:
+            entry = self.path / algorithm / checksum
+            entry.parent.mkdir(exist_ok=True)
+            tmp_entry = entry.parent / '.{}.{}'.format(checksum, uuid.uuid4().hex)
+            if stored is None:
+                # do not hardlink the source, it may be modified later
+                _clone_file(src_path, tmp_entry)
+            else:
+                _clone_file(stored, tmp_entry, hardlink=True)
+            os.replace(tmp_entry, entry)
+            stored = entry
+
+        with self._lock:
+            self._size += size
+            if self.size_limit and self._size > self.size_limit:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, paths in entries:
+            if total_size <= self.size_limit:
+                break
+            for path in paths:
+                logger.debug('evicting %s from download cache', path)
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total_size -= size
+        self._size = total_size
+
+
+def _content_range_start(response):
+    """Return the first byte position of a partial response, None if unknown"""
+    match = re.match(r'bytes (\d+)-', response.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+class _HashingWriter(object):
+    """
+    Write chunks to a file and update hashers in a separate thread
+
+    Both file writes and hashlib release the GIL for large buffers, so the
+    caller can read the next chunk from the network while the previous one
+    is being written and hashed. At most queue_size chunks are buffered.
+    """
+
+    def __init__(self, f, hashers, queue_size=DOWNLOAD_PIPELINE_DEPTH):
+        self.written = 0
+        self._f = f
+        self._hashers = list(hashers.values())
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            # keep draining the queue after a failure, so that write() does not block
+            if self._error is not None:
+                continue
+            try:
+                self._f.write(chunk)
+                for hasher in self._hashers:
+                    hasher.update(chunk)
+                self.written += len(chunk)
+            except Exception as exc:
+                self._error = exc
+
+    def write(self, chunk):
+        if self._error is not None:
+            raise self._error
+        # memoryview hands the chunk over without copying it
+        self._queue.put(memoryview(chunk))
+
+    def close(self):
+        """Wait until all queued chunks are processed, re-raise a write failure"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def _stream_to_file(url, dest_path, session, insecure, hashers):
+    """Download url to dest_path, resuming interrupted transfers
+
+    Chunks are written and hashed by a _HashingWriter while the next ones
+    are read from the network. When a transfer fails and the server supports
+    byte ranges, the next attempt requests only the remaining part of the
+    file and keeps updating hashers from where they stopped. Otherwise the
+    file is downloaded again from the beginning.
+
+    :return: response headers of the last request
+    """
+    written = 0
+    resumable = False
+    validator = None
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        headers = {}
+        if written and resumable:
+            headers['Range'] = 'bytes={}-'.format(written)
+            if validator:
+                headers['If-Range'] = validator
+
+        response = session.get(url, stream=True, verify=not insecure, headers=headers)
+        if headers and (
+            response.status_code == requests.codes.requested_range_not_satisfiable or
+            (response.status_code == requests.codes.partial_content and
+             _content_range_start(response) != written)
+        ):
+            logger.info('server refused to resume download of %s, starting over', url)
+            resumable = False
+            written = 0
+            response = session.get(url, stream=True, verify=not insecure)
+        response.raise_for_status()
+
+        try:
+            if written and response.status_code == requests.codes.partial_content:
+                logger.info('resuming download of %s at byte %d', url, written)
+                # drop anything written but not hashed before the failure
+                os.truncate(dest_path, written)
+                mode = 'ab'
+            else:
+                if response.status_code == requests.codes.partial_content:
+                    raise RuntimeError(
+                        '{} returned a part of the file when the whole file was requested'
+                        .format(url))
+                written = 0
+                for algo in hashers:
+                    hashers[algo] = hashlib.new(algo)
+                # ranges of encoded content do not match the decoded chunks
+                resumable = (response.headers.get('Accept-Ranges') == 'bytes' and
+                             'Content-Encoding' not in response.headers)
+                validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                mode = 'wb'
+
+            with open(dest_path, mode) as f:
+                writer = _HashingWriter(f, hashers)
+                try:
+                    for chunk in response.iter_content(chunk_size=DEFAULT_DOWNLOAD_BLOCK_SIZE):
+                        writer.write(chunk)
+                finally:
+                    try:
+                        writer.close()
+                    finally:
+                        written += writer.written
+
+            return response.headers
+        except requests.exceptions.RequestException:
+            if attempt < HTTP_MAX_RETRIES:
+                time.sleep(HTTP_BACKOFF_FACTOR * (2 ** attempt))
+            else:
+                raise
+
+
+class _SegmentMismatchError(Exception):
+    """A segment response does not belong to the file described by the HEAD response"""
+
+
+def _download_segments(url, dest_path, session, insecure, segments, require_digest=False):
+    """Download url in several byte ranges in parallel
+
+    Every segment is written directly to its offset in dest_path and
+    resumed on its own when its transfer fails. When a segment response
+    does not match the HEAD response (the server ignores the range or the
+    file changed), the segments are discarded and None is returned, so that
+    the file is downloaded as a whole.
+
+    :param require_digest: bool, download in segments only if the HEAD
+                           response has a Digest header to verify the file by
+    :return: response headers of the HEAD request, None if the server
+             does not support byte ranges, the file is too small to split,
+             a required Digest header is missing or a segment does not match
+    """
+    response = session.head(url, verify=not insecure, allow_redirects=True)
+    response.raise_for_status()
+    size = int(response.headers.get('Content-Length', 0))
+    if (response.headers.get('Accept-Ranges') != 'bytes' or
+            'Content-Encoding' in response.headers):
+        logger.debug('%s does not support byte ranges, downloading as a whole', url)
+        return None
+    if require_digest and 'Digest' not in response.headers:
+        logger.debug('HEAD response of %s has no digest, downloading as a whole', url)
+        return None
+    segment_size = max(math.ceil(size / segments), DEFAULT_DOWNLOAD_BLOCK_SIZE)
+    if size <= segment_size:
+        return None
+
+    validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+    with open(dest_path, 'wb') as f:
+        f.truncate(size)
+
+    def download_segment(start):
+        end = min(start + segment_size, size) - 1
+        offset = start
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            headers = {'Range': 'bytes={}-{}'.format(offset, end)}
+            if validator:
+                headers['If-Range'] = validator
+            segment = session.get(url, stream=True, verify=not insecure, headers=headers)
+            segment.raise_for_status()
+            if (segment.status_code != requests.codes.partial_content or
+                    _content_range_start(segment) != offset):
+                raise _SegmentMismatchError(
+                    'response to range {}-{} of {} does not match its HEAD response'
+                    .format(offset, end, url))
+            try:
+                with open(dest_path, 'r+b') as f:
+                    f.seek(offset)
+                    for chunk in segment.iter_content(chunk_size=DEFAULT_DOWNLOAD_BLOCK_SIZE):
+                        f.write(chunk)
+                        offset += len(chunk)
+                if offset <= end:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        'segment {}-{} of {} ended at {}'.format(start, end, url, offset))
+                return
+            except requests.exceptions.RequestException:
+                if attempt < HTTP_MAX_RETRIES:
+                    time.sleep(HTTP_BACKOFF_FACTOR * (2 ** attempt))
+                else:
+                    raise
+
+    logger.debug('downloading %s in %d segments', url, math.ceil(size / segment_size))
+    try:
+        list(map_concurrently(download_segment, range(0, size, segment_size), segments))
+    except _SegmentMismatchError as ex:
+        logger.info('%s, downloading as a whole', ex)
+        os.unlink(dest_path)
+        return None
+
+    return response.headers
+
 
 def download_url(url, dest_dir, insecure=False, session=None, dest_filename=None,
-                 expected_checksums=None, verify_cachito_digest=False):
+                 expected_checksums=None, verify_cachito_digest=False, cache=None,
+                 segments=1, cache_key=None):
     """Download file from URL, handling retries
 
     To download to a temporary directory, use:
       f = download_url(url, tempfile.mkdtemp())
 
+    Interrupted transfers are resumed with HTTP range requests when the
+    server supports them.
+
     :param url: URL to download from
     :param dest_dir: existing directory to create file in
     :param insecure: bool, whether to perform TLS checks
@@ -41,6 +464,11 @@ def download_url(url, dest_dir, insecure=False, session=None, dest_filename=None
     :param expected_checksums: optional dictionary of checksum_type and
                                checksum to verify downloaded files
     :param verify_cachito_digest: bool, verify sha digest for cachito archive
+    :param cache: optional ArtifactCache to look up the file in by expected_checksums
+    :param segments: int, download large files in this many byte ranges in
+                     parallel if the server advertises Accept-Ranges
+    :param cache_key: optional str to look up the file in cache by, it must
+                      identify content which never changes, e.g. an immutable URL
     :return: str, path of downloaded file
     """
 
@@ -53,50 +481,114 @@ def download_url(url, dest_dir, insecure=False, session=None, dest_filename=None
     if not dest_filename:
         dest_filename = os.path.basename(parsed_url.path)
     dest_path = os.path.join(dest_dir, dest_filename)
+
+    use_cache = cache is not None and (expected_checksums or cache_key is not None)
+    if use_cache:
+        if cache.fetch(expected_checksums, dest_path, key=cache_key):
+            logger.debug('%s found in download cache', url)
+            return dest_path
+
     logger.debug('downloading %s', url)
 
-    checksums = {algo: hashlib.new(algo) for algo in expected_checksums}
-    cachito_hasher = hashlib.new(CACHITO_HASH_ALG)
+    hashers = {algo: hashlib.new(algo) for algo in expected_checksums}
+    if verify_cachito_digest:
+        hashers[CACHITO_HASH_ALG] = hashlib.new(CACHITO_HASH_ALG)
 
-    for attempt in range(HTTP_MAX_RETRIES + 1):
-        response = session.get(url, stream=True, verify=not insecure)
-        response.raise_for_status()
-        try:
-            with open(dest_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=DEFAULT_DOWNLOAD_BLOCK_SIZE):
-                    f.write(chunk)
-                    for checksum in checksums.values():
-                        checksum.update(chunk)
-
-                    if verify_cachito_digest:
-                        cachito_hasher.update(chunk)
-
-            for algo, checksum in checksums.items():
-                if checksum.hexdigest() != expected_checksums[algo]:
-                    raise ValueError(
-                        'Computed {} checksum, {}, does not match expected checksum, {}'
-                        .format(algo, checksum.hexdigest(), expected_checksums[algo]))
-
-            if verify_cachito_digest:
-                logger.info('will verify cachito digest')
-                if 'Digest' in response.headers:
-                    logger.info('digest is in cachito response header')
-
-                    digest = base64.b64encode(cachito_hasher.digest()).decode("utf-8")
-                    digest_str = f'{CACHITO_ALG_STR}={digest}'
-                    if digest_str != response.headers['Digest']:
-                        raise ValueError(
-                            'Cachito archive digest "{}" does not match expected digest "{}"'
-                            .format(digest_str, response.headers['Digest']))
-                    else:
-                        logger.info('digest for cachito archive is correct')
-
-            break
-        except requests.exceptions.RequestException:
-            if attempt < HTTP_MAX_RETRIES:
-                time.sleep(HTTP_BACKOFF_FACTOR * (2 ** attempt))
+    headers = None
+    if segments > 1:
+        headers = _download_segments(url, dest_path, session, insecure, segments,
+                                     require_digest=verify_cachito_digest)
+    if headers is not None:
+        # segments arrive out of order, hash the complete file
+        _compute_file_checksums(dest_path, list(hashers.values()))
+    else:
+        headers = _stream_to_file(url, dest_path, session, insecure, hashers)
+
+    for algo, expected in expected_checksums.items():
+        if hashers[algo].hexdigest() != expected:
+            raise ValueError(
+                'Computed {} checksum, {}, does not match expected checksum, {}'
+                .format(algo, hashers[algo].hexdigest(), expected))
+
+    if verify_cachito_digest:
+        logger.info('will verify cachito digest')
+        if 'Digest' in headers:
+            logger.info('digest is in cachito response header')
+
+            digest = base64.b64encode(hashers[CACHITO_HASH_ALG].digest()).decode("utf-8")
+            digest_str = f'{CACHITO_ALG_STR}={digest}'
+            if digest_str != headers['Digest']:
+                raise ValueError(
+                    'Cachito archive digest "{}" does not match expected digest "{}"'
+                    .format(digest_str, headers['Digest']))
             else:
-                raise
+                logger.info('digest for cachito archive is correct')
+
+    if use_cache:
+        cache.store(dest_path, expected_checksums, key=cache_key)
 
     logger.debug('download finished: %s', dest_path)
     return dest_path
+
+
+def download_urls(downloads, insecure=False, session=None,
+                  max_workers=DEFAULT_DOWNLOAD_MAX_WORKERS,
+                  max_connections_per_host=DEFAULT_DOWNLOAD_MAX_CONNECTIONS_PER_HOST,
+                  cache=None):
+    """Download files from multiple URLs concurrently
+
+    Every file is downloaded by download_url(), so checksum verification and
+    retries behave the same as for a single download. The first failure
+    (e.g. a checksum mismatch) cancels all downloads which have not started
+    yet and is re-raised once the running ones are finished.
+
+    :param downloads: list of dicts with keyword arguments for download_url(),
+                      every dict requires url and dest_dir and may contain
+                      dest_filename, expected_checksums and cache_key
+    :param insecure: bool, whether to perform TLS checks
+    :param session: optional existing requests session to use
+    :param max_workers: int, maximum number of files downloaded at once
+    :param max_connections_per_host: int, maximum number of files downloaded
+                                     at once from the same host
+    :param cache: optional ArtifactCache to look up the files in
+    :return: list of str, paths of downloaded files in the order of downloads
+    """
+    downloads = list(downloads)
+    if not downloads:
+        return []
+    if session is None:
+        session = get_retrying_requests_session()
+
+    def download_one(indexed_download):
+        index, download = indexed_download
+        logger.debug('%d/%d downloading %s', index + 1, len(downloads), download['url'])
+        return download_url(insecure=insecure, session=session, cache=cache, **download)
+
+    start = time.monotonic()
+    dest_paths = [None] * len(downloads)
+    progress_step = max(len(downloads) * DOWNLOAD_PROGRESS_PERCENT // 100, 1)
+    downloaded = 0
+    downloaded_size = 0
+
+    results = map_concurrently(
+        download_one, enumerate(downloads), max_workers,
+        limit_key=lambda indexed_download: urlparse(indexed_download[1]['url']).netloc,
+        max_per_key=max_connections_per_host,
+    )
+    for index, dest_path in results:
+        dest_paths[index] = dest_path
+        downloaded += 1
+        downloaded_size += os.path.getsize(dest_path)
+        if downloaded % progress_step == 0 or downloaded == len(downloads):
+            logger.info('downloaded %d/%d files, %s in %.2f s',
+                        downloaded, len(downloads), human_size(downloaded_size),
+                        time.monotonic() - start)
+
+    elapsed = time.monotonic() - start
+    throughput = downloaded_size / elapsed if elapsed else downloaded_size
+    logger.info('downloaded %d files, %s in %.2f s (%s/s)',
+                len(dest_paths), human_size(downloaded_size), elapsed, human_size(throughput))
+    if cache is not None:
+        logger.info('download cache statistics: %s', cache.stats)
+
+    return dest_paths
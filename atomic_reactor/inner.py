@@ -323,6 +323,18 @@ class ImageBuildWorkflowData(ISerializer):
     # ]
     koji_upload_files: List[Dict[str, str]] = field(default_factory=list)
 
+    # Service name -> statistics of polling the service for completed requests,
+    # see atomic_reactor.utils.polling.PollingStats. E.g.
+    # {"odcs": {"polls": 12, "wait_time": 25.5, "wasted_wait_time": 4.2,
+    #           "latency_histogram": {"1": 0, "5": 1, ..., "+Inf": 0}}}
+    polling_stats: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    # Plugin name -> statistics of looking up image digests in the digest cache,
+    # see atomic_reactor.utils.digest_cache.DigestCache. E.g.
+    # {"check_base_image": {"hits": 2, "misses": 1, "expired": 0, "bypassed": 1,
+    #                       "hit_ratio": 0.667}}
+    digest_cache_stats: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
     @classmethod
     def load(cls, data: Dict[str, Any]):
         """Load workflow data from given input."""
@@ -652,7 +664,9 @@ class DockerBuildWorkflow(object):
                                    self.plugins_conf,
                                    self.plugin_files,
                                    self.keep_plugins_running,
-                                   plugins_results=self.data.plugins_results)
+                                   plugins_results=self.data.plugins_results,
+                                   max_workers=self.conf.plugins_runner['max_workers'],
+                                   profiling=self.conf.plugins_runner['profiling'])
             runner.run()
         finally:
             self.fs_watcher.finish()
@@ -19,12 +19,17 @@ import imp  # pylint: disable=deprecated-module
 import inspect
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Generator, TYPE_CHECKING, List, Optional
+from typing import (
+    AbstractSet, Any, Dict, FrozenSet, Generator, TYPE_CHECKING, List, Optional, Set, Tuple
+)
 
+from atomic_reactor.constants import PLUGINS_PROFILING_OFF
 from atomic_reactor.util import exception_message
+from atomic_reactor.utils.profiling import PluginsProfiler
 
 if TYPE_CHECKING:
     from atomic_reactor.inner import DockerBuildWorkflow
@@ -55,6 +60,19 @@ class Plugin(ABC):
     # by default, if plugin fails (raises exc), execution continues
     is_allowed_to_fail = True
 
+    # Workflow data the plugin reads and writes, PluginsRunner runs plugins
+    # which do not depend on each other concurrently. The names are:
+    #   - workflow.data field names, optionally narrowed down by a dot,
+    #     e.g. "buildargs" or "polling_stats.odcs"
+    #   - "plugins_results.<plugin key>" for the results of other plugins,
+    #     the result of the plugin itself is always written
+    #   - "build_dir.<name>" for files in the build directories,
+    #     e.g. "build_dir.dockerfile"
+    # None means the data are not known, such plugin is never run concurrently
+    # with any other plugin.
+    reads: Optional[FrozenSet[str]] = None
+    writes: Optional[FrozenSet[str]] = None
+
     def __init__(self, workflow: "DockerBuildWorkflow", *args, **kwargs):
         """
         constructor
@@ -143,6 +161,8 @@ class PluginsRunner(object):
             plugin_files: Optional[List[str]] = None,
             keep_going: bool = False,
             plugins_results: Optional[Dict[str, Any]] = None,
+            max_workers: int = 1,
+            profiling: str = PLUGINS_PROFILING_OFF,
     ) -> None:
         """constructor
 
@@ -153,6 +173,10 @@ class PluginsRunner(object):
         :type plugin_files: list[str]
         :param bool keep_going: keep running next plugin even if error is
             raised from previous plugin.
+        :param int max_workers: maximum number of plugins running concurrently,
+            plugins are run one by one in the configured order by default.
+        :param str profiling: PLUGINS_PROFILING_RESOURCES or PLUGINS_PROFILING_CPROFILE
+            to save the profile of every plugin into the context directory.
         """
         self.workflow = workflow
         self.plugins_results = {} if plugins_results is None else plugins_results
@@ -161,6 +185,9 @@ class PluginsRunner(object):
         self.plugin_classes = self.load_plugins()
         self.available_plugins = self.get_available_plugins()
         self.keep_going = keep_going
+        self.max_workers = max_workers
+        self.profiling = profiling
+        self._profiler = None
 
     def load_plugins(self) -> Dict[str, Plugin]:
         """
@@ -320,7 +347,11 @@ class PluginsRunner(object):
         plugin_key = exec_info.plugin_class.key
         self.save_plugin_timestamp(plugin_key, start_time)
         try:
-            yield
+            if self._profiler:
+                with self._profiler.profile(plugin_key):
+                    yield
+            else:
+                yield
         finally:
             try:
                 finish_time = datetime.now()
@@ -331,33 +362,143 @@ class PluginsRunner(object):
             except Exception:
                 logger.exception("failed to save plugin duration")
 
+    def _run_plugin(self, plugin: PluginExecutionInfo) -> Optional[str]:
+        """Run a single plugin and store its result.
+
+        :return: the error message if the plugin is not allowed to fail, but
+            failed and the runner keeps going, None otherwise.
+        :raises PluginFailedException: if the plugin is not allowed to fail,
+            failed and the runner does not keep going.
+        """
+        plugin_key = plugin.plugin_class.key
+        try:
+            plugin_instance = self.create_instance_from_plugin(
+                plugin.plugin_class, plugin.conf
+            )
+            with self._execution_timer(plugin):
+                self.plugins_results[plugin_key] = plugin_instance.run()
+        except Exception as ex:
+            logger.debug(traceback.format_exc())
+
+            if not plugin.is_allowed_to_fail:
+                self.on_plugin_failed(plugin.plugin_class.key, ex)
+
+            msg = f"plugin '{plugin_key}' raised an exception: {exception_message(ex)}"
+            if plugin.is_allowed_to_fail or self.keep_going:
+                logger.warning(msg)
+                logger.info("error is not fatal, continuing...")
+                if not plugin.is_allowed_to_fail:
+                    return msg
+            else:
+                logger.error(msg)
+                raise PluginFailedException(msg) from ex
+        return None
+
+    @staticmethod
+    def _data_access(
+        plugin: PluginExecutionInfo,
+    ) -> Optional[Tuple[FrozenSet[str], FrozenSet[str]]]:
+        plugin_class = plugin.plugin_class
+        if plugin_class.reads is None or plugin_class.writes is None:
+            return None
+        return plugin_class.reads, plugin_class.writes | {f'plugins_results.{plugin_class.key}'}
+
+    @staticmethod
+    def _overlap(names: AbstractSet[str], other_names: AbstractSet[str]) -> bool:
+        """Check if any data in names is the same as, or part of, data in other_names."""
+        return any(
+            name == other or name.startswith(other + '.') or other.startswith(name + '.')
+            for name in names for other in other_names
+        )
+
+    def _depends_on(self, plugin: PluginExecutionInfo, previous: PluginExecutionInfo) -> bool:
+        """Check if plugin must wait for a plugin configured before it."""
+        access = self._data_access(plugin)
+        previous_access = self._data_access(previous)
+        if access is None or previous_access is None:
+            return True
+        reads, writes = access
+        previous_reads, previous_writes = previous_access
+        return (self._overlap(previous_writes, reads | writes) or
+                self._overlap(previous_reads, writes))
+
+    def get_dependencies(self) -> List[Set[int]]:
+        """Get the plugins every plugin must wait for.
+
+        :return: for every available plugin, the indexes of the available
+            plugins which must be finished before the plugin is started.
+        :rtype: list[set[int]]
+        """
+        plugins = self.available_plugins
+        return [
+            {index for index in range(position) if self._depends_on(plugin, plugins[index])}
+            for position, plugin in enumerate(plugins)
+        ]
+
+    def _run_concurrently(self) -> List[str]:
+        """Run plugins concurrently, respecting the data they read and write.
+
+        A plugin is started as soon as all plugins it depends on are finished,
+        plugins configured earlier are started first. When a plugin which is not
+        allowed to fail fails, no more plugins are started and the error of the
+        first such plugin, in the configured order, is raised after the running
+        plugins finish.
+        """
+        plugins = self.available_plugins
+        dependencies = self.get_dependencies()
+        pending = list(range(len(plugins)))
+        finished: Set[int] = set()
+        running: Dict[Future, int] = {}
+        failed_msgs: Dict[int, str] = {}
+        fatal_errors: Dict[int, PluginFailedException] = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                if not fatal_errors:
+                    for index in list(pending):
+                        if len(running) >= self.max_workers:
+                            break
+                        if dependencies[index] <= finished:
+                            pending.remove(index)
+                            running[executor.submit(self._run_plugin, plugins[index])] = index
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    finished.add(index)
+                    try:
+                        msg = future.result()
+                    except PluginFailedException as ex:
+                        fatal_errors[index] = ex
+                    else:
+                        if msg:
+                            failed_msgs[index] = msg
+        finally:
+            # when interrupted, do not return while plugins still run in the background
+            #   and change the workflow data, wait for the running ones to finish
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        if fatal_errors:
+            raise fatal_errors[min(fatal_errors)]
+        return [failed_msgs[index] for index in sorted(failed_msgs)]
+
     def run(self):
         """Run all requested plugins."""
         failed_msgs: List[str] = []
-        available_plugins = self.available_plugins
-        for plugin in available_plugins:
-            plugin_key = plugin.plugin_class.key
-            try:
-                plugin_instance = self.create_instance_from_plugin(
-                    plugin.plugin_class, plugin.conf
-                )
-                with self._execution_timer(plugin):
-                    self.plugins_results[plugin_key] = plugin_instance.run()
-            except Exception as ex:
-                logger.debug(traceback.format_exc())
-
-                if not plugin.is_allowed_to_fail:
-                    self.on_plugin_failed(plugin.plugin_class.key, ex)
-
-                msg = f"plugin '{plugin_key}' raised an exception: {exception_message(ex)}"
-                if plugin.is_allowed_to_fail or self.keep_going:
-                    logger.warning(msg)
-                    logger.info("error is not fatal, continuing...")
-                    if not plugin.is_allowed_to_fail:
-                        failed_msgs.append(msg)
-                else:
-                    logger.error(msg)
-                    raise PluginFailedException(msg) from ex
+        if self.profiling != PLUGINS_PROFILING_OFF:
+            self._profiler = PluginsProfiler(self.profiling,
+                                             self.workflow.context_dir.plugins_profile_dir)
+        if self.max_workers > 1:
+            failed_msgs = self._run_concurrently()
+        else:
+            for plugin in self.available_plugins:
+                msg = self._run_plugin(plugin)
+                if msg:
+                    failed_msgs.append(msg)
 
         if len(failed_msgs) == 1:
             raise PluginFailedException(failed_msgs[0])
@@ -18,6 +18,8 @@ from atomic_reactor.util import label_to_string, is_flatpak_build
 class AddFlatpakLabelsPlugin(Plugin):
     key = "add_flatpak_labels"
     is_allowed_to_fail = False
+    reads = frozenset({'build_dir.dockerfile'})
+    writes = frozenset({'build_dir.dockerfile'})
 
     def __init__(self, workflow):
         """
@@ -36,6 +36,8 @@ DEFAULT_HELP_FILENAME = "help.md"
 @annotation_map('help_file')
 class AddHelpPlugin(Plugin):
     key = "add_help"
+    reads = frozenset({'dockerfile_images', 'build_dir.dockerfile'})
+    writes = frozenset({'build_dir.dockerfile', 'build_dir.help_file'})
     man_filename = "help.1"
 
     NO_HELP_FILE_FOUND = 1
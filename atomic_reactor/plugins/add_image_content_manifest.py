@@ -199,7 +199,11 @@ class AddImageContentManifestPlugin(Plugin):
 
     def run(self):
         """Run the plugin."""
-        self.workflow.build_dir.for_each_platform(self.inject_icm)
+        # the base ICM and the file name are shared by all platforms, create them only once,
+        #   before the platforms are processed concurrently
+        self._icm_base  # pylint: disable=pointless-statement
+        self.icm_file_name  # pylint: disable=pointless-statement
+        self.workflow.build_dir.for_each_platform(self.inject_icm, parallel=True)
 
     @property
     def cachito_session(self):
@@ -55,19 +55,25 @@ to set value for the missing ones.
 """
 
 import json
-from typing import Dict
+from datetime import datetime
+from typing import Dict, Optional
 
 from osbs.utils import Labels
 
 from atomic_reactor.constants import INSPECT_CONFIG
 from atomic_reactor.dirs import BuildDir
 from atomic_reactor.plugin import Plugin
-from atomic_reactor.util import get_pipeline_run_start_time, label_to_string, LabelFormatter
+from atomic_reactor.source import VcsInfo
+from atomic_reactor.types import ImageInspectionData
+from atomic_reactor.util import (get_pipeline_run_start_time, label_to_string, LabelFormatter,
+                                 map_concurrently)
 
 
 class AddLabelsPlugin(Plugin):
     key = "add_labels_in_dockerfile"
     is_allowed_to_fail = False
+    reads = frozenset({'dockerfile_images', 'build_dir.dockerfile'})
+    writes = frozenset({'build_dir.dockerfile'})
 
     @staticmethod
     def args_from_user_params(user_params: dict) -> dict:
@@ -130,14 +136,11 @@ class AddLabelsPlugin(Plugin):
         if not isinstance(self.equal_labels, list):
             raise RuntimeError("equal_labels have to be list")
 
-    def generate_auto_labels(self, platform: str) -> Dict[str, str]:
-        start_time = get_pipeline_run_start_time(self.workflow.osbs,
-                                                 self.workflow.pipeline_run_name)
-
+    def generate_auto_labels(self, platform: str, start_time: datetime,
+                             vcs: Optional[VcsInfo]) -> Dict[str, str]:
         generated = {'build-date': start_time.isoformat(), 'architecture': platform}
 
         # VCS info
-        vcs = self.workflow.source.get_vcs_info()
         if vcs:
             generated['vcs-type'] = vcs.vcs_type
             generated['vcs-url'] = vcs.vcs_url
@@ -250,11 +253,11 @@ class AddLabelsPlugin(Plugin):
                 self.log.warning("environment release variable %s could not be set because no "
                                  "release label found", release_env_var)
 
-    def add_labels_to_df(self, build_dir: BuildDir) -> None:
+    def add_labels_to_df(self, build_dir: BuildDir, base_image_inspect: ImageInspectionData,
+                         start_time: datetime, vcs: Optional[VcsInfo]) -> None:
         """Add labels to a platform-specific Dockerfile."""
         base_image_labels: Dict[str, str]
 
-        base_image_inspect = self.workflow.imageutil.base_image_inspect(build_dir.platform)
         dockerfile = build_dir.dockerfile_with_parent_env(base_image_inspect)
 
         df_images = self.workflow.data.dockerfile_images
@@ -272,7 +275,7 @@ class AddLabelsPlugin(Plugin):
 
         add_labels = self.labels.copy()
 
-        generated_labels = self.generate_auto_labels(build_dir.platform)
+        generated_labels = self.generate_auto_labels(build_dir.platform, start_time, vcs)
         add_labels.update(generated_labels)
 
         # changing dockerfile.labels writes out modified Dockerfile - err on
@@ -316,4 +319,17 @@ class AddLabelsPlugin(Plugin):
 
     def run(self):
         """Run the plugin."""
-        self.workflow.build_dir.for_each_platform(self.add_labels_to_df)
+        # the platforms are processed concurrently, query everything they need beforehand
+        start_time = get_pipeline_run_start_time(self.workflow.osbs,
+                                                 self.workflow.pipeline_run_name)
+        vcs = self.workflow.source.get_vcs_info()
+        platforms = self.workflow.build_dir.platforms
+        inspects = map_concurrently(self.workflow.imageutil.base_image_inspect,
+                                    platforms, len(platforms))
+        base_image_inspects = {platforms[index]: inspect for index, inspect in inspects}
+
+        def add_labels_to_df(build_dir: BuildDir) -> None:
+            self.add_labels_to_df(build_dir, base_image_inspects[build_dir.platform],
+                                  start_time, vcs)
+
+        self.workflow.build_dir.for_each_platform(add_labels_to_df, parallel=True)
@@ -47,9 +47,21 @@ class SourceContainerPlugin(Plugin):
         return get_exported_image_metadata(str(output_path), IMAGE_TYPE_DOCKER_ARCHIVE)
 
     def split_remote_sources_to_subdirs(self, remote_source_data_dir) -> List[str]:
-        """Splits remote source archives to subdirs"""
+        """Splits remote source archives to subdirs
+
+        Subdirectories which already exist, e.g. because fetch_sources downloaded
+        the archives into them, are used as they are.
+        """
         sources_subdirs = []
-        for count, archive in enumerate(os.listdir(remote_source_data_dir)):
+        archives = []
+        for entry in os.listdir(remote_source_data_dir):
+            path = os.path.join(remote_source_data_dir, entry)
+            if os.path.isdir(path):
+                sources_subdirs.append(path)
+            else:
+                archives.append(entry)
+
+        for count, archive in enumerate(archives, start=len(sources_subdirs)):
             subdir = os.path.join(remote_source_data_dir, f"remote_source_{count}")
             if not os.path.exists(subdir):
                 os.makedirs(subdir)
@@ -29,6 +29,10 @@ class BumpReleasePlugin(Plugin):
 
     key = PLUGIN_BUMP_RELEASE_KEY
     is_allowed_to_fail = False  # We really want to stop the process
+    reads = frozenset({'dockerfile_images', 'plugins_results.fetch_sources',
+                       'build_dir.dockerfile'})
+    writes = frozenset({'build_dir.dockerfile', 'koji_source_nvr', 'koji_source_source_url',
+                        'reserved_build_id', 'reserved_token'})
 
     @staticmethod
     def args_from_user_params(user_params: dict) -> dict:
@@ -11,18 +11,23 @@ the specified registry. It also validates platforms in the parent images and sto
 their manifest digests.
 """
 from io import BytesIO
-from typing import Union, Dict
+from typing import Union, Dict, List, Optional
 
 import requests
 from osbs.utils import ImageName
 from requests.exceptions import HTTPError, RetryError, Timeout
 
+from atomic_reactor.config import get_digest_cache
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import (get_platforms, base_image_is_custom, base_image_is_scratch,
                                  get_checksums, get_manifest_media_type,
                                  RegistrySession, RegistryClient)
 
 
+# what parent images are resolved to in the digest cache
+PARENT_IMAGE_CACHE_KIND = 'parent_image'
+
+
 class CheckBaseImagePlugin(Plugin):
     key = "check_base_image"
     is_allowed_to_fail = False
@@ -41,14 +46,19 @@ class CheckBaseImagePlugin(Plugin):
         self.allowed_registries.append(self.source_registry_docker_uri)
 
         self.manifest_list_cache = {}
+        # architectures in manifest lists of images, None for images without a manifest list
+        self.manifest_list_arches: Dict[ImageName, Optional[List[str]]] = {}
         # RegistryClient instances cached by registry name
         self.registry_clients = {}
+        # digests and architectures of parent images cached across builds
+        self.digest_cache = get_digest_cache(self.workflow.conf)
 
     def run(self):
         """
         Check parent images to ensure they only come from allowed registries.
         """
         self.manifest_list_cache.clear()
+        self.manifest_list_arches.clear()
 
         digest_fetching_exceptions = []
         for parent in self.workflow.data.dockerfile_images.keys():
@@ -61,13 +71,28 @@ class CheckBaseImagePlugin(Plugin):
                 image = self._resolve_base_image()
 
             self._ensure_image_registry(image)
+
+            cached = None
+            if self.digest_cache is not None:
+                cached = self.digest_cache.get(PARENT_IMAGE_CACHE_KIND, image)
+            if cached is not None:
+                self.manifest_list_arches[image] = cached['arches']
+
             self._validate_platforms_in_image(image)
 
-            try:
-                digest = self._fetch_manifest_digest(image)
-            except RuntimeError as exc:
-                digest_fetching_exceptions.append(exc)
-                continue
+            if cached is not None:
+                digest = cached['digests']
+            else:
+                try:
+                    digest = self._fetch_manifest_digest(image)
+                except RuntimeError as exc:
+                    digest_fetching_exceptions.append(exc)
+                    continue
+                if self.digest_cache is not None:
+                    self.digest_cache.put(PARENT_IMAGE_CACHE_KIND, image, {
+                        'digests': digest,
+                        'arches': self._get_manifest_list_arches(image),
+                    })
 
             image_with_digest = self._pin_to_digest(image, digest)
             self.log.info("Replacing image '%s' with '%s'", image, image_with_digest)
@@ -75,6 +100,9 @@ class CheckBaseImagePlugin(Plugin):
             self.workflow.data.dockerfile_images[parent] = image_with_digest
             self.workflow.data.parent_images_digests[str(image_with_digest)] = digest
 
+        if self.digest_cache is not None:
+            self.digest_cache.add_to(self.workflow.data.digest_cache_stats, self.key)
+
         if digest_fetching_exceptions:
             raise RuntimeError('Error when extracting parent images manifest digests: {}'
                                .format(digest_fetching_exceptions))
@@ -173,9 +201,9 @@ class CheckBaseImagePlugin(Plugin):
 
         platform_to_arch = self.workflow.conf.platform_to_goarch_mapping
 
-        manifest_list = self._get_manifest_list(image)
+        manifest_list_arches = self._get_manifest_list_arches(image)
 
-        if not manifest_list:
+        if manifest_list_arches is None:
             if len(expected_platforms) == 1:
                 self.log.warning('Skipping validation of available platforms for base image: '
                                  'this is a single platform build and base image has no manifest '
@@ -184,17 +212,14 @@ class CheckBaseImagePlugin(Plugin):
             else:
                 raise RuntimeError('Unable to fetch manifest list for base image {}'.format(image))
 
-        all_manifests = manifest_list.json()['manifests']
-        manifest_list_arches = set(
-            manifest['platform']['architecture'] for manifest in all_manifests)
-
+        available_arches = set(manifest_list_arches)
         expected_arches = set(
             platform_to_arch[platform] for platform in expected_platforms)
 
         self.log.info('Manifest list arches: %s, expected arches: %s',
-                      manifest_list_arches, expected_arches)
+                      available_arches, expected_arches)
 
-        missing_arches = expected_arches - manifest_list_arches
+        missing_arches = expected_arches - available_arches
         if missing_arches:
             arches_str = ', '.join(sorted(missing_arches))
             raise RuntimeError('Base image {} not available for arches: {}'
@@ -202,6 +227,18 @@ class CheckBaseImagePlugin(Plugin):
 
         self.log.info('Base image is a manifest list for all required platforms')
 
+    def _get_manifest_list_arches(self, image: ImageName) -> Optional[List[str]]:
+        """Get architectures in the manifest list of image, None if it has no manifest list"""
+        if image not in self.manifest_list_arches:
+            manifest_list = self._get_manifest_list(image)
+            if manifest_list:
+                all_manifests = manifest_list.json()['manifests']
+                self.manifest_list_arches[image] = sorted(
+                    set(manifest['platform']['architecture'] for manifest in all_manifests))
+            else:
+                self.manifest_list_arches[image] = None
+        return self.manifest_list_arches[image]
+
     def _get_registry_client(self, registry: str) -> RegistryClient:
         """
         Get registry client for specified registry, cached by registry name
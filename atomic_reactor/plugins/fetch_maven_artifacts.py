@@ -18,9 +18,9 @@ from atomic_reactor import util
 from atomic_reactor.constants import (PLUGIN_FETCH_MAVEN_KEY,
                                       REPO_FETCH_ARTIFACTS_URL,
                                       REPO_FETCH_ARTIFACTS_KOJI)
-from atomic_reactor.config import get_koji_session
+from atomic_reactor.config import get_download_cache, get_koji_session
 from atomic_reactor.dirs import BuildDir
-from atomic_reactor.download import download_url
+from atomic_reactor.download import download_urls
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.utils.koji import NvrRequest
 from atomic_reactor.utils.pnc import PNCUtil
@@ -41,6 +41,9 @@ class DownloadRequest:
 class FetchMavenArtifactsPlugin(Plugin):
     key = PLUGIN_FETCH_MAVEN_KEY
     is_allowed_to_fail = False
+    # the build directories are created for the platforms set by check_and_set_platforms
+    reads = frozenset({'plugins_results.check_and_set_platforms'})
+    writes = frozenset({'build_dir.maven_artifacts'})
 
     DOWNLOAD_DIR = 'artifacts'
 
@@ -208,24 +211,29 @@ class FetchMavenArtifactsPlugin(Plugin):
         artifacts_path = build_dir.path / self.DOWNLOAD_DIR
         koji_config = self.workflow.conf.koji
         insecure = koji_config.get('insecure_download', False)
+        downloads_config = self.workflow.conf.downloads
 
         self.log.debug('%d files to download', len(downloads))
         session = util.get_retrying_requests_session()
 
-        for index, download in enumerate(downloads):
+        url_downloads = []
+        for download in downloads:
             dest_path = artifacts_path / download.dest
-            dest_dir = dest_path.parent
-            dest_filename = dest_path.name
-
-            if not dest_dir.exists():
-                dest_dir.mkdir(parents=True)
-
-            self.log.debug('%d/%d downloading %s', index + 1, len(downloads),
-                           download.url)
-
-            download_url(url=download.url, dest_dir=dest_dir, insecure=insecure, session=session,
-                         dest_filename=dest_filename, expected_checksums=download.checksums)
-            yield dest_path
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            url_downloads.append({
+                'url': download.url,
+                'dest_dir': dest_path.parent,
+                'dest_filename': dest_path.name,
+                'expected_checksums': download.checksums,
+            })
+
+        download_urls(url_downloads, insecure=insecure, session=session,
+                      max_workers=downloads_config['max_workers'],
+                      max_connections_per_host=downloads_config['max_connections_per_host'],
+                      cache=get_download_cache(self.workflow.conf))
+
+        for download in downloads:
+            yield artifacts_path / download.dest
 
     def generate_sbom_components_for_pnc(self, pnc_artifact_ids: List[int]):
         purl_specs = self.pnc_util.get_artifact_purl_specs(pnc_artifact_ids)
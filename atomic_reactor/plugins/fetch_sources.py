@@ -6,25 +6,29 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 import os
+import posixpath
 import shutil
+import subprocess
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import re
 
 import koji
 import tarfile
 import yaml
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any
 
 from atomic_reactor.constants import (PLUGIN_FETCH_SOURCES_KEY, PNC_SYSTEM_USER,
                                       REMOTE_SOURCE_JSON_FILENAME, REMOTE_SOURCE_TARBALL_FILENAME,
-                                      KOJI_BTYPE_REMOTE_SOURCES)
-from atomic_reactor.config import get_koji_session
+                                      KOJI_BTYPE_REMOTE_SOURCES, KOJI_MULTICALL_BATCH_SIZE)
+from atomic_reactor.config import get_download_cache, get_koji_session
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.source import GitSource
-from atomic_reactor.util import (get_retrying_requests_session,
-                                 map_to_user_params,
-                                 safe_extractall)
-from atomic_reactor.download import download_url
+from atomic_reactor.util import (PathSuffixMatcher, get_retrying_requests_session,
+                                 map_to_user_params)
+from atomic_reactor.download import download_urls
 from atomic_reactor.utils.pnc import PNCUtil
 
 try:
@@ -77,6 +81,8 @@ class FetchSourcesPlugin(Plugin):
         self.session = get_koji_session(self.workflow.conf)
         self.pathinfo = self.workflow.conf.koji_path_info
         self._pnc_util = None
+        # koji build ID -> base URL of the build
+        self._build_paths: Dict[int, str] = {}
 
     @property
     def pnc_util(self):
@@ -134,8 +140,8 @@ class FetchSourcesPlugin(Plugin):
     def download_sources(self, sources, insecure=False, download_dir=SRPMS_DOWNLOAD_DIR):
         """Download sources content
 
-        Download content in the given URLs into a new temporary directory and
-        return a list with each downloaded artifact's path.
+        Download content in the given URLs concurrently into a new temporary
+        directory and return a list with each downloaded artifact's path.
 
         :param sources: list, dicts with URLs to download
         :param insecure: bool, whether to perform TLS checks of urls
@@ -145,14 +151,23 @@ class FetchSourcesPlugin(Plugin):
         dest_dir: Path = self.workflow.build_dir.source_container_sources_dir / download_dir
         dest_dir.mkdir(parents=True, exist_ok=True)
 
-        req_session = get_retrying_requests_session()
+        downloads = []
         for source in sources:
             subdir: Path = dest_dir / source.get('subdir', '')
             subdir.mkdir(parents=True, exist_ok=True)
-            checksums = source.get('checksums', {})
-            download_url(source['url'], subdir, insecure=insecure,
-                         session=req_session, dest_filename=source.get('dest'),
-                         expected_checksums=checksums)
+            downloads.append({
+                'url': source['url'],
+                'dest_dir': subdir,
+                'dest_filename': source.get('dest'),
+                'expected_checksums': source.get('checksums', {}),
+                'cache_key': source.get('cache_key'),
+            })
+
+        downloads_config = self.workflow.conf.downloads
+        download_urls(downloads, insecure=insecure, session=get_retrying_requests_session(),
+                      max_workers=downloads_config['max_workers'],
+                      max_connections_per_host=downloads_config['max_connections_per_host'],
+                      cache=get_download_cache(self.workflow.conf))
 
         return str(dest_dir)
 
@@ -515,6 +530,14 @@ class FetchSourcesPlugin(Plugin):
             remote_sources_urls.extend(remote_source)
             remote_sources_map.update(remote_json)
 
+        # download every remote source into its own subdirectory, which is
+        # how they are passed to bsi as extra source directories
+        subdirs = {}
+        for count, remote_source in enumerate(remote_sources_urls):
+            remote_source['subdir'] = subdirs[remote_source['dest']] = f'remote_source_{count}'
+        remote_sources_map = {os.path.join(subdirs[dest], dest): remote_json
+                              for dest, remote_json in remote_sources_map.items()}
+
         return remote_sources_urls, remote_sources_map
 
     def get_kojifile_source_urls(self):
@@ -610,29 +633,52 @@ class FetchSourcesPlugin(Plugin):
         self.log.debug('denylisted srpms: %s', deny_list)
         return deny_list
 
+    def _multicall(self):
+        """Start a koji multicall, the calls are sent to the hub in batches when it is exited
+
+        :return: koji.MultiCallSession
+        """
+        return self.session.multicall(strict=True, batch=KOJI_MULTICALL_BATCH_SIZE)
+
+    def _get_build_paths(self, build_ids: Iterable[int]) -> Dict[int, str]:
+        """Get the base URLs of koji builds
+
+        Builds are looked up only once per plugin run.
+
+        :param build_ids: iterable of int, koji build IDs
+        :return: dict, koji build ID -> base URL of the build
+        """
+        missing = [build_id for build_id in dict.fromkeys(build_ids)
+                   if build_id not in self._build_paths]
+        with self._multicall() as m:
+            calls = [m.getBuild(build_id, strict=True) for build_id in missing]
+        for build_id, call in zip(missing, calls):
+            self._build_paths[build_id] = self.pathinfo.build(call.result)
+        return self._build_paths
+
     def _get_go_rpms(self, all_rpms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         final_go_rpms = []
 
-        # get go rpms
-        go_rpms = []
+        # get builds of go rpms
+        go_build_ids = []
         for rpm in all_rpms:
             if rpm['nvr'].startswith('golang-') and rpm['arch'] != 'src':
-                go_rpms.append(rpm)
+                go_build_ids.append(rpm['build_id'])
 
         # get buildroots for each go rpm
+        with self._multicall() as m:
+            calls = [m.listRPMs(build_id) for build_id in dict.fromkeys(go_build_ids)]
         go_buildroots = set()
-        for gorp in go_rpms:
-            build_rpms = self.session.listRPMs(gorp['build_id'])
-            for rpm in build_rpms:
+        for call in calls:
+            for rpm in call.result:
                 if rpm['nvr'].startswith('golang-') and rpm['arch'] != 'src':
                     go_buildroots.add(rpm['buildroot_id'])
 
         # add to rpms list also go rpms from buildroots
-        for brid in go_buildroots:
-            opts = {'componentBuildrootID': brid}
-            buildroot_rpms = self.session.listRPMs(**opts)
-
-            for rpm in buildroot_rpms:
+        with self._multicall() as m:
+            calls = [m.listRPMs(componentBuildrootID=brid) for brid in go_buildroots]
+        for call in calls:
+            for rpm in call.result:
                 if rpm['nvr'].startswith('golang-') and rpm['arch'] != 'src':
                     new_rpm = {'id': rpm['id'],
                                'build_id': rpm['build_id'],
@@ -644,53 +690,57 @@ class FetchSourcesPlugin(Plugin):
 
         return final_go_rpms
 
-    def get_srpm_urls(self, sigkeys=None, insecure=False):
-        """Fetch SRPM download URLs for each image generated by a build
+    def get_srpm_build_paths(self) -> Dict[str, Dict[str, Any]]:
+        """Get the koji builds of SRPMs of the RPMs in each image generated by a build
 
-        Build each possible SRPM URL and check if the URL is available,
-        respecting the signing intent preference order.
+        Koji is queried with multicalls, so the number of round-trips to the hub
+        does not grow with the number of RPMs.
 
-        :param sigkeys: list, strings for keys which signed the srpms to be fetched
-        :return: list, strings with URLs pointing to SRPM files
+        :return: dict, SRPM filename -> dict with the base URL of the build of
+            the SRPM and whether the signing intent is ignored for it
         """
-        if not sigkeys:
-            sigkeys = ['']
-
         self.log.debug('get srpm_urls: %s', self.koji_build_id)
         archives = self.session.listArchives(self.koji_build_id, type='image')
         self.log.debug('archives: %s', archives)
 
+        with self._multicall() as m:
+            calls = [m.listRPMs(imageID=archive['id']) for archive in archives]
+
         # use just required fields, some fields can be different even for the same rpm,
         # because noarch rpms are in the list for each arch
         all_rpms = [{'id': rpm['id'],
                      'build_id': rpm['build_id'],
                      'arch': rpm['arch'],
                      'external_repo_name': rpm['external_repo_name'],
-                     'nvr': rpm['nvr']} for archive in archives
-                    for rpm in self.session.listRPMs(imageID=archive['id'])]
+                     'nvr': rpm['nvr']} for call in calls
+                    for rpm in call.result]
 
         all_rpms.extend(self._get_go_rpms(all_rpms))
 
         # make rpms unique
         all_rpms.sort(key=lambda c: (c["id"], c["nvr"]))
-        rpms = []
+        rpms: List[Dict[str, Any]] = []
         for rpm in all_rpms:
             if not rpms or rpm != rpms[-1]:
                 rpms.append(rpm)
 
-        denylist_srpms = self.get_denylisted_srpms()
-
-        srpm_build_paths = {}
         for rpm in rpms:
-            rpm_id = rpm['id']
-            self.log.debug('Resolving SRPM for RPM ID: %s', rpm_id)
-
             if rpm['external_repo_name'] != 'INTERNAL':
                 msg = ('RPM comes from an external repo (RPM ID: {}). '
-                       'External RPMs are currently not supported.').format(rpm_id)
+                       'External RPMs are currently not supported.').format(rpm['id'])
                 raise RuntimeError(msg)
 
-            rpm_hdr = self.session.getRPMHeaders(rpm_id, headers=['SOURCERPM'])
+        denylist_srpms = self.get_denylisted_srpms()
+
+        with self._multicall() as m:
+            calls = [m.getRPMHeaders(rpm['id'], headers=['SOURCERPM']) for rpm in rpms]
+
+        srpm_rpms: Dict[str, Dict[str, Any]] = {}
+        for rpm, call in zip(rpms, calls):
+            rpm_id = rpm['id']
+            self.log.debug('Resolving SRPM for RPM ID: %s', rpm_id)
+
+            rpm_hdr = call.result
             if 'SOURCERPM' not in rpm_hdr:
                 raise RuntimeError('Missing SOURCERPM header (RPM ID: {})'.format(rpm_id))
 
@@ -700,46 +750,42 @@ class FetchSourcesPlugin(Plugin):
                 self.log.debug('skipping denylisted srpm %s', rpm_hdr['SOURCERPM'])
                 continue
 
-            srpm_filename = rpm_hdr['SOURCERPM']
-            if srpm_filename in srpm_build_paths:
-                continue
-            rpm_build = self.session.getBuild(rpm['build_id'], strict=True)
-            base_url = self.pathinfo.build(rpm_build)
+            srpm_rpms.setdefault(rpm_hdr['SOURCERPM'], rpm)
+
+        build_paths = self._get_build_paths(rpm['build_id'] for rpm in srpm_rpms.values())
+
+        return {
+            srpm_filename: {'base_url': build_paths[rpm['build_id']],
+                            'ignore_signing_intent': rpm.get('ignore_signing_intent', False)}
+            for srpm_filename, rpm in srpm_rpms.items()
+        }
+
+    def get_srpm_urls(self, sigkeys=None, insecure=False):
+        """Fetch SRPM download URLs for each image generated by a build
+
+        Build each possible SRPM URL and check if the URL is available,
+        respecting the signing intent preference order.
+
+        :param sigkeys: list, strings for keys which signed the srpms to be fetched
+        :return: list, strings with URLs pointing to SRPM files
+        """
+        if not sigkeys:
+            sigkeys = ['']
 
-            ignore_signing_intent = rpm.get('ignore_signing_intent', False)
-            srpm_build_paths[srpm_filename] = {'base_url': base_url,
-                                               'ignore_signing_intent': ignore_signing_intent}
+        srpm_build_paths = self.get_srpm_build_paths()
+
+        available = self.probe_srpm_urls(srpm_build_paths, sigkeys, insecure=insecure)
 
         srpm_urls = []
         missing_srpms = []
-        req_session = get_retrying_requests_session()
         for srpm_filename, base_dict in srpm_build_paths.items():
-            # golang dependencies for golang rpms from buildroot, most likely won't be signed
-            # so don't check for signing key
-            if base_dict['ignore_signing_intent']:
-                self.log.debug('%s is used only in buildroot ignoring signing keys', srpm_filename)
-                url_candidate = self.assemble_srpm_url(base_dict['base_url'], srpm_filename)
-
-                request = req_session.head(url_candidate, verify=not insecure, allow_redirects=True)
-                if request.ok:
-                    srpm_urls.append({'url': url_candidate})
-                    self.log.debug('%s is available', srpm_filename)
-                else:
-                    self.log.error('%s not found"', srpm_filename)
-                    missing_srpms.append(srpm_filename)
-                continue
-
-            for sigkey in sigkeys:
-                # koji uses lowercase for paths. We make sure the sigkey is in lower case
-                url_candidate = self.assemble_srpm_url(base_dict['base_url'],
-                                                       srpm_filename, sigkey.lower())
-                # allow redirects, head call doesn't do it by default
-                request = req_session.head(url_candidate, verify=not insecure, allow_redirects=True)
-                if request.ok:
-                    srpm_urls.append({'url': url_candidate})
-                    self.log.debug('%s is available for signing key "%s"', srpm_filename, sigkey)
-                    break
-
+            if srpm_filename in available:
+                url, sigkey = available[srpm_filename]
+                # SRPMs in koji never change, the URL identifies the NVR and sigkey
+                srpm_urls.append({'url': url, 'sigkey': sigkey, 'cache_key': url})
+            elif base_dict['ignore_signing_intent']:
+                self.log.error('%s not found"', srpm_filename)
+                missing_srpms.append(srpm_filename)
             else:
                 self.log.error('%s not found for the given signing intent: %s"', srpm_filename,
                                self.signing_intent)
@@ -749,8 +795,76 @@ class FetchSourcesPlugin(Plugin):
             raise RuntimeError('Could not find files signed by any of {} for these SRPMS: {}'
                                .format(sigkeys, missing_srpms))
 
+        sigkey_counts = Counter(srpm_url['sigkey'] for srpm_url in srpm_urls)
+        self.log.info('SRPMs found per signing key: %s', dict(sigkey_counts))
         return srpm_urls
 
+    def probe_srpm_urls(self, srpm_build_paths, sigkeys, insecure=False):
+        """Find which of the SRPMs are available and signed by which key
+
+        The URLs of all SRPMs are checked concurrently. For every SRPM, the URL
+        signed by the first of sigkeys which is available is used. Candidates
+        are probed in the order of sigkeys, so less preferred sigkeys are only
+        checked for SRPMs not found yet with a more preferred one.
+
+        :param srpm_build_paths: dict, as returned by get_srpm_build_paths()
+        :param sigkeys: list, strings for keys which signed the srpms, in
+            the order of preference
+        :param insecure: bool, whether to perform TLS checks of urls
+        :return: dict, SRPM filename -> (URL, sigkey) of the available SRPMs,
+            sigkey is None for SRPMs which ignore the signing intent
+        """
+        candidates = []
+        for rank, sigkey in enumerate(sigkeys):
+            for srpm_filename, base_dict in srpm_build_paths.items():
+                # golang dependencies for golang rpms from buildroot, most likely won't be signed
+                # so don't check for signing key
+                if base_dict['ignore_signing_intent']:
+                    if rank == 0:
+                        self.log.debug('%s is used only in buildroot ignoring signing keys',
+                                       srpm_filename)
+                        url = self.assemble_srpm_url(base_dict['base_url'], srpm_filename)
+                        candidates.append((srpm_filename, rank, None, url))
+                    continue
+                # koji uses lowercase for paths. We make sure the sigkey is in lower case
+                url = self.assemble_srpm_url(base_dict['base_url'], srpm_filename, sigkey.lower())
+                candidates.append((srpm_filename, rank, sigkey, url))
+
+        req_session = get_retrying_requests_session()
+        # SRPM filename -> rank of the most preferred sigkey found so far
+        found_ranks: Dict[str, int] = {}
+        lock = threading.Lock()
+
+        def probe(srpm_filename, rank, url):
+            with lock:
+                if found_ranks.get(srpm_filename, rank) < rank:
+                    return False
+            # allow redirects, head call doesn't do it by default
+            response = req_session.head(url, verify=not insecure, allow_redirects=True)
+            if not response.ok:
+                return False
+            with lock:
+                found_ranks[srpm_filename] = min(rank, found_ranks.get(srpm_filename, rank))
+            return True
+
+        max_workers = self.workflow.conf.downloads['max_workers']
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(probe, srpm_filename, rank, url)
+                       for srpm_filename, rank, _, url in candidates]
+
+        available = {}
+        for (srpm_filename, rank, sigkey, url), future in zip(candidates, futures):
+            # failed probes of less preferred candidates than the one found do not matter
+            if found_ranks.get(srpm_filename, rank) < rank:
+                continue
+            if future.result():
+                available[srpm_filename] = (url, sigkey)
+                if sigkey is None:
+                    self.log.debug('%s is available', srpm_filename)
+                else:
+                    self.log.debug('%s is available for signing key "%s"', srpm_filename, sigkey)
+        return available
+
     def get_signing_intent(self):
         """Get the signing intent to be used to fetch files from Koji
 
@@ -810,47 +924,128 @@ class FetchSourcesPlugin(Plugin):
                     return True
         return False
 
-    def _delete_app_directory(self, remote_source_dir, unpack_dir, remote_archive):
-        vendor_dir = os.path.join(unpack_dir, 'app', 'vendor')
+    def _get_excluded_matches(self, members, denylist, delete_app, remote_archive):
+        """Filter out excluded members of a remote source archive
 
-        if os.path.exists(vendor_dir):
-            shutil.move(vendor_dir, remote_source_dir)
-            self.log.debug('Removing app from "%s"', remote_archive)
-            shutil.rmtree(os.path.join(unpack_dir, 'app'))
-            # shutil.move will create missing parent directory
-            shutil.move(os.path.join(remote_source_dir, 'vendor'), vendor_dir)
-            self.log.debug('Keeping vendor in app from "%s"', remote_archive)
-        else:
+        A member is excluded if its path, or the path of any of its parent
+        directories, ends with a denylist entry at a component boundary. If delete_app is set, 'app'
+        is excluded as well, except 'app/vendor'.
+
+        :param members: iterable of tarfile.TarInfo, members of the archive
+        :param denylist: PathSuffixMatcher, denylist entries
+        :param delete_app: bool, whether to exclude 'app'
+        :param remote_archive: str, path of the archive
+        :return: generator of tarfile.TarInfo, members to keep
+        """
+        # directory -> whether it is excluded
+        excluded_dirs: Dict[str, bool] = {}
+        kept_vendor = False
+        removed_app = False
+
+        def is_excluded(path, is_dir):
+            parent = posixpath.dirname(path)
+            if parent and is_dir_excluded(parent):
+                return True
+            if denylist.matches(path):
+                if is_dir:
+                    self.log.debug("Removing excluded directory %s", path)
+                else:
+                    self.log.debug("Removing excluded file %s", path)
+                return True
+            return False
+
+        def is_dir_excluded(path):
+            if path not in excluded_dirs:
+                excluded_dirs[path] = is_excluded(path, True)
+            return excluded_dirs[path]
+
+        removed_links = set()
+        for member in members:
+            path = posixpath.normpath(member.name)
+            if posixpath.isabs(path) or path == '..' or path.startswith('../'):
+                raise tarfile.ExtractError('Attempted path traversal in tar file')
+
+            if delete_app and (path == 'app' or path.startswith('app/')):
+                if path == 'app/vendor' or path.startswith('app/vendor/'):
+                    kept_vendor = True
+                else:
+                    removed_app = True
+                    removed_links.add(path)
+                    continue
+
+            if member.isdir():
+                excluded = is_dir_excluded(path)
+            else:
+                excluded = is_excluded(path, False)
+            if not excluded and member.islnk():
+                # the data of hard links is stored with the target only
+                excluded = posixpath.normpath(member.linkname) in removed_links
+                if excluded:
+                    self.log.debug("Removing hard link %s to excluded %s", path, member.linkname)
+
+            if excluded:
+                removed_links.add(path)
+            else:
+                yield member
+
+        if removed_app:
             self.log.debug('Removing app from "%s"', remote_archive)
-            shutil.rmtree(os.path.join(unpack_dir, 'app'))
-
-    def _get_excluded_matches(self, unpack_dir, denylist_sources):
-        matches = []
-        # py2 glob.glob doesn't support recursive, hence os.walk & fnmatch
-        # py3 can use: glob.glob(os.path.join(unpack_dir, '**', exclude), recursive=True)
-        for root, dirnames, filenames in os.walk(unpack_dir):
-            for entry in dirnames + filenames:
-                full_path = os.path.join(root, entry)
-
-                for exclude in denylist_sources:
-                    if full_path.endswith(exclude):
-                        matches.append(full_path)
-                        break
-        return matches
-
-    def _remove_excluded_matches(self, matches):
-        for entry in matches:
-            if os.path.exists(entry):
-                if os.path.isdir(entry):
-                    self.log.debug("Removing excluded directory %s", entry)
-                    shutil.rmtree(entry)
+            if kept_vendor:
+                self.log.debug('Keeping vendor in app from "%s"', remote_archive)
+
+    def _filter_remote_source_archive(self, remote_archive, denylist, delete_app,
+                                      gzip_threads=1):
+        """Rewrite a remote source archive without its excluded members
+
+        The archive is streamed into a new one, nothing is extracted to disk.
+
+        :param remote_archive: str, path of the archive
+        :param denylist: PathSuffixMatcher, denylist entries
+        :param delete_app: bool, whether to exclude 'app', except 'app/vendor'
+        :param gzip_threads: int, compress the archive with pigz using this many threads
+        """
+        filtered_archive = remote_archive + '.filtered'
+        pigz = shutil.which('pigz') if gzip_threads > 1 else None
+        if gzip_threads > 1 and not pigz:
+            self.log.warning('pigz is not available, compressing %s with a single thread',
+                             remote_archive)
+
+        try:
+            with open(filtered_archive, 'wb') as f:
+                compressor = None
+                if pigz:
+                    compressor = subprocess.Popen([pigz, '-9', '-c', '-p', str(gzip_threads)],
+                                                  stdin=subprocess.PIPE, stdout=f)
+                    dest_file, dest_mode = compressor.stdin, 'w|'
                 else:
-                    self.log.debug("Removing excluded file %s", entry)
-                    os.unlink(entry)
+                    dest_file, dest_mode = f, 'w|gz'
+
+                try:
+                    with tarfile.open(fileobj=dest_file, mode=dest_mode) as dest:
+                        with tarfile.open(remote_archive, 'r|*') as src:
+                            for member in self._get_excluded_matches(src, denylist, delete_app,
+                                                                     remote_archive):
+                                dest.addfile(member,
+                                             src.extractfile(member) if member.isfile() else None)
+                finally:
+                    if compressor:
+                        compressor.stdin.close()
+                        compressor.wait()
+
+                if compressor and compressor.returncode != 0:
+                    raise RuntimeError('pigz failed to compress {}, exit code {}'
+                                       .format(remote_archive, compressor.returncode))
+
+            os.replace(filtered_archive, remote_archive)
+        finally:
+            # only left behind on failures
+            if os.path.exists(filtered_archive):
+                os.remove(filtered_archive)
 
     def exclude_files_from_remote_sources(self, remote_sources_map, remote_sources_dir):
         """
-        :param remote_sources_map: dict, keys are filenames of sources from cachito,
+        :param remote_sources_map: dict, keys are paths of sources from cachito relative
+                                         to remote_sources_dir,
                                          values are url with json from cachito
         :param remote_sources_dir: str, dir with downloaded sources from cachito
         """
@@ -865,37 +1060,20 @@ class FetchSourcesPlugin(Plugin):
         request_session = get_retrying_requests_session()
 
         denylist_sources = self._get_denylist_sources(request_session, denylist_sources_url)
+        # paths in the archives neither end with a slash nor contain empty
+        # components, entries which do never match, unlike in PathSuffixMatcher
+        denylist = PathSuffixMatcher(entry for entry in denylist_sources
+                                     if not entry.endswith('/') and '//' not in entry)
 
         # key: full path to source archive, value: cachito json
         full_remote_sources_map = self._create_full_remote_sources_map(request_session,
                                                                        remote_sources_map,
                                                                        remote_sources_dir)
         for remote_archive, remote_json in full_remote_sources_map.items():
-            unpack_dir = remote_archive + '_unpacked'
-
-            with tarfile.open(remote_archive) as tar:
-                safe_extractall(tar, unpack_dir)
-
             delete_app = self._check_if_package_excluded(remote_json['packages'], denylist_sources,
                                                          remote_archive)
 
             # if any package in cachito json matched excluded entry,
             # remove 'app' from sources, except 'app/vendor' when exists
-            if delete_app and os.path.exists(os.path.join(unpack_dir, 'app')):
-                self._delete_app_directory(remote_sources_dir, unpack_dir, remote_archive)
-
-            # search for excluded matches
-            matches = self._get_excluded_matches(unpack_dir, denylist_sources)
-
-            self._remove_excluded_matches(matches)
-
-            # delete former archive
-            os.unlink(remote_archive)
-
-            # re-create new archive without excluded content
-            with tarfile.open(remote_archive, "w:gz") as tar:
-                for add_file in os.listdir(unpack_dir):
-                    tar.add(os.path.join(unpack_dir, add_file), arcname=add_file)
-
-            # cleanup unpacked dir
-            shutil.rmtree(unpack_dir)
+            self._filter_remote_source_archive(remote_archive, denylist, delete_app,
+                                               gzip_threads=src_config.get('gzip_threads', 1))
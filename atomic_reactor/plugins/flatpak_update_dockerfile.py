@@ -28,6 +28,8 @@ from atomic_reactor.utils.flatpak_util import FlatpakUtil
 class FlatpakUpdateDockerfilePlugin(Plugin):
     key = "flatpak_update_dockerfile"
     is_allowed_to_fail = False
+    reads = frozenset({'plugins_results.resolve_composes', 'build_dir.dockerfile'})
+    writes = frozenset({'build_dir.dockerfile', 'build_dir.flatpak_files'})
 
     def __init__(self, workflow):
         """
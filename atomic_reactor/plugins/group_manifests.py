@@ -9,14 +9,14 @@ get the image manifest lists from the worker builders. If possible, group them t
 and return them. if not, return empty dict after re-uploading it for all existing image
 tags.
 """
-from typing import Dict, List, NamedTuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple, Union
 
 from osbs.utils import ImageName
 
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.util import (
     ManifestDigest,
-    RegistryClient,
     RegistrySession,
     get_manifest_media_type,
     get_primary_images,
@@ -73,30 +73,45 @@ class GroupManifestsPlugin(Plugin):
 
         self.manifest_util = ManifestUtil(self.workflow, self.log)
         self.non_floating_images = None
+        # (repository, digest) -> (content, media type, size) of the manifests
+        # downloaded while looking up the built images
+        self.manifests: Dict[Tuple[str, str], Tuple[bytes, str, int]] = {}
 
-    def get_built_images(self, session: RegistrySession) -> List[BuiltImage]:
-        """Get information about all the per-arch images that were built by the build tasks."""
-        tag_conf = self.workflow.data.tag_conf
-        client = RegistryClient(session)
-
-        built_images = []
+    def get_built_image(self, session: RegistrySession, platform: str) -> BuiltImage:
+        """Get information about the per-arch image built for the platform.
 
-        for platform in get_platforms(self.workflow.data):
-            # At this point, only the unique image has been built and pushed. Primary tags will
-            #   be pushed by this plugin, floating tags by the push_floating_tags plugin.
-            image = tag_conf.get_unique_images_with_platform(platform)[0]
-            manifest_digests = client.get_manifest_digests(image, versions=("v2", "oci"))
+        The manifest is downloaded in the same request and kept for grouping.
+        """
+        # At this point, only the unique image has been built and pushed. Primary tags will
+        #   be pushed by this plugin, floating tags by the push_floating_tags plugin.
+        image = self.workflow.data.tag_conf.get_unique_images_with_platform(platform)[0]
+        repository = image.to_str(registry=False, tag=False)
+
+        content, manifest_digest, media_type, size = self.manifest_util.get_manifest(
+            session, repository, image.tag
+        )
+        manifest_version = next(
+            (version for version in ("v2", "oci")
+             if get_manifest_media_type(version) == media_type),
+            None
+        )
+        if manifest_version is None:
+            raise RuntimeError(
+                f"Expected to find a v2 or oci manifest for {image}, but found {media_type}"
+            )
 
-            if len(manifest_digests) != 1:
-                raise RuntimeError(
-                    f"Expected to find a single manifest digest for {image}, "
-                    f"but found multiple: {manifest_digests}"
-                )
+        self.manifests[(repository, manifest_digest)] = (content, media_type, size)
+        return BuiltImage(image, platform, manifest_digest, manifest_version)
 
-            manifest_version, manifest_digest = manifest_digests.popitem()
-            built_images.append(BuiltImage(image, platform, manifest_digest, manifest_version))
+    def get_built_images(self, session: RegistrySession) -> List[BuiltImage]:
+        """Get information about all the per-arch images that were built by the build tasks."""
+        platforms = get_platforms(self.workflow.data)
+        if len(platforms) <= 1:
+            return [self.get_built_image(session, platform) for platform in platforms]
 
-        return built_images
+        with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+            return list(executor.map(lambda platform: self.get_built_image(session, platform),
+                                     platforms))
 
     def group_manifests_and_tag(
         self, session: RegistrySession, built_images: List[BuiltImage]
@@ -109,7 +124,8 @@ class GroupManifestsPlugin(Plugin):
         self.log.info("%s: Creating manifest list", session.registry)
 
         # Extract information about the manifests that we will group - we get the
-        # size and content type of the manifest by querying the registry
+        # size and content type of the manifest by querying the registry, unless
+        # they were already downloaded by get_built_images
         manifests = []
         for built_image in built_images:
             repository = built_image.repository
@@ -118,9 +134,12 @@ class GroupManifestsPlugin(Plugin):
 
             if media_type not in self.manifest_util.manifest_media_types:
                 continue
-            content, _, media_type, size = self.manifest_util.get_manifest(
-                session, repository, manifest_digest
-            )
+            if (repository, manifest_digest) in self.manifests:
+                content, media_type, size = self.manifests[(repository, manifest_digest)]
+            else:
+                content, _, media_type, size = self.manifest_util.get_manifest(
+                    session, repository, manifest_digest
+                )
 
             manifests.append({
                 'content': content,
@@ -138,19 +157,41 @@ class GroupManifestsPlugin(Plugin):
         # Now push the manifest list to the registry once per each tag
         self.log.info("%s: Tagging manifest list", session.registry)
 
-        for image in self.non_floating_images:
+        manifest_util = self.manifest_util
+        # several tags usually share a repository, mount blobs and push the
+        # referenced manifests only once per repository
+        target_repos = list(dict.fromkeys(image.to_str(registry=False, tag=False)
+                                          for image in self.non_floating_images))
+        # The referenced manifests potentially come from different repos, link
+        # all their blobs at once, then push them by digest into every repo
+        manifest_util.link_blobs_into_repositories(session, [
+            (digest, manifest['repository'], target_repo)
+            for target_repo in target_repos
+            for manifest in manifests
+            for digest in manifest_util.get_manifest_references(manifest['content'],
+                                                                manifest['media_type'])
+        ])
+
+        def store_manifest(push):
+            manifest, target_repo = push
+            manifest_util.store_manifest_in_repository(session,
+                                                       manifest['content'],
+                                                       manifest['media_type'],
+                                                       manifest['repository'],
+                                                       target_repo,
+                                                       ref=manifest['digest'])
+
+        manifest_util.run_concurrently(
+            store_manifest,
+            [(manifest, target_repo) for target_repo in target_repos for manifest in manifests]
+        )
+
+        def store_list(image):
             target_repo = image.to_str(registry=False, tag=False)
-            # We have to call store_manifest_in_repository directly for each
-            # referenced manifest, since they potentially come from different repos
-            for manifest in manifests:
-                self.manifest_util.store_manifest_in_repository(session,
-                                                                manifest['content'],
-                                                                manifest['media_type'],
-                                                                manifest['repository'],
-                                                                target_repo,
-                                                                ref=manifest['digest'])
-            self.manifest_util.store_manifest_in_repository(session, list_json, list_type,
-                                                            target_repo, target_repo, ref=image.tag)
+            manifest_util.store_manifest_in_repository(session, list_json, list_type,
+                                                       target_repo, target_repo, ref=image.tag)
+
+        manifest_util.run_concurrently(store_list, self.non_floating_images)
         # Get the digest of the manifest list using one of the tags
         registry_image = get_unique_images(self.workflow)[0]
         _, digest_str, _, _ = self.manifest_util.get_manifest(session,
@@ -5,7 +5,7 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, FrozenSet, Optional
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.constants import (
     INSPECT_CONFIG, PLUGIN_KOJI_PARENT_KEY, BASE_IMAGE_KOJI_BUILD, PARENT_IMAGES_KOJI_BUILDS,
@@ -49,6 +49,9 @@ class KojiParentPlugin(Plugin):
 
     key = PLUGIN_KOJI_PARENT_KEY
     is_allowed_to_fail = False
+    reads = frozenset({'dockerfile_images', 'parent_images_digests',
+                       'plugins_results.check_and_set_platforms'})
+    writes: FrozenSet[str] = frozenset()
 
     def __init__(self, workflow, poll_interval=DEFAULT_POLL_INTERVAL,
                  poll_timeout=DEFAULT_POLL_TIMEOUT):
@@ -10,6 +10,7 @@ import re
 from typing import Any, Dict, List, Sequence
 
 from atomic_reactor import util
+from atomic_reactor.config import get_download_cache
 from atomic_reactor.constants import (KOJI_BTYPE_REMOTE_SOURCE_FILE, PLUGIN_FETCH_MAVEN_KEY,
                                       PLUGIN_MAVEN_URL_SOURCES_METADATA_KEY)
 from atomic_reactor.download import download_url
@@ -45,6 +46,7 @@ class MavenURLSourcesMetadataPlugin(Plugin):
 
         koji_config = self.workflow.conf.koji
         insecure = koji_config.get('insecure_download', False)
+        cache = get_download_cache(self.workflow.conf)
 
         for index, download in enumerate(download_queue):
             dest_filename = download.dest
@@ -63,7 +65,7 @@ class MavenURLSourcesMetadataPlugin(Plugin):
 
             download_url(url=download.url, dest_dir=dest_dir, insecure=insecure,
                          session=session, dest_filename=dest_filename,
-                         expected_checksums=download.checksums)
+                         expected_checksums=download.checksums, cache=cache)
 
             checksum_type = list(download.checksums.keys())[0]
 
@@ -8,12 +8,16 @@ of the BSD license. See the LICENSE file for details.
 
 import logging
 import os.path
+import threading
 from pathlib import Path
 
 from osbs.utils import Labels, ImageName
 
+from atomic_reactor.config import get_digest_cache
 from atomic_reactor.plugin import Plugin
 from atomic_reactor.constants import (
+    DEFAULT_DIGEST_PINNING_MAX_CONNECTIONS_PER_REGISTRY,
+    DEFAULT_DIGEST_PINNING_MAX_WORKERS,
     PLUGIN_PIN_OPERATOR_DIGESTS_KEY,
     INSPECT_CONFIG,
     REPO_CONTAINER_CONFIG,
@@ -23,7 +27,8 @@ from atomic_reactor.util import (RegistrySession,
                                  has_operator_bundle_manifest,
                                  read_yaml_from_url,
                                  terminal_key_paths,
-                                 map_to_user_params)
+                                 map_to_user_params,
+                                 map_concurrently)
 from osbs.utils.yaml import (
     load_schema,
     validate_with_schema,
@@ -52,6 +57,10 @@ class PinOperatorDigestsPlugin(Plugin):
 
     key = PLUGIN_PIN_OPERATOR_DIGESTS_KEY
     is_allowed_to_fail = False
+    reads = frozenset({'dockerfile_images', 'build_dir.dockerfile',
+                       'build_dir.operator_manifests'})
+    writes = frozenset({'build_dir.operator_manifests',
+                        'digest_cache_stats.' + PLUGIN_PIN_OPERATOR_DIGESTS_KEY})
 
     args_from_user_params = map_to_user_params(
         "operator_csv_modifications_url",
@@ -489,14 +498,20 @@ class PinOperatorDigestsPlugin(Plugin):
             if not replacer.registry_is_allowed(p):
                 raise RuntimeError("Registry not allowed: {} (in {})".format(p.registry, p))
 
+        pinned_pullspecs = {}
+        if pin_digest:
+            self.log.info("Making sure tags are manifest list digests")
+            pinned_pullspecs = replacer.pin_digests(pullspecs)
+            if replacer.digest_cache is not None:
+                replacer.digest_cache.add_to(self.workflow.data.digest_cache_stats, self.key)
+
         for original in pullspecs:
             self.log.info("Computing replacement for %s", original)
             replaced = original
             pinned = False
 
             if pin_digest:
-                self.log.debug("Making sure tag is manifest list digest")
-                replaced = replacer.pin_digest(original)
+                replaced = pinned_pullspecs[original]
                 if replaced != original:
                     pinned = True
 
@@ -535,6 +550,8 @@ class PinOperatorDigestsPlugin(Plugin):
 
 
 _KEEP = object()
+# what pullspecs are resolved to in the digest cache
+MANIFEST_LIST_DIGEST_CACHE_KIND = 'manifest_list_digest'
 
 
 class PullspecReplacer(object):
@@ -580,8 +597,19 @@ class PullspecReplacer(object):
         # Loaded when needed, see _get_final_mapping
         self.final_package_mappings = {}
 
+        digest_pinning = site_config.get("digest_pinning", {})
+        self.max_workers = digest_pinning.get("max_workers",
+                                              DEFAULT_DIGEST_PINNING_MAX_WORKERS)
+        self.max_connections_per_registry = digest_pinning.get(
+            "max_connections_per_registry", DEFAULT_DIGEST_PINNING_MAX_CONNECTIONS_PER_REGISTRY)
+
         # RegistryClient instances cached by registry name
         self.registry_clients = {}
+        self._registry_clients_lock = threading.Lock()
+        # Manifest list digests cached by pullspec, every pullspec is queried once per build
+        self.digests = {}
+        # Manifest list digests cached across builds
+        self.digest_cache = get_digest_cache(workflow.conf)
 
     def registry_is_allowed(self, image):
         """
@@ -602,10 +630,67 @@ class PullspecReplacer(object):
         if image.tag.startswith("sha256:"):
             self.log.debug("%s looks like a digest, skipping query", image.tag)
             return image
+        digest = self._get_cached_digest(image)
+        if digest is None:
+            digest = self._query_digest(image)
+        else:
+            self.log.debug("Using cached manifest list digest of %s", image)
+        return self._replace(image, tag=digest)
+
+    def pin_digests(self, images):
+        """
+        Replace tags of multiple images with manifest list digests
+
+        Every distinct pullspec which is not in the digest cache is queried
+        once, concurrently with the others, but with at most
+        max_connections_per_registry queries running against a single
+        registry. The first failed query cancels the ones which have not
+        started yet and is re-raised.
+
+        :param images: list of ImageName
+        :return: dict, ImageName => pinned ImageName
+        """
+        # dict keeps the order, so the queries are started in the order of images
+        unique_images = dict.fromkeys(
+            image for image in images if not image.tag.startswith("sha256:")
+        )
+        to_query = [image for image in unique_images if self._get_cached_digest(image) is None]
+        if to_query:
+            self.log.info("Querying manifest list digests of %d images", len(to_query))
+            list(map_concurrently(self._query_digest, to_query, self.max_workers,
+                                  limit_key=lambda image: image.registry,
+                                  max_per_key=self.max_connections_per_registry))
+
+        pinned = {}
+        for image in images:
+            if image.tag.startswith("sha256:"):
+                pinned[image] = image
+            else:
+                pinned[image] = self._replace(image, tag=self.digests[image])
+        return pinned
+
+    def _get_cached_digest(self, image):
+        """
+        Get manifest list digest of image cached in this build or in the digest cache
+        """
+        digest = self.digests.get(image)
+        if digest is None and self.digest_cache is not None:
+            digest = self.digest_cache.get(MANIFEST_LIST_DIGEST_CACHE_KIND, image)
+            if digest is not None:
+                self.digests[image] = digest
+        return digest
+
+    def _query_digest(self, image):
+        """
+        Query the registry for the manifest list digest of image and cache it
+        """
         self.log.debug("Querying %s for manifest list digest", image.registry)
         registry_client = self._get_registry_client(image.registry)
         digest = registry_client.get_manifest_list_digest(image)
-        return self._replace(image, tag=digest)
+        self.digests[image] = digest
+        if self.digest_cache is not None:
+            self.digest_cache.put(MANIFEST_LIST_DIGEST_CACHE_KIND, image, digest)
+        return digest
 
     def replace_registry(self, image):
         """
@@ -720,11 +805,13 @@ class PullspecReplacer(object):
         """
         Get registry client for specified registry, cached by registry name
         """
-        client = self.registry_clients.get(registry)
-        if client is None:
-            session = RegistrySession.create_from_config(self.workflow.conf, registry=registry)
-            client = RegistryClient(session)
-            self.registry_clients[registry] = client
+        with self._registry_clients_lock:
+            client = self.registry_clients.get(registry)
+            if client is None:
+                session = RegistrySession.create_from_config(self.workflow.conf,
+                                                             registry=registry)
+                client = RegistryClient(session)
+                self.registry_clients[registry] = client
         return client
 
     def _replace(self, image, registry=_KEEP, namespace=_KEEP, repo=_KEEP, tag=_KEEP):
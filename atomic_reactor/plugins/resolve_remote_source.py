@@ -76,6 +76,9 @@ class ResolveRemoteSourcePlugin(Plugin):
 
     key = PLUGIN_RESOLVE_REMOTE_SOURCE
     is_allowed_to_fail = False
+    # the build directories are created for the platforms set by check_and_set_platforms
+    reads = frozenset({'buildargs', 'plugins_results.check_and_set_platforms'})
+    writes = frozenset({'buildargs', 'build_dir.remote_sources', 'polling_stats.cachito'})
     REMOTE_SOURCE = "unpacked_remote_sources"
 
     args_from_user_params = map_to_user_params("dependency_replacements")
@@ -179,6 +182,8 @@ class ResolveRemoteSourcePlugin(Plugin):
             completed_request = self.cachito_session.wait_for_request(open_request)
             processed_remote_sources.append(self.process_request(completed_request, None))
 
+        self.cachito_session.polling_stats.add_to(self.workflow.data.polling_stats, 'cachito')
+
         return processed_remote_sources
 
     def inject_remote_sources(self, remote_sources: List[RemoteSource]) -> None:
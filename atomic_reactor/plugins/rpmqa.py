@@ -46,7 +46,7 @@ class RPMqaPlugin(Plugin):
             self.log.info('Another plugin has already filled in the image component list, skip')
             return None
         self.workflow.data.image_components = self.workflow.build_dir.for_each_platform(
-            self.gather_output)
+            self.gather_output, parallel=True)
 
         return self.sbom_components
 
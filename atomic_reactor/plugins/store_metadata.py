@@ -38,7 +38,7 @@ class StoreMetadataPlugin(Plugin):
 
         for image in self.workflow.data.tag_conf.images:
             image_digests = get_manifest_digests(image, registry['uri'], registry['insecure'],
-                                                 registry.get('secret', None))
+                                                 registry.get('secret', None), concurrent=True)
             if image_digests:
                 digests[image.to_str()] = image_digests
 
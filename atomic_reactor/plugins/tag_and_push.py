@@ -201,7 +201,7 @@ class TagAndPushPlugin(Plugin):
                     wf_data.koji_source_manifest = koji_source_manifest_response.json()
 
                 digests = get_manifest_digests(registry_image, self.registry['uri'],
-                                               insecure, docker_push_secret)
+                                               insecure, docker_push_secret, concurrent=True)
 
                 if not (digests.v2 or digests.oci) and (retry < max_retries):
                     sleep_time = DOCKER_PUSH_BACKOFF_FACTOR * (2 ** retry)
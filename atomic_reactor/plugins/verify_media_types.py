@@ -64,7 +64,7 @@ class VerifyMediaTypesPlugin(Plugin):
                     expected_media_types.intersection_update(set(limit_media_types))
 
         digests = get_manifest_digests(pullspec, registry['uri'], insecure,
-                                       secret, require_digest=False, **kwargs)
+                                       secret, require_digest=False, concurrent=True, **kwargs)
         if digests:
             if digests.v2_list:
                 media_types.add(MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST)
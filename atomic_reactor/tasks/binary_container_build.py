@@ -5,17 +5,22 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
+import codecs
 import contextlib
 import functools
+import io
 import json
 import logging
+import os
+import selectors
 import shutil
 import subprocess
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Iterator, List, Optional
+from typing import IO, Any, Dict, Iterator, List, Optional
 from json import JSONDecodeError
 
+from opentelemetry import trace
 from osbs.utils import ImageName
 from otel_extensions import instrumented, get_tracer
 
@@ -30,6 +35,13 @@ from atomic_reactor.utils import remote_host
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of bytes of build output read at once
+BUILD_OUTPUT_CHUNK_SIZE = 64 * 1024
+# Longer lines of build output are split, so that memory usage stays bounded
+BUILD_OUTPUT_MAX_LINE_LENGTH = 1024 * 1024
+# Size of the buffer of the platform build log, written to disk when full
+BUILD_LOG_BUFFER_SIZE = 1024 * 1024
+
 
 class BuildTaskError(Exception):
     """The build task failed."""
@@ -95,7 +107,8 @@ class BinaryBuildTask(Task[BinaryBuildTaskParams]):
                 logger.info, "Dockerfile used for build:\n%s", build_dir.dockerfile_path.read_text()
             )
             build_log_file = defer.enter_context(
-                open(self.get_context_dir().get_platform_build_log(platform), 'w+')
+                open(self.get_context_dir().get_platform_build_log(platform), 'w+',
+                     buffering=BUILD_LOG_BUFFER_SIZE)
             )
 
             remote_resource = self.acquire_remote_resource(config.remote_hosts)
@@ -156,6 +169,13 @@ class BinaryBuildTask(Task[BinaryBuildTaskParams]):
             if resource:
                 break
             time.sleep(REMOTE_HOST_RETRY_INTERVAL)
+
+        lock_stats = pool.stats.as_dict()
+        logger.info("Remote host locking statistics: %s", lock_stats)
+        span = trace.get_current_span()
+        for name, value in lock_stats.items():
+            span.set_attribute(f"remote_host_lock.{name}", value)
+
         if not resource:
             raise BuildTaskError(
                 "Failed to acquire a build slot on any remote host! See the logs for more details."
@@ -179,6 +199,45 @@ def which_podman() -> str:
     return podman
 
 
+def read_output_lines(stream: IO[bytes]) -> Iterator[str]:
+    """Read lines of output of a process until the end of the stream.
+
+    Waits for the output without polling and reads all of the available output at
+    once, the output is decoded as UTF-8 with newlines translated to '\\n' (like
+    universal_newlines=True would). Lines longer than BUILD_OUTPUT_MAX_LINE_LENGTH
+    are split.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True
+    )
+    fd = stream.fileno()
+    partial_line = ""
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            selector.select()
+            chunk = os.read(fd, BUILD_OUTPUT_CHUNK_SIZE)
+            *lines, partial_line = (
+                partial_line + decoder.decode(chunk, final=not chunk)
+            ).split("\n")
+
+            for line in lines:
+                while len(line) > BUILD_OUTPUT_MAX_LINE_LENGTH:
+                    yield line[:BUILD_OUTPUT_MAX_LINE_LENGTH]
+                    line = line[BUILD_OUTPUT_MAX_LINE_LENGTH:]
+                yield line + "\n"
+            while len(partial_line) > BUILD_OUTPUT_MAX_LINE_LENGTH:
+                yield partial_line[:BUILD_OUTPUT_MAX_LINE_LENGTH]
+                partial_line = partial_line[BUILD_OUTPUT_MAX_LINE_LENGTH:]
+
+            if not chunk:
+                break
+
+    if partial_line:
+        yield partial_line
+
+
 class PodmanRemote:
     """Wrapper for running podman --remote commands on a remote host.
 
@@ -288,40 +347,38 @@ class PodmanRemote:
             build_cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            encoding="utf-8",
-            errors="replace",
         )
 
         # passing stdout=PIPE guarantees that stdout is not None, but the type hints for the
         #   subprocess module do not express that (TL;DR - this is just for type checkers)
         assert build_process.stdout is not None
 
+        # keep the last non-empty, non-whitespace line for an eventual error message,
+        #   the empty lines following it are held back too, to keep the output in order
         last_line = None
-        buffer: List[str] = []
+        held_lines: List[str] = []
 
-        while True:
-            if line := build_process.stdout.readline():
-                if buffer and buffer[0] != last_line:
-                    yield buffer.pop(0)
-                buffer.append(line)
+        with build_process.stdout:
+            for line in read_output_lines(build_process.stdout):
                 if line.rstrip():
-                    # keep the last non-empty, non-whitespace line for an eventual error message
+                    yield from held_lines
+                    held_lines = [line]
                     last_line = line
+                elif held_lines:
+                    held_lines.append(line)
+                else:
+                    yield line
 
-            if (rc := build_process.poll()) is not None:
-                break
-
-        for line in buffer:
-            if line != last_line:
-                yield line
+        rc = build_process.wait()
 
         if rc != 0:
+            # the last line is part of the error instead
+            yield from held_lines[1:]
             logger.error(last_line)
             error = last_line if last_line else "<no output!>"
             raise BuildProcessError(f"Build failed (rc={rc}): {error}")
         else:
-            yield last_line
+            yield from held_lines
 
     @instrumented
     def get_image_size(self, dest_tag: ImageName) -> int:
@@ -170,5 +170,8 @@ class Task(abc.ABC, Generic[ParamsT]):
 
         finally:
             signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            pool_stats = util.registry_session_pool.stats()
+            if pool_stats['sessions']:
+                logger.info("registry session pool statistics: %s", pool_stats)
             if self.autosave_context_data:
                 self.workflow_data.save(self.get_context_dir())
@@ -6,6 +6,8 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from dataclasses import dataclass
 import typing
 import _hashlib
@@ -14,18 +16,22 @@ from datetime import datetime
 from itertools import chain
 import json
 import io
+import mmap
 import os
 import re
 import requests
 from requests.exceptions import SSLError, HTTPError, RetryError
 import tempfile
-from typing import Any, Final, Iterator, Sequence, Dict, Union, List, BinaryIO, Tuple, Optional
+from typing import (Any, Final, Hashable, Iterable, Iterator, Sequence, Dict, TypeVar, Union,
+                    List, Tuple, Optional)
 import logging
 import uuid
 import yaml
 import string
 import signal
+import stat
 import tarfile
+import threading
 from collections import namedtuple
 from copy import deepcopy
 from base64 import b64decode
@@ -301,8 +307,12 @@ def _process_plugin_substitution(mapping, key_parts, value):
                            (plugin_name, plugins_num))
 
 
+# checksum algorithms get_checksums() can compute
+CHECKSUM_ALGORITHMS = ('md5', 'sha1', 'sha256', 'sha512')
+
+
 def _compute_checksums(
-    fd: BinaryIO, hash_objs: List[_hashlib.HASH], blocksize: int = 65536
+    fd: io.BufferedIOBase, hash_objs: List[_hashlib.HASH], blocksize: int = 1024 * 1024
 ) -> None:
     """
     Compute file checksums in given hash objects.
@@ -311,33 +321,61 @@ def _compute_checksums(
     :param hash_objs: list, hashlib hash objects for each algorithm to be calculated
     :param blocksize: block size used to read fd
     """
-    buf = fd.read(blocksize)
-    while len(buf) > 0:
+    buf = bytearray(blocksize)
+    view = memoryview(buf)
+    size = fd.readinto(buf)
+    while size:
         for hash_object in hash_objs:
-            hash_object.update(buf)
-        buf = fd.read(blocksize)
+            hash_object.update(view[:size])
+        size = fd.readinto(buf)
 
 
-def get_checksums(filename: Union[str, BinaryIO], algorithms: List[str]) -> Dict[str, str]:
+def _compute_file_checksums(path: str, hash_objs: List[_hashlib.HASH]) -> None:
+    """
+    Compute checksums of a file in given hash objects.
+
+    The file is memory-mapped and every algorithm hashes it in its own thread,
+    hashlib releases the GIL while hashing. Empty files and files which are
+    not regular (e.g. pipes) cannot be mapped, they are read block by block.
+
+    :param path: str, path to file
+    :param hash_objs: list, hashlib hash objects for each algorithm to be calculated
+    """
+    with open(path, mode='rb') as f:
+        file_stat = os.fstat(f.fileno())
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size == 0:
+            _compute_checksums(typing.cast(io.BufferedIOBase, f), hash_objs)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if len(hash_objs) == 1:
+                hash_objs[0].update(mapped)
+                return
+            with ThreadPoolExecutor(max_workers=len(hash_objs)) as executor:
+                list(executor.map(lambda hash_obj: hash_obj.update(mapped), hash_objs))
+
+
+def get_checksums(
+    filename: Union[str, io.BufferedIOBase], algorithms: List[str]
+) -> Dict[str, str]:
     """
     Compute a checksum(s) of given file using specified algorithms.
 
     :param filename: path to file or file-like object
-    :param algorithms: list of cryptographic hash functions, currently supported: md5, sha256
+    :param algorithms: list of cryptographic hash functions, currently supported:
+                       md5, sha1, sha256, sha512
     :return: dictionary
     """
     if not algorithms:
         return {}
 
-    allowed_algorithms = ['md5', 'sha256']
-    if not all(elem in allowed_algorithms for elem in algorithms):
-        raise ValueError('Algorithms supported {}. Found {}'.format(allowed_algorithms, algorithms))
+    if not all(elem in CHECKSUM_ALGORITHMS for elem in algorithms):
+        raise ValueError('Algorithms supported {}. Found {}'
+                         .format(list(CHECKSUM_ALGORITHMS), algorithms))
 
-    hash_objs = [getattr(hashlib, algorithm)() for algorithm in algorithms]
+    hash_objs = [hashlib.new(algorithm) for algorithm in algorithms]
 
     if isinstance(filename, str):
-        with open(filename, mode='rb') as f:
-            _compute_checksums(f, hash_objs)
+        _compute_file_checksums(filename, hash_objs)
     else:
         _compute_checksums(filename, hash_objs)
 
@@ -557,15 +595,22 @@ class RegistrySession(object):
                 self._fallback = 'http://{}'.format(self.registry)
 
         self.session = get_retrying_requests_session()
+        self.session.hooks['response'].append(self._count_response)
+        self.requests = 0
+
+    def _count_response(self, response, *args, **kwargs):
+        self.requests += 1
 
     @classmethod
     def create_from_config(cls, config, registry=None, access=None):
         """
-        Create a session for the specified registry based on configuration in reactor config map.
+        Get a session for the specified registry based on configuration in reactor config map.
 
         If the registry is configured in source_registry or pull_registries,
         use that configuration. Otherwise an error is thrown.
 
+        The session is taken from the process-wide pool, see RegistrySessionPool.
+
         :param config: Configuration, contains configuration for registries
         :param registry: str, registry to create session for (as hostname[:port], no http(s))
                          If not specified, the default source_registry will be used
@@ -598,10 +643,10 @@ class RegistrySession(object):
                        .format(registry))
                 raise RuntimeError(msg)
 
-        return cls(matched_registry['uri'].uri,
-                   insecure=matched_registry['insecure'],
-                   dockercfg_path=matched_registry['dockercfg_path'],
-                   access=access)
+        return registry_session_pool.get_session(matched_registry['uri'].uri,
+                                                 insecure=matched_registry['insecure'],
+                                                 dockercfg_path=matched_registry['dockercfg_path'],
+                                                 access=access)
 
     def _do(self, f, relative_url, *args, **kwargs):
         kwargs['auth'] = self.auth
@@ -632,6 +677,86 @@ class RegistrySession(object):
         return self._do(self.session.delete, relative_url, **kwargs)
 
 
+class RegistrySessionPool(object):
+    """
+    Pool of registry sessions shared by the whole process.
+
+    Callers asking for a session with the same registry, TLS verification,
+    credentials and access share a single RegistrySession. That way, the
+    dockercfg is parsed once, the connections to the registry are kept alive
+    between the callers and the bearer tokens are negotiated once per
+    repository until they expire.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[Tuple, RegistrySession] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_session(self, registry, insecure=False, dockercfg_path=None, access=None):
+        """
+        Get a session for the registry, create it if there is none yet.
+
+        :param registry: str, registry as accepted by RegistrySession
+        :param insecure: bool, when True registry's cert is not verified
+        :param dockercfg_path: str, dirname of .dockercfg location
+        :param access: List of actions the session is allowed to perform, e.g. ('push', 'pull')
+
+        :return: RegistrySession
+        """
+        key = (registry, insecure, dockercfg_path, tuple(access) if access else None)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                self.misses += 1
+                session = RegistrySession(registry, insecure=insecure,
+                                          dockercfg_path=dockercfg_path, access=access)
+                self._sessions[key] = session
+            else:
+                self.hits += 1
+        return session
+
+    def clear(self):
+        """Forget all sessions and statistics."""
+        with self._lock:
+            self._sessions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get statistics of the pool for tuning.
+
+        :return: dict, number of sessions, pool hits and misses, and the number of
+            requests and bearer token cache usage for every registry
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            stats: Dict[str, Any] = {
+                'sessions': len(sessions),
+                'hits': self.hits,
+                'misses': self.misses,
+                'registries': {},
+            }
+        for session in sessions:
+            registry_stats = stats['registries'].setdefault(session.registry, {
+                'sessions': 0,
+                'requests': 0,
+                'tokens_fetched': 0,
+                'token_cache_hits': 0,
+                'tokens_expired': 0,
+            })
+            registry_stats['sessions'] += 1
+            registry_stats['requests'] += session.requests
+            for key, value in session.auth.token_stats.items():
+                registry_stats[key] += value
+        return stats
+
+
+registry_session_pool = RegistrySessionPool()
+
+
 class RegistryClient(object):
     """
     Registry client, provides methods for looking up image digests and configs
@@ -658,15 +783,29 @@ class RegistryClient(object):
         return self._session.dockercfg_path
 
     def get_manifest(
-        self, image: ImageName, version: str
+        self, image: ImageName, version: str, head: bool = False
     ) -> Tuple[Optional[requests.Response], Optional[Exception]]:
+        """Get the manifest of the image in the specified version.
+
+        :param image: ImageName, the remote image to inspect
+        :param version: str, manifest schema version
+        :param head: bool, send a HEAD request, only the headers of the response
+            are available then. Falls back to GET if the headers do not identify
+            the manifest or the registry does not support HEAD.
+
+        :return: tuple, the response or None if the manifest is not available
+            in the version, and the exception if the manifest was not found
+        """
         saved_not_found = None
         media_type = get_manifest_media_type(version)
         try:
-            response = query_registry(self._session, image, digest=None, version=version)
+            response = query_registry(self._session, image, digest=None, version=version,
+                                      head=head)
         except (HTTPError, RetryError) as ex:
             if ex.response is None:
                 raise
+            if head and ex.response.status_code == requests.codes.method_not_allowed:
+                return self.get_manifest(image, version)
             if ex.response.status_code == requests.codes.unauthorized:
                 logger.warning('Requested parent/base image "%s" not found', image.to_str())
                 raise RuntimeError('Unable to fetch image: "{}"'
@@ -693,22 +832,47 @@ class RegistryClient(object):
             else:
                 raise
 
+        if head and not ('Content-Type' in response.headers and
+                         'Docker-Content-Digest' in response.headers):
+            logger.debug("HEAD response does not identify the manifest, using GET")
+            return self.get_manifest(image, version)
+
         if not manifest_is_media_type(response, media_type):
             logger.warning("content does not match expected media type")
             return None, saved_not_found
         logger.debug("content matches expected media type")
         return response, saved_not_found
 
+    def _probe_manifests(
+        self, image: ImageName, versions: Sequence[str]
+    ) -> List[Tuple[str, Optional[requests.Response], Optional[Exception]]]:
+        """Look up the manifests of the image in all the versions concurrently, with HEAD requests.
+
+        Every version is probed on its own: a registry may serve a manifest in
+        several versions (stored side by side, converted, or the default
+        platform manifest of a manifest list), so the version one response
+        was served in says nothing about the others.
+
+        :return: list of tuples (version, response, not found exception) as
+            returned by get_manifest, in the order of versions
+        """
+        probes = map_concurrently(lambda version: self.get_manifest(image, version, head=True),
+                                  versions, len(versions))
+        results = dict(probes)
+        return [(version, *results[index]) for index, version in enumerate(versions)]
+
     def get_manifest_digests(self,
                              image,
                              versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'),
-                             require_digest=True):
+                             require_digest=True,
+                             concurrent=False):
         """Return manifest digest for image.
 
         :param image: ImageName, the remote image to inspect
         :param versions: tuple, which manifest schema versions to fetch digest
         :param require_digest: bool, when True exception is thrown if no digest is
                                      set in the headers.
+        :param concurrent: bool, probe the versions concurrently, using HEAD requests
 
         :return: dict, versions mapped to their digest
         """
@@ -720,9 +884,14 @@ class RegistryClient(object):
         # This is interesting for the Pulp "retry until the manifest shows up" case.
         all_not_found = True
         saved_not_found = None
-        for version in versions:
+        if concurrent and versions:
+            manifests = self._probe_manifests(image, versions)
+        else:
+            manifests = (
+                (version, *self.get_manifest(image, version)) for version in versions
+            )
+        for version, response, saved_not_found in manifests:
             media_type = get_manifest_media_type(version)
-            response, saved_not_found = self.get_manifest(image, version)
 
             if saved_not_found is None:
                 all_not_found = False
@@ -984,7 +1153,8 @@ def get_manifest_media_version(digest):
 
 
 def query_registry(
-    registry_session, image: ImageName, digest=None, version='v1', is_blob=False
+    registry_session, image: ImageName, digest=None, version='v1', is_blob=False,
+    head: bool = False,
 ) -> requests.Response:
     """Return manifest digest for image.
 
@@ -993,6 +1163,7 @@ def query_registry(
     :param digest: str, digest of the image manifest
     :param version: str, which manifest schema version to fetch digest
     :param is_blob: bool, read blob config if set to True
+    :param head: bool, send a HEAD request instead of GET
 
     :return: requests.Response object
     """
@@ -1007,7 +1178,10 @@ def query_registry(
     url = '/v2/{}/{}/{}'.format(context, object_type, reference)
     logger.debug("query_registry: querying %s, headers: %s", url, headers)
 
-    response = registry_session.get(url, headers=headers)
+    if head:
+        response = registry_session.head(url, headers=headers)
+    else:
+        response = registry_session.get(url, headers=headers)
     for r in chain(response.history, [response]):
         logger.debug("query_registry: [%s] %s", r.status_code, r.url)
 
@@ -1077,7 +1251,8 @@ def get_manifest(image, registry_session, version):
 
 
 def get_manifest_digests(image, registry, insecure=False, dockercfg_path=None,
-                         versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True):
+                         versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True,
+                         concurrent=False):
     """Return manifest digest for image.
 
     :param image: ImageName, the remote image to inspect
@@ -1088,14 +1263,17 @@ def get_manifest_digests(image, registry, insecure=False, dockercfg_path=None,
     :param versions: tuple, which manifest schema versions to fetch digest
     :param require_digest: bool, when True exception is thrown if no digest is
                                  set in the headers.
+    :param concurrent: bool, see RegistryClient.get_manifest_digests
 
     :return: dict, versions mapped to their digest
     """
-    registry_session = RegistrySession(registry, insecure=insecure, dockercfg_path=dockercfg_path)
+    registry_session = registry_session_pool.get_session(registry, insecure=insecure,
+                                                         dockercfg_path=dockercfg_path)
     registry_client = RegistryClient(registry_session)
     return registry_client.get_manifest_digests(image=image,
                                                 versions=versions,
-                                                require_digest=require_digest)
+                                                require_digest=require_digest,
+                                                concurrent=concurrent)
 
 
 def get_manifest_list(image, registry, insecure=False, dockercfg_path=None):
@@ -1109,7 +1287,8 @@ def get_manifest_list(image, registry, insecure=False, dockercfg_path=None):
 
     :return: response, or None, with manifest list
     """
-    registry_session = RegistrySession(registry, insecure=insecure, dockercfg_path=dockercfg_path)
+    registry_session = registry_session_pool.get_session(registry, insecure=insecure,
+                                                         dockercfg_path=dockercfg_path)
     registry_client = RegistryClient(registry_session)
     return registry_client.get_manifest_list(image)
 
@@ -1127,7 +1306,8 @@ def get_all_manifests(image, registry, insecure=False, dockercfg_path=None,
 
     :return: dict of successful responses, with versions as keys
     """
-    registry_session = RegistrySession(registry, insecure=insecure, dockercfg_path=dockercfg_path)
+    registry_session = registry_session_pool.get_session(registry, insecure=insecure,
+                                                         dockercfg_path=dockercfg_path)
     registry_client = RegistryClient(registry_session)
     return registry_client.get_all_manifests(image, versions=versions)
 
@@ -1144,7 +1324,8 @@ def get_inspect_for_image(image, registry, insecure=False, dockercfg_path=None,
 
     :return: dict of inspected image
     """
-    registry_session = RegistrySession(registry, insecure=insecure, dockercfg_path=dockercfg_path)
+    registry_session = registry_session_pool.get_session(registry, insecure=insecure,
+                                                         dockercfg_path=dockercfg_path)
     registry_client = RegistryClient(registry_session)
     return registry_client.get_inspect_for_image(image, arch=arch)
 
@@ -1169,7 +1350,8 @@ def get_config_and_id_from_registry(
 
     :return: tuple, (image config, config digest)
     """
-    registry_session = RegistrySession(registry, insecure=insecure, dockercfg_path=dockercfg_path)
+    registry_session = registry_session_pool.get_session(registry, insecure=insecure,
+                                                         dockercfg_path=dockercfg_path)
     registry_client = RegistryClient(registry_session)
     return registry_client.get_config_and_id_from_registry(image, digest, version=version)
 
@@ -1993,3 +2175,130 @@ def safe_extractall(tar: tarfile.TarFile, path: str = '.',
         check_path(member)
 
     tar.extractall(path, members=tar_members, numeric_owner=numeric_owner)
+
+
+class PathSuffixMatcher(object):
+    """
+    Check if paths end with any of a set of paths, e.g. a denylist
+
+    The paths are kept in a trie of their components in reverse order, so
+    checking a path takes time proportional to its depth rather than to the
+    number of paths in the set. Only whole components match: 'vendor/foo'
+    matches 'src/vendor/foo' but not 'src/vendor/xfoo'. Empty components,
+    e.g. from leading or trailing slashes, are ignored.
+    """
+
+    # marks the nodes where a path of the set ends; the other keys are components
+    _END = None
+
+    def __init__(self, paths: typing.Iterable[str] = ()):
+        """
+        :param paths: iterable of str, paths to match
+        """
+        self._root: Dict[Optional[str], Any] = {}
+        self._len = 0
+        for path in paths:
+            self.add(path)
+
+    def __len__(self):
+        return self._len
+
+    @staticmethod
+    def _reversed_components(path: str) -> Iterator[str]:
+        return (component for component in reversed(path.split('/')) if component)
+
+    def add(self, path: str) -> None:
+        """Add a path to the set
+
+        :param path: str, path to match
+        :raises ValueError: if the path has no components
+        """
+        node = self._root
+        for component in self._reversed_components(path):
+            node = node.setdefault(component, {})
+        if node is self._root:
+            raise ValueError('Cannot match empty path {!r}'.format(path))
+        if self._END not in node:
+            node[self._END] = True
+            self._len += 1
+
+    def matches(self, path: str) -> bool:
+        """Check if the path ends with any path of the set
+
+        :param path: str, path to check
+        :return: bool
+        """
+        node = self._root
+        for component in self._reversed_components(path):
+            child: Optional[Dict[Optional[str], Any]] = node.get(component)
+            if child is None:
+                return False
+            if self._END in child:
+                return True
+            node = child
+        return False
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int,
+    limit_key: Optional[Callable[[T], Hashable]] = None,
+    max_per_key: int = 1,
+) -> Iterator[Tuple[int, R]]:
+    """
+    Call func for every item in a thread pool
+
+    Items are processed in the calling thread if there is just one of them or
+    max_workers is 1. The first failure cancels the calls which have not
+    started yet and is re-raised once the running ones are finished. The
+    same happens when the caller stops iterating over the results early.
+
+    :param func: callable called with every item
+    :param items: iterable of items to call func with
+    :param max_workers: int, maximum number of calls running at once
+    :param limit_key: optional callable, the key of an item, e.g. its host
+    :param max_per_key: int, maximum number of calls running at once for
+                        items with the same key, if limit_key is given
+    :return: iterator of (index of item, result of func) tuples, in the order
+             the calls finished
+    """
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        for index, item in enumerate(items):
+            yield index, func(item)
+        return
+
+    limits: Dict[Hashable, threading.BoundedSemaphore] = {}
+    if limit_key is not None:
+        for item in items:
+            key = limit_key(item)
+            if key not in limits:
+                limits[key] = threading.BoundedSemaphore(max_per_key)
+    failed = threading.Event()
+
+    def call(item: T) -> Optional[R]:
+        limit: typing.ContextManager[Any] = nullcontext()
+        if limit_key is not None:
+            limit = limits[limit_key(item)]
+        with limit:
+            # do not start new calls once one of them has failed
+            if failed.is_set():
+                return None
+            return func(item)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(call, item): index for index, item in enumerate(items)}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], typing.cast(R, future.result())
+        except BaseException:
+            # GeneratorExit included, when the caller stops iterating
+            failed.set()
+            for future in futures:
+                future.cancel()
+            raise
@@ -16,6 +16,7 @@ from typing import List, Dict
 from atomic_reactor.constants import REMOTE_SOURCE_TARBALL_FILENAME
 from atomic_reactor.download import download_url
 from atomic_reactor.util import get_retrying_requests_session
+from atomic_reactor.utils.polling import Poller, PollingStats
 
 
 logger = logging.getLogger(__name__)
@@ -41,10 +42,12 @@ class CachitoAPIRequestTimeout(CachitoAPIError):
 
 class CachitoAPI(object):
 
-    def __init__(self, api_url, insecure=False, cert=None, timeout=None):
+    def __init__(self, api_url, insecure=False, cert=None, timeout=None, download_segments=1):
         self.api_url = api_url
         self.session = self._make_session(insecure=insecure, cert=cert)
         self.timeout = 3600 if timeout is None else timeout
+        self.download_segments = download_segments
+        self.polling_stats = PollingStats()
 
     def _make_session(self, insecure, cert):
         # method_whitelist=False allows retrying non-idempotent methods like POST
@@ -103,12 +106,16 @@ class CachitoAPI(object):
             self, request, burst_retry=3, burst_length=30, slow_retry=10):
         """Wait for a Cachito request to complete
 
+        The delay between retries grows exponentially after the burst length,
+        unless Cachito asks for a specific delay in the Retry-After header.
+
         :param request: int or dict, either the Cachito request ID or a dict with 'id' key
         :param burst_retry: int, seconds to wait between retries prior to exceeding
                             the burst length
-        :param burst_length: int, seconds to switch to slower retry period
-        :param slow_retry: int, seconds to wait between retries after exceeding
-                           the burst length
+        :param burst_length: int, seconds to start backing off after, counted
+                             from the last update of the request
+        :param slow_retry: int, maximum seconds to wait between retries after
+                           exceeding the burst length
 
         :return: dict, latest representation of the Cachito request
         :raise CachitoAPIUnsuccessfulRequest: if the request completes unsuccessfully
@@ -119,6 +126,8 @@ class CachitoAPI(object):
         log_url = f'{url}/logs'
         logger.info('Waiting for request %s to complete...', request_id)
 
+        poller = Poller(self.polling_stats, initial_delay=burst_retry,
+                        burst_length=burst_length, max_delay=slow_retry)
         last_updated_value = None
         last_update_time = None
         while True:
@@ -145,6 +154,7 @@ class CachitoAPI(object):
                     Request %s is complete
                     Request url: %s
                     """), request_id, url)
+                poller.done()
                 return response_json
 
             # All other states are expected to be transient and are not checked.
@@ -155,6 +165,7 @@ class CachitoAPI(object):
             if last_updated_value is None or last_updated_value != response_json['updated']:
                 last_updated_value = response_json['updated']
                 last_update_time = time.time()
+                poller.reset()
 
             elapsed = time.time() - last_update_time
             if elapsed > self.timeout:
@@ -166,10 +177,7 @@ class CachitoAPI(object):
                     'Request %s not completed after %s seconds of not being updated'
                     % (url, self.timeout))
             else:
-                if elapsed > burst_length:
-                    time.sleep(slow_retry)
-                else:
-                    time.sleep(burst_retry)
+                poller.wait(response)
 
     def download_sources(self, request, dest_dir='.', dest_filename=REMOTE_SOURCE_TARBALL_FILENAME):
         """Download the sources from a Cachito request
@@ -183,7 +191,8 @@ class CachitoAPI(object):
         url = self.assemble_download_url(request_id)
         dest_path = download_url(
             url, dest_dir=dest_dir, insecure=not self.session.verify, session=self.session,
-            dest_filename=dest_filename, verify_cachito_digest=True)
+            dest_filename=dest_filename, verify_cachito_digest=True,
+            segments=self.download_segments)
         logger.debug('Sources bundle for request %d downloaded to %s', request_id, dest_path)
         return dest_path
 
@@ -0,0 +1,222 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Node-local cache of digests which image tags resolved to, shared by builds.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from osbs.utils import ImageName
+
+logger = logging.getLogger(__name__)
+
+
+class DigestCache(object):
+    """
+    Cache of tag -> digest resolutions with a time to live
+
+    Tags are mutable, so an entry is only used for ttl seconds after it was
+    stored. Tags matching one of the floating_tags patterns (e.g. latest)
+    are expected to move too often to be cached and always bypass the
+    cache, as do references which already are digests.
+
+    Every entry is a JSON file named by the hash of its key, written under
+    a temporary name and renamed, so the directory can be shared by builds
+    running concurrently, e.g. on a shared volume.
+
+    Expired entries are removed when they are looked up and, so that entries
+    which are never looked up again do not pile up, by prune(), which put()
+    runs at most once every prune_interval seconds.
+    """
+
+    prune_interval = 60
+
+    def __init__(self, path, ttl: float, floating_tags: Iterable[str] = ()):
+        """
+        :param path: str, directory holding the cache, created if missing
+        :param ttl: float, seconds for which a cached digest is used
+        :param floating_tags: iterable of str, fnmatch patterns of tags which
+            are never cached
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.floating_tags = list(floating_tags)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._last_prune: Optional[float] = None
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._as_dict(self.hits, self.misses, self.expired, self.bypassed)
+
+    @staticmethod
+    def _as_dict(hits, misses, expired, bypassed) -> Dict[str, Any]:
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'expired': expired,
+            'bypassed': bypassed,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def add_to(self, digest_cache_stats: Dict[str, Dict[str, Any]], consumer: str) -> None:
+        """Add the statistics of this cache to the ones already collected for consumer
+
+        :param digest_cache_stats: dict, consumer name -> statistics as returned
+            by stats, e.g. workflow.data.digest_cache_stats
+        :param consumer: str, name of the plugin which used the cache
+        """
+        current = self.stats
+        previous = digest_cache_stats.get(consumer, {})
+        digest_cache_stats[consumer] = self._as_dict(
+            *(current[key] + previous.get(key, 0)
+              for key in ('hits', 'misses', 'expired', 'bypassed'))
+        )
+
+    def is_cacheable(self, image: ImageName) -> bool:
+        """Can the digest of the image be cached?
+
+        :param image: ImageName
+        :return: bool
+        """
+        tag = image.tag or 'latest'
+        if tag.startswith('sha256:'):
+            return False
+        return not any(fnmatch.fnmatchcase(tag, pattern) for pattern in self.floating_tags)
+
+    def _entry_path(self, kind: str, image: ImageName) -> Path:
+        key = '{}\0{}'.format(kind, image.to_str())
+        return self.path / '{}.json'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def get(self, kind: str, image: ImageName) -> Optional[Any]:
+        """Get the cached digest of image
+
+        :param kind: str, what the image was resolved to, e.g. 'manifest_list_digest'
+        :param image: ImageName
+        :return: the value stored by put(), or None if it is missing or expired
+        """
+        if not self.is_cacheable(image):
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        entry_path = self._entry_path(kind, image)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError):
+            logger.warning('removing corrupted entry %s from digest cache', entry_path)
+            self._remove(entry_path)
+            entry = None
+
+        if entry is not None and entry['expires'] <= time.time():
+            logger.debug('cached %s of %s expired', kind, image)
+            self._remove(entry_path)
+            with self._lock:
+                self.expired += 1
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logger.debug('using cached %s of %s', kind, image)
+        return entry['value']
+
+    def put(self, kind: str, image: ImageName, value: Any) -> None:
+        """Cache the digest of image for ttl seconds
+
+        :param kind: str, what the image was resolved to, e.g. 'manifest_list_digest'
+        :param image: ImageName
+        :param value: JSON serializable digest, or digests, of image
+        """
+        if not self.is_cacheable(image):
+            return
+
+        entry_path = self._entry_path(kind, image)
+        tmp_path = self.path / '.{}.{}'.format(entry_path.name, uuid.uuid4().hex)
+        entry = {
+            'image': image.to_str(),
+            'kind': kind,
+            'value': value,
+            'expires': time.time() + self.ttl,
+        }
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # the cache is only an optimization, never fail the build
+            logger.warning('failed to add %s of %s to digest cache', kind, image, exc_info=True)
+            self._remove(tmp_path)
+
+        with self._lock:
+            now = time.monotonic()
+            prune = self._last_prune is None or now - self._last_prune >= self.prune_interval
+            if prune:
+                self._last_prune = now
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Remove expired entries, and temporary files left behind, from the cache
+
+        Files are considered expired once they are older than ttl.
+
+        :return: int, number of removed files
+        """
+        cutoff = time.time() - self.ttl
+        removed = 0
+        try:
+            files = list(os.scandir(self.path))
+        except OSError:
+            logger.debug('failed to list digest cache %s', self.path, exc_info=True)
+            return removed
+
+        for file in files:
+            if not (file.name.endswith('.json') or file.name.startswith('.')):
+                continue
+            try:
+                expired = file.is_file() and file.stat().st_mtime <= cutoff
+            except OSError:
+                # removed by another build meanwhile
+                continue
+            if expired:
+                self._remove(Path(file.path))
+                removed += 1
+
+        if removed:
+            logger.debug('removed %d expired entries from digest cache', removed)
+        return removed
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.debug('failed to remove %s from digest cache', path, exc_info=True)
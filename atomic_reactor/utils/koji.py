@@ -421,7 +421,8 @@ def get_output(workflow: DockerBuildWorkflow,
 
     digests = get_manifest_digests(pullspec, workflow.conf.registry['uri'],
                                    workflow.conf.registry['insecure'],
-                                   workflow.conf.registry.get('secret', None))
+                                   workflow.conf.registry.get('secret', None),
+                                   concurrent=True)
 
     if digests.v2:
         config_manifest_digest = digests.v2
@@ -6,15 +6,20 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+from concurrent.futures import Future, wait
 import json
-from typing import Tuple
+import threading
+from typing import Callable, Dict, Iterable, List, Set, Tuple, TypeVar
 import requests
 
 from atomic_reactor.plugin import PluginFailedException
-from atomic_reactor.util import RegistrySession, ManifestDigest
+from atomic_reactor.util import ManifestDigest, map_concurrently, registry_session_pool
 from atomic_reactor.constants import (MEDIA_TYPE_DOCKER_V2_SCHEMA2,
                                       MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST, MEDIA_TYPE_OCI_V1,
-                                      MEDIA_TYPE_OCI_V1_INDEX)
+                                      MEDIA_TYPE_OCI_V1_INDEX,
+                                      DEFAULT_REGISTRY_PUSH_MAX_WORKERS)
+
+T = TypeVar('T')
 
 
 class ManifestUtil(object):
@@ -25,9 +30,31 @@ class ManifestUtil(object):
         MEDIA_TYPE_OCI_V1_INDEX
     )
 
-    def __init__(self, workflow, log):
+    def __init__(self, workflow, log, max_workers=DEFAULT_REGISTRY_PUSH_MAX_WORKERS):
+        """
+        :param workflow: DockerBuildWorkflow instance
+        :param log: logger to log into
+        :param max_workers: int, maximum number of blobs mounted or manifests
+                            stored concurrently
+        """
         self.registry = workflow.conf.registry
         self.log = log
+        self.max_workers = max_workers
+        # (target repo, digest) of blobs linked into target repos
+        self._linked_blobs: Set[Tuple[str, str]] = set()
+        # (target repo, digest) of blobs being linked, mapped to the futures
+        # the links finish with
+        self._linking_blobs: Dict[Tuple[str, str], Future] = {}
+        self._linked_blobs_lock = threading.Lock()
+
+    def run_concurrently(self, func: Callable[[T], None], items: Iterable[T]) -> None:
+        """
+        Call func for every item in a thread pool
+
+        The first failure cancels the calls which have not started yet and is
+        re-raised once the running ones are finished.
+        """
+        list(map_concurrently(func, items, self.max_workers))
 
     def valid_media_type(self, media_type):
         return media_type in self.manifest_media_types
@@ -78,15 +105,73 @@ class ManifestUtil(object):
             # we're starting an upload - but we've checked that above
             raise RuntimeError("Blob mount had unexpected status {}".format(result.status_code))
 
-    def link_manifest_references_into_repository(self, session, manifest, media_type,
-                                                 source_repo, target_repo):
-        """
-        Links all the blobs referenced by the manifest from source_repo into target_repo.
+    def link_blobs_into_repositories(self, session, links: Iterable[Tuple[str, str, str]]):
         """
+        Links blobs into repositories concurrently.
 
-        if source_repo == target_repo:
-            return
+        Every blob is linked into a target repository at most once per ManifestUtil,
+        links of blobs which were already linked, and links within a single repository,
+        are skipped. Links of blobs being linked by another call are waited for.
+        A link which fails, or does not run because another one failed, is forgotten,
+        the next call linking the blob tries it again.
 
+        :param links: iterable of (digest, source_repo, target_repo) tuples
+        """
+        to_link: List[Tuple[Tuple[str, str, str], Future]] = []
+        to_wait: List[Tuple[Tuple[str, str, str], Future]] = []
+        with self._linked_blobs_lock:
+            for blob_link in links:
+                digest, source_repo, target_repo = blob_link
+                key = (target_repo, digest)
+                if source_repo == target_repo or key in self._linked_blobs:
+                    continue
+                if key in self._linking_blobs:
+                    to_wait.append((blob_link, self._linking_blobs[key]))
+                    continue
+                future: Future = Future()
+                self._linking_blobs[key] = future
+                to_link.append((blob_link, future))
+
+        def finish(blob_link, future, exception=None):
+            digest, _, target_repo = blob_link
+            with self._linked_blobs_lock:
+                del self._linking_blobs[(target_repo, digest)]
+                if exception is None:
+                    self._linked_blobs.add((target_repo, digest))
+            if exception is None:
+                future.set_result(None)
+            else:
+                future.set_exception(exception)
+
+        def link(item):
+            blob_link, future = item
+            try:
+                self.link_blob_into_repository(session, *blob_link)
+            except BaseException as ex:
+                finish(blob_link, future, ex)
+                raise
+            finish(blob_link, future)
+
+        try:
+            self.run_concurrently(link, to_link)
+        finally:
+            for blob_link, future in to_link:
+                if not future.done():
+                    digest, _, target_repo = blob_link
+                    with self._linked_blobs_lock:
+                        del self._linking_blobs[(target_repo, digest)]
+                    future.cancel()
+
+        wait([future for _, future in to_wait])
+        failed = [blob_link for blob_link, future in to_wait
+                  if future.cancelled() or future.exception() is not None]
+        if failed:
+            self.link_blobs_into_repositories(session, failed)
+
+    def get_manifest_references(self, manifest: bytes, media_type) -> List[str]:
+        """
+        Get digests of all the blobs referenced by the manifest.
+        """
         parsed = json.loads(manifest.decode('utf-8'))
 
         references = []
@@ -99,8 +184,21 @@ class ManifestUtil(object):
             # we never copy a manifest list as a whole between repositories
             raise RuntimeError("Unhandled media-type {}".format(media_type))
 
-        for digest in references:
-            self.link_blob_into_repository(session, digest, source_repo, target_repo)
+        return references
+
+    def link_manifest_references_into_repository(self, session, manifest, media_type,
+                                                 source_repo, target_repo):
+        """
+        Links all the blobs referenced by the manifest from source_repo into target_repo.
+        """
+
+        if source_repo == target_repo:
+            return
+
+        references = self.get_manifest_references(manifest, media_type)
+        self.link_blobs_into_repositories(
+            session, [(digest, source_repo, target_repo) for digest in references]
+        )
 
     def store_manifest_in_repository(self, session, manifest: bytes, media_type,
                                      source_repo, target_repo, ref=None):
@@ -124,17 +222,29 @@ class ManifestUtil(object):
         insecure = self.registry.get('insecure', False)
         secret_path = self.registry.get('secret')
 
-        return RegistrySession(self.registry['uri'], insecure=insecure,
-                               dockercfg_path=secret_path,
-                               access=('pull', 'push'))
+        return registry_session_pool.get_session(self.registry['uri'], insecure=insecure,
+                                                 dockercfg_path=secret_path,
+                                                 access=('pull', 'push'))
 
     def add_tag_and_manifest(self, session, image_manifest: bytes, media_type,
                              source_repo, configured_tags):
-        for image in configured_tags:
+        # link the blobs once per target repo, not once per tag
+        target_repos = dict.fromkeys(image.to_str(registry=False, tag=False)
+                                     for image in configured_tags)
+        references = self.get_manifest_references(image_manifest, media_type)
+        self.link_blobs_into_repositories(
+            session,
+            [(digest, source_repo, target_repo)
+             for target_repo in target_repos for digest in references]
+        )
+
+        def store(image):
             target_repo = image.to_str(registry=False, tag=False)
             self.store_manifest_in_repository(session, image_manifest, media_type,
                                               source_repo, target_repo, ref=image.tag)
 
+        self.run_concurrently(store, configured_tags)
+
     def tag_manifest_into_registry(self, session, digest: str, source_repo, configured_tags):
         """
         Tags the manifest identified by digest into session.registry with all the
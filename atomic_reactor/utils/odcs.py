@@ -7,6 +7,7 @@ of the BSD license. See the LICENSE file for details.
 """
 
 from atomic_reactor.util import get_retrying_requests_session
+from atomic_reactor.utils.polling import Poller, PollingStats
 from textwrap import dedent
 
 import json
@@ -52,6 +53,7 @@ class ODCSClient(object):
                  kerberos_auth=None, timeout=None):
         self.url = url
         self.timeout = self.DEFAULT_WAIT_TIMEOUT if timeout is None else timeout
+        self.polling_stats = PollingStats()
         self._setup_session(insecure=insecure, token=token, cert=cert, kerberos_auth=kerberos_auth)
 
     def _setup_session(self, insecure, token, cert, kerberos_auth):
@@ -172,46 +174,84 @@ class ODCSClient(object):
         :param compose_id: int, compose ID to wait for
         :param burst_retry: int, seconds to wait between retries prior to exceeding
                             the burst length
-        :param burst_length: int, seconds to switch to slower retry period
-        :param slow_retry: int, seconds to wait between retries after exceeding
-                           the burst length
+        :param burst_length: int, seconds to start backing off after
+        :param slow_retry: int, maximum seconds to wait between retries after
+                           exceeding the burst length
 
         :return: dict, updated status of compose.
         :raise RuntimeError: if state_name becomes 'failed'
         """
-        logger.debug("Getting compose information for information for compose_id=%s",
-                     compose_id)
+        return self.wait_for_composes([compose_id],
+                                      burst_retry=burst_retry,
+                                      burst_length=burst_length,
+                                      slow_retry=slow_retry)[0]
+
+    def wait_for_composes(self, compose_ids,
+                          burst_retry=1,
+                          burst_length=30,
+                          slow_retry=10):
+        """Wait for several compose requests to finalize
+
+        All composes which are still in progress are polled together in a single
+        loop, so waiting takes as long as the slowest compose rather than the sum
+        of all of them. Finished composes are not polled again. The delay between
+        retries grows exponentially after the burst length, unless ODCS asks for
+        a specific delay in the Retry-After header.
+
+        :param compose_ids: list<int>, compose IDs to wait for
+        :param burst_retry: int, seconds to wait between retries prior to exceeding
+                            the burst length
+        :param burst_length: int, seconds to start backing off after
+        :param slow_retry: int, maximum seconds to wait between retries after
+                           exceeding the burst length
+
+        :return: list<dict>, updated status of composes, in the order of compose_ids
+        :raise RuntimeError: if state_name of any compose becomes 'failed'
+        :raise WaitComposeToFinishTimeout: if any compose is still in progress
+                                           after the timeout
+        """
+        logger.debug("Getting compose information for compose_ids=%s", compose_ids)
+        finished = {}
+        latencies = []
+        pending = list(dict.fromkeys(compose_ids))
+        poller = Poller(self.polling_stats, initial_delay=burst_retry,
+                        burst_length=burst_length, max_delay=slow_retry)
         start_time = time.time()
         while True:
-            response = self.session.get(self._get_compose_url(compose_id))
-            response.raise_for_status()
-            response_json = response.json()
-
-            if response_json['state_name'] == 'failed':
-                state_reason = response_json.get('state_reason', 'Unknown')
-                logger.error(dedent("""\
-                   Compose %s failed: %s
-                   Details: %s
-                   """), compose_id, state_reason, json.dumps(response_json, indent=4))
-                raise RuntimeError('Failed request for compose_id={}: {}'
-                                   .format(compose_id, state_reason))
-
-            if response_json['state_name'] not in ['wait', 'generating']:
-                logger.debug("Retrieved compose information for compose_id=%s: %s",
-                             compose_id, json.dumps(response_json, indent=4))
-                return response_json
+            poll_responses = []
+            for compose_id in list(pending):
+                response = self.session.get(self._get_compose_url(compose_id))
+                response.raise_for_status()
+                response_json = response.json()
+                poll_responses.append(response)
+
+                if response_json['state_name'] == 'failed':
+                    state_reason = response_json.get('state_reason', 'Unknown')
+                    logger.error(dedent("""\
+                       Compose %s failed: %s
+                       Details: %s
+                       """), compose_id, state_reason, json.dumps(response_json, indent=4))
+                    raise RuntimeError('Failed request for compose_id={}: {}'
+                                       .format(compose_id, state_reason))
+
+                if response_json['state_name'] not in ['wait', 'generating']:
+                    logger.debug("Retrieved compose information for compose_id=%s: %s",
+                                 compose_id, json.dumps(response_json, indent=4))
+                    finished[compose_id] = response_json
+                    latencies.append(poller.elapsed)
+                    pending.remove(compose_id)
+
+            if not pending:
+                poller.done(latencies)
+                return [finished[compose_id] for compose_id in compose_ids]
 
             elapsed = time.time() - start_time
             if elapsed > self.timeout:
-                raise WaitComposeToFinishTimeout(compose_id, self.timeout)
+                raise WaitComposeToFinishTimeout(pending[0], self.timeout)
             else:
-                logger.debug("Retrying request compose_id=%s, elapsed_time=%s",
-                             compose_id, elapsed)
-
-                if elapsed > burst_length:
-                    time.sleep(slow_retry)
-                else:
-                    time.sleep(burst_retry)
+                logger.debug("Retrying request compose_ids=%s, elapsed_time=%s",
+                             pending, elapsed)
+                poller.wait(*poll_responses)
 
     def cancel_compose(self, compose_id):
         """Cancel a compose by sending a DELETE request with compose id"""
@@ -0,0 +1,174 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Helpers for polling remote services (Cachito, ODCS) until a request is done.
+"""
+
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the buckets of polling latency histograms
+LATENCY_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+LATENCY_BUCKET_INF = '+Inf'
+
+
+def get_retry_after(response) -> Optional[float]:
+    """Get the delay requested by a server in the Retry-After header
+
+    :param response: requests.Response, response to inspect
+    :return: float, seconds to wait before the next request, or None if
+        the header is missing or cannot be parsed
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.debug('Ignoring invalid Retry-After header: %s', value)
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class PollingStats(object):
+    """Polling statistics of a single service
+
+    Counts the polls and the time spent sleeping between them, and keeps
+    a histogram of how long it took for the polled requests to complete.
+    """
+
+    def __init__(self):
+        self.polls = 0
+        self.wait_time = 0.0
+        # upper bound of the time requests were already done, but not polled yet
+        self.wasted_wait_time = 0.0
+        self.latency_histogram = {str(bucket): 0 for bucket in LATENCY_BUCKETS}
+        self.latency_histogram[LATENCY_BUCKET_INF] = 0
+
+    def observe_latency(self, seconds: float) -> None:
+        for bucket in LATENCY_BUCKETS:
+            if seconds <= bucket:
+                self.latency_histogram[str(bucket)] += 1
+                return
+        self.latency_histogram[LATENCY_BUCKET_INF] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'polls': self.polls,
+            'wait_time': round(self.wait_time, 3),
+            'wasted_wait_time': round(self.wasted_wait_time, 3),
+            'latency_histogram': dict(self.latency_histogram),
+        }
+
+    def add_to(self, polling_stats: Dict[str, Dict[str, Any]], service: str) -> None:
+        """Add these statistics to the ones already collected for service
+
+        :param polling_stats: dict, service name -> statistics as returned by
+            as_dict(), e.g. workflow.data.polling_stats
+        :param service: str, name of the polled service
+        """
+        current = self.as_dict()
+        previous = polling_stats.get(service)
+        if previous:
+            for key in ('polls', 'wait_time', 'wasted_wait_time'):
+                current[key] = round(current[key] + previous.get(key, 0), 3)
+            for bucket, count in previous.get('latency_histogram', {}).items():
+                current['latency_histogram'][bucket] = (
+                    current['latency_histogram'].get(bucket, 0) + count)
+        polling_stats[service] = current
+
+
+class Poller(object):
+    """Sleep between polls of a service
+
+    Polls are done every initial_delay seconds during the first burst_length
+    seconds, then the delay grows exponentially up to max_delay. Delays after
+    the burst are randomly shortened by up to the jitter fraction so that
+    clients waiting for the same service do not poll in lockstep. A delay
+    requested by the server in a Retry-After header always takes precedence.
+    """
+
+    def __init__(self, stats: Optional[PollingStats] = None, initial_delay: float = 1,
+                 burst_length: float = 30, max_delay: float = 10, factor: float = 2,
+                 jitter: float = 0.25):
+        """
+        :param stats: PollingStats, statistics to record the polling into
+        :param initial_delay: float, seconds to wait between polls during the burst
+        :param burst_length: float, seconds to start backing off after
+        :param max_delay: float, maximum seconds to wait between polls
+        :param factor: float, multiplier of the delay after each poll
+        :param jitter: float, fraction of the delay which is randomized
+        """
+        self.stats = stats
+        self.initial_delay = initial_delay
+        self.burst_length = burst_length
+        self.max_delay = max(max_delay, initial_delay)
+        self.factor = factor
+        self.jitter = jitter
+
+        self.polls = 0
+        self.wait_time = 0.0
+        self.last_delay = 0.0
+        self._start_time = time.monotonic()
+        self._burst_start_time = self._start_time
+        self._backoff_steps = 0
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since polling started"""
+        return time.monotonic() - self._start_time
+
+    def reset(self) -> None:
+        """Start polling quickly again, e.g. when the server reported progress"""
+        self._burst_start_time = time.monotonic()
+        self._backoff_steps = 0
+
+    def _next_delay(self) -> float:
+        if time.monotonic() - self._burst_start_time < self.burst_length:
+            return self.initial_delay
+        delay = min(self.initial_delay * self.factor ** self._backoff_steps, self.max_delay)
+        self._backoff_steps += 1
+        return delay * (1 - self.jitter * random.random())
+
+    def wait(self, *responses) -> float:
+        """Sleep until the next poll
+
+        :param responses: requests.Response, responses of the last poll, the
+            longest delay requested by their Retry-After headers is honored
+        :return: float, seconds slept
+        """
+        self.polls += 1
+        retry_after = [delay for delay in map(get_retry_after, responses) if delay is not None]
+        delay = max(retry_after) if retry_after else self._next_delay()
+        time.sleep(delay)
+        self.wait_time += delay
+        self.last_delay = delay
+        return delay
+
+    def done(self, latencies: Optional[Iterable[float]] = None) -> None:
+        """Record the final poll into the statistics
+
+        :param latencies: iterable of float, seconds each polled request took
+            to complete, by default a single request which took elapsed seconds
+        """
+        self.polls += 1
+        if self.stats is None:
+            return
+        self.stats.polls += self.polls
+        self.stats.wait_time += self.wait_time
+        self.stats.wasted_wait_time += self.last_delay
+        for latency in [self.elapsed] if latencies is None else latencies:
+            self.stats.observe_latency(latency)
@@ -0,0 +1,235 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Opt-in profiling of plugins: resource usage and, optionally, cProfile stats.
+"""
+
+import cProfile
+import json
+import logging
+import resource
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Generator
+
+import requests
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+from atomic_reactor.constants import PLUGINS_PROFILING_CPROFILE
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer(__name__)
+
+
+class _Counters(object):
+    """Process-wide counters of events which are not accounted by the kernel
+
+    The counting wrappers are only installed while at least one plugin is
+    being profiled, the original functions are restored afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._originals: Dict[str, Any] = {}
+        self.network_requests = 0
+        self.subprocesses = 0
+
+    def start(self) -> None:
+        """Start counting, until stop() is called as many times as start()"""
+        with self._lock:
+            self._users += 1
+            if self._users > 1:
+                return
+
+            send = requests.Session.send
+            popen_init = subprocess.Popen.__init__
+            counters = self
+
+            def counting_send(session, request, **kwargs):
+                with counters._lock:
+                    counters.network_requests += 1
+                return send(session, request, **kwargs)
+
+            def counting_popen_init(popen, *args, **kwargs):
+                with counters._lock:
+                    counters.subprocesses += 1
+                popen_init(popen, *args, **kwargs)
+
+            self._originals = {'send': send, '__init__': popen_init}
+            setattr(requests.Session, 'send', counting_send)
+            setattr(subprocess.Popen, '__init__', counting_popen_init)
+
+    def stop(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            setattr(requests.Session, 'send', self._originals.pop('send'))
+            setattr(subprocess.Popen, '__init__', self._originals.pop('__init__'))
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'network_requests': self.network_requests,
+                'subprocesses': self.subprocesses,
+            }
+
+
+_counters = _Counters()
+
+
+def _read_proc_io() -> Dict[str, int]:
+    """Get bytes read from and written to storage by this process, Linux only"""
+    io_bytes = {}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('read_bytes', 'write_bytes'):
+                    io_bytes[name] = int(value)
+    except OSError:
+        pass
+    return io_bytes
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS of this process to the current RSS, Linux only"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def _read_peak_rss() -> int:
+    """Get the peak RSS of this process in bytes"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PluginsProfiler(object):
+    """Measure the resources used by plugins
+
+    For every plugin, the profile is written to <output_dir>/<plugin key>.json
+    (and <plugin key>.pstats with cProfile stats) and set as the attributes
+    of a tracing span of the plugin.
+
+    Apart from the CPU time of the thread running the plugin, the values are
+    measured for the whole process, so they include the resources used by the
+    plugins running concurrently, if any.
+    """
+
+    def __init__(self, mode: str, output_dir: Path):
+        """
+        :param mode: str, PLUGINS_PROFILING_RESOURCES or PLUGINS_PROFILING_CPROFILE
+        :param output_dir: Path, directory to write the profiles to
+        """
+        self.mode = mode
+        self.output_dir = output_dir
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._cprofile_active = False
+        # plugins may run in other threads than the one which started tracing
+        self._trace_context = otel_context.get_current()
+
+    def _measure(self) -> Dict[str, Any]:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {
+            'wall_time': time.monotonic(),
+            'cpu_time': usage.ru_utime + usage.ru_stime,
+            'thread_cpu_time': time.thread_time(),
+            'subprocess_cpu_time': children_usage.ru_utime + children_usage.ru_stime,
+            **_read_proc_io(),
+            **_counters.snapshot(),
+        }
+
+    @contextmanager
+    def _cprofile(self, plugin_key: str) -> Generator[None, None, None]:
+        with self._lock:
+            # only a single profiler can be active in a process
+            enabled = not self._cprofile_active
+            self._cprofile_active = True
+        if not enabled:
+            logger.warning("cProfile is already running, not profiling plugin %s", plugin_key)
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._cprofile_active = False
+            profiler.dump_stats(self.output_dir / f'{plugin_key}.pstats')
+
+    @contextmanager
+    def profile(self, plugin_key: str) -> Generator[None, None, None]:
+        """Profile the plugin running in the context
+
+        :param plugin_key: str, key of the plugin
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            # resetting the peak would lose the peak of the plugins already running
+            peak_rss_reset = self._active == 0 and _reset_peak_rss()
+            self._active += 1
+
+        span_name = f'plugin_{plugin_key}'
+        with tracer.start_as_current_span(span_name, context=self._trace_context) as span:
+            _counters.start()
+            start = self._measure()
+            try:
+                if self.mode == PLUGINS_PROFILING_CPROFILE:
+                    with self._cprofile(plugin_key):
+                        yield
+                else:
+                    yield
+            finally:
+                end = self._measure()
+                _counters.stop()
+                with self._lock:
+                    self._active -= 1
+
+                profile: Dict[str, Any] = {
+                    name: round(end[name] - start[name], 6)
+                    if isinstance(end[name], float) else end[name] - start[name]
+                    for name in end if name in start
+                }
+                profile['peak_rss'] = _read_peak_rss()
+                profile['peak_rss_since_start'] = peak_rss_reset
+
+                for name, value in profile.items():
+                    span.set_attribute(name, value)
+                self.profiles[plugin_key] = profile
+                self._dump(plugin_key, profile)
+
+    def _dump(self, plugin_key: str, profile: Dict[str, Any]) -> None:
+        path = self.output_dir / f'{plugin_key}.json'
+        try:
+            with open(path, 'w') as f:
+                json.dump(profile, f, indent=2)
+        except OSError:
+            logger.exception("failed to save the profile of plugin %s", plugin_key)
+        logger.debug("profile of plugin %s: %s", plugin_key, profile)
@@ -11,16 +11,24 @@ import logging
 import os
 import paramiko
 import random
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime
 from functools import cached_property
 from shlex import quote
-from typing import List, Optional, Tuple, Set
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Set
 from paramiko.channel import ChannelFile  # just for type annotation
+from atomic_reactor.constants import DEFAULT_REMOTE_HOST_PROBE_WORKERS
 from atomic_reactor.utils.rpm import rpm_qf_args
 
 SSH_COMMAND_TIMEOUT = 30
+# seconds between keepalive packets sent over idle SSH connections
+SSH_KEEPALIVE_INTERVAL = 30
+# SSH connections idle for longer than this are checked before they are reused
+SSH_HEALTH_CHECK_INTERVAL = 60
 SLOTS_RELATIVE_PATH = "osbs_slots"
 RETRY_ON_SSH_EXCEPTIONS = (paramiko.ssh_exception.NoValidConnectionsError,
                            paramiko.ssh_exception.SSHException, ConnectionError, TimeoutError)
@@ -28,6 +36,12 @@ RETRY_ON_SSH_EXCEPTIONS = (paramiko.ssh_exception.NoValidConnectionsError,
 BACKOFF_FACTOR = 0.5
 # max last wait fime will be 128s
 MAX_RETRIES = 8
+# marks the start of the content of a slot in the output of RemoteHost.read_slots
+SLOT_CONTENT_MARKER = "--- slot"
+# how much the load per CPU (capped at 1) and the used fraction of the disk holding
+# the slots lower the score of a host, the score starts at its ratio of free slots
+LOAD_SCORE_WEIGHT = 0.5
+DISK_SCORE_WEIGHT = 0.5
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +49,7 @@ __all__ = [
     "RemoteHost",
     "RemoteHostsPool",
     "LockedResource",
+    "ssh_connection_pool",
 ]
 
 
@@ -89,6 +104,119 @@ class SSHRetrySession(paramiko.SSHClient):
         return out, err, code
 
 
+class SSHConnectionPool:
+    """
+    Pool of SSH connections to remote hosts shared by the whole process.
+
+    Every command runs in a channel of its own, so a single connection to
+    a host serves all the operations on the host, including the ones running
+    concurrently, instead of paying for the TCP and SSH handshakes each time.
+    Idle connections are kept alive by keepalive packets; a connection which
+    was idle for longer than SSH_HEALTH_CHECK_INTERVAL is checked before
+    it is reused, a broken one is replaced by a new connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (hostname, username, ssh_keyfile) -> connection and the time it was last used
+        self._connections: Dict[Tuple[str, str, str], Tuple[SSHRetrySession, float]] = {}
+        # serialize connecting to a single host, so that it is connected only once
+        self._connect_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    @staticmethod
+    def _is_healthy(client: SSHRetrySession, idle_time: float) -> bool:
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        if idle_time > SSH_HEALTH_CHECK_INTERVAL:
+            try:
+                transport.send_ignore()
+            except Exception:
+                return False
+            return transport.is_active()
+        return True
+
+    @staticmethod
+    def _connect(hostname: str, username: str, ssh_keyfile: str) -> SSHRetrySession:
+        client = SSHRetrySession()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        logger.debug("%s: opening SSH connection", hostname)
+        client.connect(hostname, username=username, key_filename=ssh_keyfile)
+        transport = client.get_transport()
+        if transport is not None:
+            transport.set_keepalive(SSH_KEEPALIVE_INTERVAL)
+        return client
+
+    def get_connection(self, hostname: str, username: str, ssh_keyfile: str) -> SSHRetrySession:
+        """
+        Get a connection to the host, open it if there is no healthy one yet.
+
+        :param hostname: str, remote hostname
+        :param username: str, username for ssh connection
+        :param ssh_keyfile: str, filepath to ssh private key
+        :return: SSHRetrySession, connection which must not be closed by the caller
+        """
+        key = (hostname, username, ssh_keyfile)
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(key, threading.Lock())
+
+        with connect_lock:
+            with self._lock:
+                client, last_used = self._connections.get(key, (None, 0.0))
+            now = time.monotonic()
+            if client is not None:
+                if self._is_healthy(client, now - last_used):
+                    with self._lock:
+                        self.hits += 1
+                        self._connections[key] = (client, now)
+                    return client
+                logger.debug("%s: SSH connection is broken, reconnecting", hostname)
+                client.close()
+                with self._lock:
+                    self.reconnects += 1
+
+            client = self._connect(hostname, username, ssh_keyfile)
+            with self._lock:
+                self.misses += 1
+                self._connections[key] = (client, time.monotonic())
+            return client
+
+    def discard(self, client: SSHRetrySession) -> None:
+        """Close the connection and forget it, e.g. after it failed."""
+        with self._lock:
+            for key, (pooled_client, _) in list(self._connections.items()):
+                if pooled_client is client:
+                    del self._connections[key]
+        client.close()
+
+    def clear(self) -> None:
+        """Close all connections and forget the statistics."""
+        with self._lock:
+            clients = [client for client, _ in self._connections.values()]
+            self._connections.clear()
+            self.hits = 0
+            self.misses = 0
+            self.reconnects = 0
+        for client in clients:
+            client.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Get statistics of the pool for tuning."""
+        with self._lock:
+            return {
+                'connections': len(self._connections),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reconnects': self.reconnects,
+            }
+
+
+ssh_connection_pool = SSHConnectionPool()
+
+
 class SlotData:
 
     def __init__(self, prid: Optional[str] = None, timestamp: Optional[str] = None):
@@ -144,6 +272,40 @@ class SlotData:
         return datetime.fromisoformat(self.timestamp)
 
 
+class HostLoad:
+
+    def __init__(self, load_per_cpu: Optional[float] = None,
+                 disk_free_ratio: Optional[float] = None):
+        """ Instantiate host load with the values which could be measured
+
+        :param load_per_cpu: float, 1 minute load average divided by the number of CPUs
+        :param disk_free_ratio: float, free fraction of the disk holding the slots
+        """
+        self.load_per_cpu = load_per_cpu
+        self.disk_free_ratio = disk_free_ratio
+
+    @classmethod
+    def from_string(cls, string: str):
+        """ Instantiate from the output of RemoteHost.LOAD_COMMAND
+
+        Values which cannot be parsed are left unset
+        """
+        lines = string.splitlines()
+        load_per_cpu = None
+        disk_free_ratio = None
+        try:
+            load_per_cpu = float(lines[0].split()[0]) / max(int(lines[1]), 1)
+        except (IndexError, ValueError):
+            logger.debug("cannot parse load average: %r", string)
+        try:
+            # df -P: Filesystem 1024-blocks Used Available Capacity Mounted on
+            fields = lines[3].split()
+            disk_free_ratio = int(fields[3]) / int(fields[1])
+        except (IndexError, ValueError, ZeroDivisionError):
+            logger.debug("cannot parse free disk space: %r", string)
+        return cls(load_per_cpu=load_per_cpu, disk_free_ratio=disk_free_ratio)
+
+
 class RemoteHost:
 
     def __init__(
@@ -278,33 +440,31 @@ class RemoteHost:
     @contextmanager
     def _locked_slot(self, slot_id):
         """ Context manager to return a slot with it's being locked until exit """
-        # Open two ssh sessions, one is for reading/writing the slot file,
-        # the other one is for keeping the lock for that slot file. The two
-        # sessions have same lifecycle, they're closed at the same time when
-        # errors happen or exit.
+        # Run two commands over the SSH connection, each in a channel of its
+        # own. One keeps the lock of the slot file until exit, the other one
+        # runs any commands, especially for reading and writing the slot file.
         try:
-            # A session to run any commands, especially for reading and
-            # writing the slot file
-            slot_session = self._open_ssh_session()
-            # A special session to keep the lock of the slot
-            lock_session = self._open_ssh_session()
+            session = self._open_ssh_session()
         except Exception as ex:
             raise SlotLockError(f"{self.hostname}: failed to open SSH sessions") from ex
 
         _errmsg = f"{self.hostname}: failed to acquire lock on slot {slot_id}"
-        lock_stdin = None
+        lock_stdin = lock_stdout = None
         try:
-            lock_stdin, _, _ = self._get_blocking_session_with_locked_slot(
-                lock_session, slot_id
+            lock_stdin, lock_stdout, _ = self._get_blocking_session_with_locked_slot(
+                session, slot_id
             )
-            yield HostSlot(self, slot_session, slot_id)
+            yield HostSlot(self, session, slot_id)
         except Exception as ex:
+            if isinstance(ex, RETRY_ON_SSH_EXCEPTIONS):
+                ssh_connection_pool.discard(session)
             raise SlotLockError(_errmsg) from ex
         finally:
             if lock_stdin:
+                # closing stdin ends the cat command holding the lock
                 lock_stdin.close()
-            slot_session.close()
-            lock_session.close()
+            if lock_stdout:
+                lock_stdout.channel.close()
 
     def _run(self, cmd: str):
         """
@@ -317,22 +477,22 @@ class RemoteHost:
 
     @contextmanager
     def _ssh_session(self):
-        """ Create an SSH connection."""
+        """ Get an SSH connection, a connection which fails is not reused """
         client = self._open_ssh_session()
         try:
             yield client
-        finally:
-            client.close()
+        except RETRY_ON_SSH_EXCEPTIONS:
+            ssh_connection_pool.discard(client)
+            raise
 
     def _open_ssh_session(self):
         """
-        Create a new SSH connection and return connection object.
+        Get an SSH connection from the pool of connections shared by the process.
+
+        The connection must not be closed, it is reused by the next operations.
         """
-        client = SSHRetrySession()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        logger.debug("%s: opening SSH connection", self.hostname)
-        client.connect(self.hostname, username=self.username, key_filename=self.ssh_keyfile)
-        return client
+        return ssh_connection_pool.get_connection(self.hostname, self.username,
+                                                  self.ssh_keyfile)
 
     @property
     def is_operational(self) -> bool:
@@ -457,19 +617,154 @@ class RemoteHost:
                            self.hostname, slot_id, prid)
         return unlocked
 
-    def available_slots(self) -> List[int]:
-        """ Get slots on host which are in free state """
+    def read_slots(self, ssh_session: Optional[SSHRetrySession] = None) -> Dict[int, SlotData]:
+        """ Read the content of all slots on host with a single command
+
+        :param ssh_session: SSHRetrySession, ssh connection to use instead of a new one
+        :return: slot ID -> data of the slot
+        """
+        if ssh_session is None:
+            with self._ssh_session() as ssh_session:
+                return self.read_slots(ssh_session)
+
+        slot_ids = " ".join(str(slot_id) for slot_id in range(self.slots))
+        # Touch the slot files to create them in case they don't exist, the content
+        # of a slot does not have to end with a newline, so start markers with one
+        cmd = (
+            f"cd {quote(self.slots_dir)} && for i in {slot_ids}; do "
+            f"touch slot_$i && printf '\\n{SLOT_CONTENT_MARKER} %s\\n' $i && cat slot_$i "
+            "|| exit 1; done"
+        )
+        _errmsg = f"{self.hostname}: cannot read content of slots"
+        try:
+            stdout, stderr, code = ssh_session.run(cmd)
+        except Exception as ex:
+            raise SlotReadError(_errmsg) from ex
+        if code != 0:
+            _errmsg = f"{_errmsg}: {stderr}" if stderr else _errmsg
+            raise SlotReadError(_errmsg)
+
+        contents: Dict[int, List[str]] = {}
+        marker = re.compile(rf"{SLOT_CONTENT_MARKER} (\d+)")
+        lines: List[str] = []
+        for line in stdout.splitlines():
+            if match := marker.fullmatch(line):
+                lines = contents.setdefault(int(match.group(1)), [])
+            else:
+                lines.append(line)
+
+        if set(contents) != set(range(self.slots)):
+            raise SlotReadError(f"{_errmsg}: unexpected output")
+        return {
+            slot_id: SlotData.from_string("\n".join(lines).strip())
+            for slot_id, lines in sorted(contents.items())
+        }
+
+    def available_slots(self, ssh_session: Optional[SSHRetrySession] = None) -> List[int]:
+        """ Get slots on host which are in free state, slots with invalid content are free
+
+        :param ssh_session: SSHRetrySession, ssh connection to use instead of a new one
+        """
         logger.debug("%s: retrieve list of available slots", self.hostname)
         available_slots = []
-        with self._ssh_session() as ssh_session:
-            for slot_id in range(self.slots):
-                if not self.is_free(slot_id, ssh_session):
-                    logger.debug("%s: slot %s is not free", self.hostname, slot_id)
-                    continue
-                available_slots.append(slot_id)
+        for slot_id, data in self.read_slots(ssh_session).items():
+            if not data.is_empty and data.is_valid:
+                logger.debug("%s: slot %s is not free", self.hostname, slot_id)
+                continue
+            available_slots.append(slot_id)
 
         return available_slots
 
+    def lock_free_slot(
+        self, prid: str, slot_ids: Iterable[int]
+    ) -> Tuple[Optional[int], List[int], List[int]]:
+        """ Lock the first empty slot for a pipelinerun with a single command
+
+        Every slot is locked with flock while it is checked and written, like lock()
+        does, but without waiting for the flock held by others. Slots whose flock is
+        held by others are left to lock(), which retries it, and so are slots with
+        invalid content, since the validity of the content is only checked after
+        the command finished.
+
+        :param prid: str, pipelinerun ID
+        :param slot_ids: iterable of int, IDs of slots to try, in order
+        :return: the locked slot ID, or None, the IDs of the checked slots whose
+            flock is held by others and the IDs of the checked slots which are
+            not empty but have invalid content
+        """
+        slot_ids = [slot_id for slot_id in slot_ids if self._is_valid_slot_id(slot_id)]
+        if not slot_ids:
+            return None, [], []
+
+        data = SlotData(prid=prid, timestamp=datetime.utcnow().isoformat()).to_string()
+        # The flock of every slot is held in a subshell while the slot is checked and
+        # written, a subshell exiting with 0 means the slot got locked
+        cmd = (
+            f"cd {quote(self.slots_dir)} || exit 1; "
+            f"for i in {' '.join(str(slot_id) for slot_id in slot_ids)}; do "
+            "( flock --nonblocking 9 || { echo busy $i; exit 1; }; "
+            "touch slot_$i && content=$(cat slot_$i) || exit 1; "
+            f"if [ -z \"$content\" ]; then echo {quote(data)} > slot_$i && echo locked $i; "
+            "exit; fi; "
+            "printf 'used %s %s\\n' $i \"$(printf %s \"$content\" | tr '\\n' ' ')\"; exit 1 "
+            ") 9>slot_$i.lock && exit 0; done; exit 0"
+        )
+        _errmsg = f"{self.hostname}: failed to lock a slot for pipelinerun {prid}"
+        with self._ssh_session() as session:
+            try:
+                stdout, stderr, code = session.run(cmd)
+            except RETRY_ON_SSH_EXCEPTIONS:
+                # let _ssh_session discard the broken connection
+                raise
+            except Exception as ex:
+                raise SlotLockError(_errmsg) from ex
+        if code != 0:
+            _errmsg = f"{_errmsg}: {stderr}" if stderr else _errmsg
+            raise SlotLockError(_errmsg)
+
+        busy_slots: List[int] = []
+        invalid_slots: List[int] = []
+        for line in stdout.splitlines():
+            status, _, rest = line.partition(" ")
+            slot_id_str, _, content = rest.partition(" ")
+            if status == "locked":
+                logger.info("%s: slot %s is locked for pipelinerun %s",
+                            self.hostname, slot_id_str, prid)
+                return int(slot_id_str), busy_slots, invalid_slots
+            if status == "busy":
+                logger.debug("%s: slot %s is locked by others", self.hostname, slot_id_str)
+                busy_slots.append(int(slot_id_str))
+            elif status == "used" and not SlotData.from_string(content.strip()).is_valid:
+                invalid_slots.append(int(slot_id_str))
+
+        logger.info("%s: no empty slot to lock for pipelinerun %s", self.hostname, prid)
+        return None, busy_slots, invalid_slots
+
+    def load(self, ssh_session: SSHRetrySession) -> HostLoad:
+        """ Get the load of the host, values which cannot be measured are left unset
+
+        :param ssh_session: SSHRetrySession, ssh connection to the host
+        """
+        cmd = f"cat /proc/loadavg; nproc; df -Pk {quote(self.slots_dir)}"
+        try:
+            stdout, stderr, code = ssh_session.run(cmd)
+        except Exception as ex:
+            logger.debug("%s: cannot get host load: %s", self.hostname, ex)
+            return HostLoad()
+        if code != 0:
+            logger.debug("%s: cannot get host load: %s", self.hostname, stderr)
+        return HostLoad.from_string(stdout)
+
+    def probe(self) -> Tuple[List[int], HostLoad]:
+        """ Get slots on host which are in free state and the load of the host
+
+        Both are read over a single ssh connection, the load only if there are free slots.
+        """
+        with self._ssh_session() as ssh_session:
+            available_slots = self.available_slots(ssh_session)
+            load = self.load(ssh_session) if available_slots else HostLoad()
+        return available_slots, load
+
     def occupied_slots(self) -> Set[int]:
         """ Get slots on host which are occupied """
         logger.debug("%s: retrieve list of occupied slots", self.hostname)
@@ -617,14 +912,54 @@ class LockedResource:
         self.host.unlock(self.slot, self.prid)
 
 
+class LockStats:
+    """ Statistics of locking slots of remote hosts, accumulated across lock attempts """
+
+    def __init__(self):
+        self.lock_rounds = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.probe_time = 0.0
+        self.max_probe_time = 0.0
+        self.lock_attempts = 0
+        # attempts to lock a slot which was free when probed, but got locked by others
+        self.contention_retries = 0
+        self.lock_time = 0.0
+        self.locked_host: Optional[str] = None
+
+    def observe_probe(self, probe_time: float, failed: bool) -> None:
+        self.probes += 1
+        self.probe_failures += failed
+        self.probe_time += probe_time
+        self.max_probe_time = max(self.max_probe_time, probe_time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'lock_rounds': self.lock_rounds,
+            'probes': self.probes,
+            'probe_failures': self.probe_failures,
+            'probe_time': round(self.probe_time, 3),
+            'max_probe_time': round(self.max_probe_time, 3),
+            'lock_attempts': self.lock_attempts,
+            'contention_retries': self.contention_retries,
+            'lock_time': round(self.lock_time, 3),
+            'locked_host': self.locked_host or '',
+        }
+
+
 class RemoteHostsPool:
 
-    def __init__(self, hosts: List[RemoteHost], host_platform: str):
+    def __init__(self, hosts: List[RemoteHost], host_platform: str,
+                 probe_workers: int = DEFAULT_REMOTE_HOST_PROBE_WORKERS):
         """
         :param hosts: List[RemoteHost], List of Remote hosts
+        :param host_platform: str, platform of the hosts
+        :param probe_workers: int, number of hosts probed for free slots concurrently
         """
         self.hosts = hosts
         self.host_platform = host_platform
+        self.probe_workers = probe_workers
+        self.stats = LockStats()
 
     @classmethod
     def from_config(cls, config: dict, platform: str):
@@ -636,6 +971,7 @@ class RemoteHostsPool:
         Remote hosts config dict example:
 
         slots_dir: /path/to/slots/dir
+        probe_workers: 4
         pools:
             x86_64:
                 hostname-remote-host1:
@@ -667,7 +1003,59 @@ class RemoteHostsPool:
             )
             hosts.append(host)
 
-        return cls(hosts, platform)
+        return cls(hosts, platform,
+                   probe_workers=config.get("probe_workers", DEFAULT_REMOTE_HOST_PROBE_WORKERS))
+
+    def _probe_host(self, host: RemoteHost) -> Tuple[List[int], HostLoad, float, bool]:
+        """ Probe the host for free slots, a failure is logged and means no free slots
+
+        :return: available slots, load of the host, the time the probe took
+            and whether it failed
+        """
+        start = time.monotonic()
+        available_slots: List[int] = []
+        load = HostLoad()
+        failed = False
+        try:
+            if host.is_operational:
+                available_slots, load = host.probe()
+        except Exception as ex:
+            # Specific exceptions should be handled in nested methods
+            logger.warning("%s: unable to get available slots: %s", host.hostname, ex)
+            failed = True
+        probe_time = time.monotonic() - start
+        logger.debug("%s: probed in %.3fs", host.hostname, probe_time)
+        return available_slots, load, probe_time, failed
+
+    def _probe_hosts(self) -> List[Tuple[RemoteHost, List[int], HostLoad]]:
+        """ Probe all hosts for free slots, concurrently if probe_workers allows it """
+        if self.probe_workers > 1 and len(self.hosts) > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(self.probe_workers, len(self.hosts))
+            ) as executor:
+                probes = list(executor.map(self._probe_host, self.hosts))
+        else:
+            probes = [self._probe_host(host) for host in self.hosts]
+
+        results = []
+        for host, (available_slots, load, probe_time, failed) in zip(self.hosts, probes):
+            self.stats.observe_probe(probe_time, failed)
+            results.append((host, available_slots, load))
+        return results
+
+    @staticmethod
+    def score(host: RemoteHost, available_slots: List[int], load: HostLoad) -> float:
+        """ Score the host, slots of hosts with higher scores are locked first
+
+        The score is the ratio of available slots, lowered by the load
+        and the used disk space of the host, if they are known.
+        """
+        score = len(available_slots) / host.slots
+        if load.load_per_cpu is not None:
+            score *= 1 - LOAD_SCORE_WEIGHT * min(load.load_per_cpu, 1.0)
+        if load.disk_free_ratio is not None:
+            score *= 1 - DISK_SCORE_WEIGHT * (1 - load.disk_free_ratio)
+        return score
 
     def lock_resource(self, prid: str) -> Optional[LockedResource]:
         """
@@ -675,18 +1063,17 @@ class RemoteHostsPool:
 
         :param prid: str, pipelinerun ID
         """
+        start = time.monotonic()
+        self.stats.lock_rounds += 1
+        try:
+            return self._lock_resource(prid)
+        finally:
+            self.stats.lock_time += time.monotonic() - start
+
+    def _lock_resource(self, prid: str) -> Optional[LockedResource]:
         resources = []
         random.shuffle(self.hosts)
-        for host in self.hosts:
-            available_slots = []
-            try:
-                if host.is_operational:
-                    available_slots = host.available_slots()
-            except Exception as ex:
-                # Specific exceptions should be handled in nested methods
-                logger.warning("%s: unable to get available slots: %s", host.hostname, ex)
-                continue
-
+        for host, available_slots, load in self._probe_hosts():
             if not available_slots:
                 logger.info("%s: no available slots", host.hostname)
                 continue
@@ -694,19 +1081,38 @@ class RemoteHostsPool:
             # random.shuffle the slots to reduce the chance of multiple clients
             # trying to lock the free slots in the same order
             random.shuffle(available_slots)
-            resources.append((host, available_slots))
+            resources.append((host, available_slots, self.score(host, available_slots, load)))
 
         if not resources:
             logger.error("There is no remote host slot available for pipelinerun %s", prid)
             return None
 
-        # Sort list based on ratio of available_slots/all_slots
-        resources.sort(key=lambda x: len(x[1])/x[0].slots, reverse=True)
+        # Sort list based on the score of hosts
+        resources.sort(key=lambda x: x[2], reverse=True)
 
         # Try to lock a remote host slot for pipelinerun
-        for host, slots in resources:
-            for slot in slots:
+        for host, slots, _ in resources:
+            self.stats.lock_attempts += 1
+            try:
+                slot, busy_slots, invalid_slots = host.lock_free_slot(prid, slots)
+            except Exception as ex:
+                # Specific exceptions should be handled in nested methods
+                logger.warning("%s: unable to lock a slot for pipelinerun %s: %s",
+                               host.hostname, prid, ex)
+                slot, busy_slots, invalid_slots = None, [], slots
+            if slot is not None:
+                self.stats.locked_host = host.hostname
+                return LockedResource(host, self.host_platform, slot, prid)
+            if len(invalid_slots) < len(slots):
+                # some of the slots got locked by others since the probe
+                self.stats.contention_retries += 1
+
+            # Slots locked by others at the moment and slots with invalid
+            # content are locked one by one, as are all the slots if they
+            # could not be locked at once
+            for slot in busy_slots + invalid_slots:
                 locked = False
+                self.stats.lock_attempts += 1
                 try:
                     locked = host.lock(slot, prid)
                 except Exception as ex:
@@ -714,7 +1120,9 @@ class RemoteHostsPool:
                     logger.warning("%s: unable to lock slot %s for pipelinerun %s: %s",
                                    host.hostname, slot, prid, ex)
                 if locked:
+                    self.stats.locked_host = host.hostname
                     return LockedResource(host, self.host_platform, slot, prid)
+                self.stats.contention_retries += 1
 
         logger.info("Cannot find remote host resource for pipelinerun %s", prid)
         return None
@@ -0,0 +1,88 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+
+Measure how long checking the paths of a remote source against a denylist takes.
+
+The paths of a generated vendored Go tree are checked against a denylist of
+the given length. Some entries match vendored modules and the rest match
+nothing. The same check is done three ways: with one endswith() per path and
+entry (the way _get_excluded_matches() used to work), with a single regex over
+the reversed paths, and with PathSuffixMatcher.
+
+Usage: python3 benchmarks/denylist_matching.py [paths, default 100000] [entries, default 500]
+"""
+import random
+import re
+import sys
+import time
+
+from atomic_reactor.util import PathSuffixMatcher
+
+FILES_PER_PACKAGE = 8
+PACKAGES_PER_MODULE = 5
+
+
+def make_tree(paths):
+    """Paths of a vendored Go tree, directories included, like os.walk() yields them"""
+    tree = ['app', 'app/vendor']
+    module = 0
+    while len(tree) < paths:
+        module_dir = 'app/vendor/github.com/org{}/module{}'.format(module % 97, module)
+        tree.append(module_dir)
+        for package in range(PACKAGES_PER_MODULE):
+            package_dir = '{}/pkg/package{}'.format(module_dir, package)
+            tree.append(package_dir)
+            tree.extend('{}/file{}.go'.format(package_dir, n) for n in range(FILES_PER_PACKAGE))
+        module += 1
+    return ['/remote-source/' + path for path in tree[:paths]]
+
+
+def make_denylist(entries, tree):
+    rand = random.Random(0)
+    modules = [path[len('/remote-source/app'):] for path in tree if path.count('/') == 6]
+    denylist = rand.sample(modules, min(len(modules), entries // 10))
+    while len(denylist) < entries:
+        denylist.append('/vendor/example.com/unused{}/module'.format(len(denylist)))
+    rand.shuffle(denylist)
+    return denylist
+
+
+def match_endswith(tree, denylist):
+    return [path for path in tree if any(path.endswith(entry) for entry in denylist)]
+
+
+def match_regex(tree, denylist):
+    pattern = re.compile('|'.join(re.escape(entry[::-1]) for entry in denylist))
+    return [path for path in tree if pattern.match(path[::-1])]
+
+
+def match_trie(tree, denylist):
+    matcher = PathSuffixMatcher(denylist)
+    return [path for path in tree if matcher.matches(path)]
+
+
+def main():
+    paths = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    entries = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    tree = make_tree(paths)
+    denylist = make_denylist(entries, tree)
+
+    results = []
+    for name, match in (('endswith', match_endswith),
+                        ('regex', match_regex),
+                        ('trie', match_trie)):
+        start = time.monotonic()
+        results.append(match(tree, denylist))
+        elapsed = time.monotonic() - start
+        print('{:>8}: {} paths, {} entries, {} matches in {:.3f} s'
+              .format(name, len(tree), len(denylist), len(results[-1]), elapsed))
+    assert results[0] == results[1] == results[2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+
+Measure download_url() throughput with md5 and sha256 verification.
+
+A local HTTP server streams generated content, which is downloaded once with
+the reads, writes and hashing done inline on one thread (the way
+download_url() used to work) and once with download_url() itself.
+
+Usage: python3 benchmarks/download_hashing.py [size in MiB, default 1024]
+"""
+import hashlib
+import http.server
+import sys
+import tempfile
+import threading
+import time
+
+from atomic_reactor.constants import DEFAULT_DOWNLOAD_BLOCK_SIZE
+from atomic_reactor.download import download_url
+from atomic_reactor.util import get_retrying_requests_session
+
+MIB = 1024 * 1024
+BLOCK = bytes(range(256)) * (MIB // 256)
+
+
+def make_handler(size):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            for _ in range(size // MIB):
+                self.wfile.write(BLOCK)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def expected_checksums(size):
+    hashers = [hashlib.md5(), hashlib.sha256()]
+    for _ in range(size // MIB):
+        for hasher in hashers:
+            hasher.update(BLOCK)
+    return {hasher.name: hasher.hexdigest() for hasher in hashers}
+
+
+def download_inline(url, dest_dir, checksums):
+    session = get_retrying_requests_session()
+    hashers = {algo: hashlib.new(algo) for algo in checksums}
+    response = session.get(url, stream=True)
+    response.raise_for_status()
+    with open(dest_dir + '/inline', 'wb') as f:
+        for chunk in response.iter_content(chunk_size=DEFAULT_DOWNLOAD_BLOCK_SIZE):
+            f.write(chunk)
+            for hasher in hashers.values():
+                hasher.update(chunk)
+    assert all(hashers[algo].hexdigest() == checksum for algo, checksum in checksums.items())
+
+
+def download_pipelined(url, dest_dir, checksums):
+    download_url(url, dest_dir, dest_filename='pipelined', expected_checksums=checksums)
+
+
+def main():
+    size = int(sys.argv[1]) * MIB if len(sys.argv) > 1 else 1024 * MIB
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), make_handler(size))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/blob'.format(server.server_address[1])
+    checksums = expected_checksums(size)
+
+    with tempfile.TemporaryDirectory() as dest_dir:
+        for name, download in (('inline', download_inline),
+                               ('pipelined', download_pipelined)):
+            start = time.monotonic()
+            download(url, dest_dir, checksums)
+            elapsed = time.monotonic() - start
+            print('{:>10}: {:.0f} MiB in {:.2f} s, {:.1f} MiB/s'
+                  .format(name, size / MIB, elapsed, size / MIB / elapsed))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+
+Measure how long fetch_sources takes to resolve the SRPMs of an image in Koji.
+
+A local XML-RPC server stands in for the Koji hub, adding a fixed latency to
+every request. The SRPM builds of an image with the given number of RPMs are
+resolved once with one hub call per lookup (the way get_srpm_urls() used to
+work) and once with FetchSourcesPlugin.get_srpm_build_paths() itself.
+
+Usage: python3 benchmarks/koji_srpm_resolution.py [RPMs, default 400] [latency in ms, default 5]
+"""
+import logging
+import sys
+import threading
+import time
+import xmlrpc.server
+from xmlrpc.client import Fault
+
+import koji
+
+from atomic_reactor.plugins.fetch_sources import FetchSourcesPlugin
+
+KOJI_ROOT = 'http://koji.localhost/kojiroot'
+IMAGE_BUILD_ID = 1
+ARCHES = ('x86_64', 'aarch64', 'ppc64le', 's390x')
+# RPMs built from every SRPM
+RPMS_PER_BUILD = 2
+
+
+class StandInHub(object):
+    """The hub calls made by get_srpm_urls(), answered from generated data"""
+
+    def __init__(self, rpms):
+        self.rpms = [{'id': rpm_id,
+                      'build_id': 1000 + rpm_id // RPMS_PER_BUILD,
+                      'nvr': 'package{}-1.0-1'.format(rpm_id),
+                      'arch': 'noarch',
+                      'external_repo_name': 'INTERNAL'}
+                     for rpm_id in range(rpms)]
+        self.requests = 0
+
+    def listArchives(self, buildID=None, type=None, imageID=None):
+        return [{'id': archive_id} for archive_id in range(len(ARCHES))]
+
+    def listRPMs(self, buildID=None, imageID=None, componentBuildrootID=None):
+        return self.rpms if imageID is not None else []
+
+    def getRPMHeaders(self, rpmID, headers=None):
+        build_id = self.rpms[rpmID]['build_id']
+        return {'SOURCERPM': 'source{}-1.0-1.src.rpm'.format(build_id)}
+
+    def getBuild(self, buildInfo, strict=False):
+        return {'build_id': buildInfo, 'name': 'source{}'.format(buildInfo),
+                'version': '1.0', 'release': '1', 'volume_name': 'DEFAULT'}
+
+    def call(self, method, params):
+        # koji passes keyword arguments as a marked dict after the positional ones
+        kwargs = {}
+        if params and isinstance(params[-1], dict) and params[-1].pop('__starstar', False):
+            *params, kwargs = params
+        return getattr(self, method)(*params, **kwargs)
+
+    def multiCall(self, calls):
+        results = []
+        for call in calls:
+            try:
+                results.append([self.call(call['methodName'], call['params'])])
+            except Exception as exc:  # pylint: disable=broad-except
+                results.append({'faultCode': 1000, 'faultString': str(exc)})
+        return results
+
+
+class HubServer(xmlrpc.server.SimpleXMLRPCServer):
+    def __init__(self, hub, latency):
+        super(HubServer, self).__init__(('127.0.0.1', 0), logRequests=False, allow_none=True)
+        self.hub = hub
+        self.latency = latency
+
+    def _dispatch(self, method, params):
+        self.hub.requests += 1
+        time.sleep(self.latency)
+        try:
+            return self.hub.call(method, list(params))
+        except Exception as exc:
+            raise Fault(1000, str(exc)) from exc
+
+
+def resolve_sequentially(session, pathinfo):
+    archives = session.listArchives(IMAGE_BUILD_ID, type='image')
+    rpms = {rpm['id']: rpm for archive in archives
+            for rpm in session.listRPMs(imageID=archive['id'])}
+    srpm_build_paths = {}
+    for rpm_id, rpm in sorted(rpms.items()):
+        srpm_filename = session.getRPMHeaders(rpm_id, headers=['SOURCERPM'])['SOURCERPM']
+        if srpm_filename in srpm_build_paths:
+            continue
+        build = session.getBuild(rpm['build_id'], strict=True)
+        srpm_build_paths[srpm_filename] = {'base_url': pathinfo.build(build),
+                                           'ignore_signing_intent': False}
+    return srpm_build_paths
+
+
+def resolve_multicall(session, pathinfo):
+    # only the attributes used by get_srpm_build_paths()
+    plugin = FetchSourcesPlugin.__new__(FetchSourcesPlugin)
+    plugin.log = logging.getLogger(__name__)
+    plugin.session = session
+    plugin.pathinfo = pathinfo
+    plugin.koji_build_id = IMAGE_BUILD_ID
+    plugin._build_paths = {}
+    plugin.get_denylisted_srpms = list
+    return plugin.get_srpm_build_paths()
+
+
+def main():
+    rpms = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5) / 1000
+    hub = StandInHub(rpms)
+    server = HubServer(hub, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = koji.ClientSession('http://127.0.0.1:{}/'.format(server.server_address[1]))
+    pathinfo = koji.PathInfo(topdir=KOJI_ROOT)
+
+    results = []
+    for name, resolve in (('sequential', resolve_sequentially),
+                          ('multicall', resolve_multicall)):
+        hub.requests = 0
+        start = time.monotonic()
+        results.append(resolve(session, pathinfo))
+        elapsed = time.monotonic() - start
+        print('{:>10}: {} RPMs, {} SRPMs in {:.2f} s, {} hub requests'
+              .format(name, rpms, len(results[-1]), elapsed, hub.requests))
+    assert results[0] == results[1]
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,7 @@ from flexmock import flexmock
 from textwrap import dedent
 
 from atomic_reactor.cli import job
-from atomic_reactor.utils.remote_host import RemoteHost
+from atomic_reactor.utils.remote_host import RemoteHost, SlotData, ssh_connection_pool
 from osbs.tekton import PipelineRun
 
 
@@ -44,13 +44,18 @@ remote_hosts:
 def test_remote_hosts_unlocking_recovery(tmp_path, caplog):
     flexmock(RemoteHost).should_receive('is_operational').and_return(True)
 
-    flexmock(RemoteHost).should_receive('prid_in_slot').with_args(0).and_return('pr123').once()
-    flexmock(RemoteHost).should_receive('prid_in_slot').with_args(1).and_return('pr124').once()
-    flexmock(RemoteHost).should_receive('prid_in_slot').with_args(2).and_return('pr125').once()
+    # all the slots are read at once
+    flexmock(RemoteHost).should_receive('read_slots').and_return({
+        0: SlotData('pr123', '2022-02-15T10:22:33.234234'),
+        1: SlotData('pr124', '2022-02-15T10:22:33.234234'),
+        2: SlotData('pr125', '2022-02-15T10:22:33.234234'),
+    }).once()
 
     flexmock(RemoteHost).should_receive('unlock').with_args(0, 'pr123').times(0)
     flexmock(RemoteHost).should_receive('unlock').with_args(1, 'pr124').and_return(True).once()
     flexmock(RemoteHost).should_receive('unlock').with_args(2, 'pr125').and_return(True).once()
+    # the SSH connections are closed when done
+    flexmock(ssh_connection_pool).should_receive('clear').once()
 
     config_yaml = tmp_path / 'config.yaml'
     config = REQUIRED_CONFIG
@@ -15,6 +15,7 @@ import requests.exceptions
 from atomic_reactor.constants import DOCKERFILE_FILENAME
 from atomic_reactor.dirs import ContextDir, RootBuildDir
 from atomic_reactor.source import DummySource
+from atomic_reactor.util import registry_session_pool
 from tests.constants import LOCALHOST_REGISTRY_HTTP, DOCKER0_REGISTRY_HTTP, TEST_IMAGE
 from tests.util import uuid_value
 
@@ -22,6 +23,14 @@ from osbs.utils import ImageName
 from atomic_reactor.inner import DockerBuildWorkflow
 
 
+@pytest.fixture(autouse=True)
+def clear_registry_session_pool():
+    """Do not share registry sessions, and the mocks they use, between tests"""
+    registry_session_pool.clear()
+    yield
+    registry_session_pool.clear()
+
+
 @pytest.fixture()
 def temp_image_name():
     return ImageName(repo=("atomic-reactor-tests-%s" % uuid_value()))
@@ -261,3 +261,22 @@ def test_failed_build(workflow, source_dir, caplog, user_params):
         runner.run()
     assert 'BSI failed with output:' in caplog.text
     assert 'stub stdout' in caplog.text
+
+
+def test_split_remote_sources_to_subdirs(workflow):
+    remote_dir_path = workflow.build_dir.path / 'remote_sources_dir'
+    # already downloaded into subdirectories by fetch_sources
+    for count in range(2):
+        (remote_dir_path / f'remote_source_{count}').mkdir(parents=True)
+        os.mknod(remote_dir_path / f'remote_source_{count}' / f'remote-source-{count}.tar.gz')
+    os.mknod(remote_dir_path / 'remote-source-2.tar.gz')
+
+    plugin = SourceContainerPlugin(workflow)
+    subdirs = plugin.split_remote_sources_to_subdirs(str(remote_dir_path))
+
+    assert sorted(subdirs) == [str(remote_dir_path / f'remote_source_{count}')
+                               for count in range(3)]
+    for count in range(3):
+        assert os.listdir(remote_dir_path / f'remote_source_{count}') == [
+            f'remote-source-{count}.tar.gz'
+        ]
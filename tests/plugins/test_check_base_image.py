@@ -594,6 +594,41 @@ class TestValidateBaseImage(object):
             builder_digests_dict = test_vals['workflow'].data.parent_images_digests
             assert builder_digests_dict == test_vals['expected_digest']
 
+    @pytest.mark.parametrize(('tag', 'cacheable'), [('1.36', True), ('latest', False)])
+    def test_digest_cache(self, workflow, tmp_path, tag, cacheable):
+        base_image = 'busybox:{}'.format(tag)
+        registry_image = ImageName.parse('{}/{}'.format(SOURCE_REGISTRY, base_image))
+
+        def workflow_callback(workflow):
+            workflow = self.prepare(workflow, mock_get_manifest_list=True)
+            workflow.conf.conf['digest_cache'] = {'cache_dir': str(tmp_path)}
+            return workflow
+
+        workflow = test_check_base_image_plugin(workflow, SOURCE_REGISTRY, base_image,
+                                                workflow_callback=workflow_callback,
+                                                mock_get_manifest_list=False)
+        digests = workflow.data.parent_images_digests
+        pinned = workflow.data.dockerfile_images[registry_image]
+
+        # the next build resolves the image without querying the registry
+        workflow.data.dockerfile_images[registry_image] = registry_image
+        workflow.data.parent_images_digests = {}
+        if cacheable:
+            (flexmock(atomic_reactor.util.RegistryClient)
+             .should_receive('get_manifest_list')
+             .never())
+        CheckBaseImagePlugin(workflow).run()
+
+        assert workflow.data.parent_images_digests == digests
+        assert workflow.data.dockerfile_images[registry_image] == pinned
+        stats = workflow.data.digest_cache_stats[CheckBaseImagePlugin.key]
+        if cacheable:
+            assert stats == {'hits': 1, 'misses': 1, 'expired': 0, 'bypassed': 0,
+                             'hit_ratio': 0.5}
+        else:
+            assert stats == {'hits': 0, 'misses': 0, 'expired': 0, 'bypassed': 2,
+                             'hit_ratio': 0.0}
+
     def prepare(self, workflow, mock_get_manifest_list=False):
         # Setup expected platforms
         env = (
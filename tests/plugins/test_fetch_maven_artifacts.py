@@ -581,6 +581,33 @@ def test_fetch_maven_artifacts_sbom_components(workflow, source_path, artifact_t
         assert not plugin_result['sbom_components']
 
 
+@responses.activate
+def test_fetch_maven_artifacts_download_cache(workflow, source_path, tmp_path):
+    """Downloaded artifacts are added to the download cache."""
+    mock_koji_session()
+    mock_fetch_artifacts_by_nvr(source_path)
+    mock_nvr_downloads()
+    r_c_m = {
+        'version': 1,
+        'koji': {
+            'hub_url': KOJI_HUB,
+            'root_url': KOJI_ROOT,
+            'auth': {}
+        },
+        'downloads': {
+            'cache_dir': str(tmp_path / 'cache'),
+        },
+    }
+
+    results = mock_env(workflow, r_c_m=r_c_m).create_runner().run()
+
+    plugin_result = results[FetchMavenArtifactsPlugin.key]
+    workflow.build_dir.for_each_platform(check_downloads_exist(plugin_result))
+    for download in plugin_result['download_queue']:
+        for algorithm, checksum in download['checksums'].items():
+            assert (tmp_path / 'cache' / algorithm / checksum).is_file()
+
+
 @pytest.mark.parametrize(('nvr_requests', 'expected'), (  # noqa
     ([], []),  # Empty file
     ([
@@ -29,7 +29,7 @@ from flexmock import flexmock
 from atomic_reactor import constants
 from atomic_reactor.plugin import PluginsRunner, PluginFailedException
 from atomic_reactor.plugins.fetch_sources import FetchSourcesPlugin
-from atomic_reactor.util import get_checksums
+from atomic_reactor.util import PathSuffixMatcher, get_checksums
 
 KOJI_HUB = 'http://koji.com/hub'
 KOJI_ROOT = 'http://koji.localhost/kojiroot'
@@ -306,9 +306,56 @@ def mock_env(workflow, source_dir: Path, scratch=False, koji_build_id=None,
     return PluginsRunner(workflow, plugin_conf)
 
 
+class MockVirtualCall(object):
+    def __init__(self, method, args, kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+
+
+class MockMultiCallSession(object):
+    """Collect calls like koji.MultiCallSession and make them on the mocked session on exit"""
+
+    def __init__(self, session, strict=False, batch=None):
+        self.session = session
+        self.strict = strict
+        self.batch = batch
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            virtual_call = MockVirtualCall(name, args, kwargs)
+            self.calls.append(virtual_call)
+            return virtual_call
+        return call
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            for call in self.calls:
+                call.result = getattr(self.session, call.method)(*call.args, **call.kwargs)
+        return False
+
+
+def mock_multicall(session):
+    """Make multicalls on the mocked session, all of them are recorded in session.multicalls"""
+    multicalls = []
+
+    def multicall(strict=False, batch=None):
+        multicalls.append(MockMultiCallSession(session, strict, batch))
+        return multicalls[-1]
+
+    session.multicalls = multicalls
+    flexmock(session).should_receive('multicall').replace_with(multicall)
+
+
 @pytest.fixture()
 def koji_session():
     session = flexmock()
+    mock_multicall(session)
     flexmock(session).should_receive('ssl_login').and_return(True)
     (flexmock(session)
      .should_receive('listArchives')
@@ -496,6 +543,17 @@ def set_multiple_remote_sources_in_koji_build(koji_session, typeinfo):
         .and_return(koji_parent_build))
 
 
+def list_remote_sources(remote_sources_dir):
+    """Get the filenames of remote sources, each of them is in its own subdirectory"""
+    remote_sources = set()
+    for count, subdir in enumerate(sorted(os.listdir(remote_sources_dir))):
+        assert subdir == f'remote_source_{count}'
+        filenames = os.listdir(os.path.join(remote_sources_dir, subdir))
+        assert len(filenames) == 1
+        remote_sources.update(filenames)
+    return remote_sources
+
+
 def get_srpm_url(sign_key=None, srpm_filename_override=None):
     base = '{}/packages/{}/{}/{}'.format(KOJI_ROOT, KOJI_BUILD_RS['name'], KOJI_BUILD_RS['version'],
                                          KOJI_BUILD_RS['release'])
@@ -690,7 +748,7 @@ class TestFetchSources(object):
             orig_build_id = results['sources_for_koji_build_id']
             orig_build_nvr = results['sources_for_nvr']
             sources_list = os.listdir(sources_dir)
-            remote_list = set(os.listdir(remote_sources_dir))
+            remote_list = list_remote_sources(remote_sources_dir)
             maven_list = set()
             for maven_sources_subdir in os.listdir(maven_sources_dir):
                 for source_archive in os.listdir(os.path.join(maven_sources_dir,
@@ -733,6 +791,105 @@ class TestFetchSources(object):
             with open(os.path.join(sources_dir, f"{rpm['nvr']}.src.rpm"), 'rb') as f:
                 assert f.read() == b'Source RPM'
 
+    def test_srpms_download_cache(self, requests_mock, koji_session, workflow, source_dir,
+                                  tmp_path):
+        mock_koji_manifest_download(source_dir, requests_mock)
+        for _ in range(2):
+            runner = mock_env(workflow, source_dir, koji_build_nvr=KOJI_BUILD_GO_RPMS['nvr'])
+            workflow.conf.conf['downloads'] = {'cache_dir': str(tmp_path / 'cache')}
+            result = runner.run()
+            sources_dir = result[constants.PLUGIN_FETCH_SOURCES_KEY]['image_sources_dir']
+            assert len(os.listdir(sources_dir)) == len(ALL_RPM_BUILDS)
+
+        srpm_downloads = [request for request in requests_mock.request_history
+                          if request.method == 'GET' and request.url.endswith('.src.rpm')]
+        # SRPMs are downloaded only once, then found in the cache by their URL
+        assert len(srpm_downloads) == len(ALL_RPM_BUILDS)
+
+    def test_go_sources_multicalls(self, requests_mock, koji_session, workflow, source_dir):
+        mock_koji_manifest_download(source_dir, requests_mock)
+        runner = mock_env(workflow, source_dir, koji_build_nvr=KOJI_BUILD_GO_RPMS['nvr'])
+        runner.run()
+
+        multicalls = [(multicall.strict, multicall.batch,
+                       {call.method for call in multicall.calls}, len(multicall.calls))
+                      for multicall in koji_session.multicalls]
+        batch = constants.KOJI_MULTICALL_BATCH_SIZE
+        # one multicall per kind of lookup, regardless of the number of RPMs
+        assert multicalls == [
+            (True, batch, {'listRPMs'}, 3),
+            (True, batch, {'listRPMs'}, 1),
+            (True, batch, {'listRPMs'}, len(GO_BUILD_RPMS)),
+            # only golang RPMs are taken from the buildroots
+            (True, batch, {'getRPMHeaders'}, len(ALL_RPMS) - 2),
+            # every build is looked up once
+            (True, batch, {'getBuild'}, len(ALL_RPM_BUILDS)),
+        ]
+
+    def test_probe_srpm_urls(self, requests_mock, koji_session, workflow, source_dir):
+        mock_workflow(workflow, source_dir)
+        # a single worker probes the candidates in order
+        workflow.conf.conf['downloads'] = {'max_workers': 1}
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+
+        base_url = '{}/packages/foo/1/1'.format(KOJI_ROOT)
+        srpm_build_paths = {
+            srpm_filename: {'base_url': base_url, 'ignore_signing_intent': ignore}
+            for srpm_filename, ignore in (('both-1-1.src.rpm', False),
+                                          ('second-1-1.src.rpm', False),
+                                          ('missing-1-1.src.rpm', False),
+                                          ('golang-1-1.src.rpm', True))
+        }
+        available_urls = {
+            plugin.assemble_srpm_url(base_url, 'both-1-1.src.rpm', 'first'),
+            plugin.assemble_srpm_url(base_url, 'both-1-1.src.rpm', 'second'),
+            plugin.assemble_srpm_url(base_url, 'second-1-1.src.rpm', 'second'),
+            plugin.assemble_srpm_url(base_url, 'golang-1-1.src.rpm'),
+        }
+        for srpm_filename in srpm_build_paths:
+            for sigkey in ('first', 'second', None):
+                url = plugin.assemble_srpm_url(base_url, srpm_filename, sigkey)
+                status_code = 200 if url in available_urls else 404
+                requests_mock.register_uri('HEAD', url, status_code=status_code)
+
+        available = plugin.probe_srpm_urls(srpm_build_paths, ['First', 'Second'])
+
+        assert available == {
+            'both-1-1.src.rpm': (plugin.assemble_srpm_url(base_url, 'both-1-1.src.rpm', 'first'),
+                                 'First'),
+            'second-1-1.src.rpm': (plugin.assemble_srpm_url(base_url, 'second-1-1.src.rpm',
+                                                            'second'), 'Second'),
+            'golang-1-1.src.rpm': (plugin.assemble_srpm_url(base_url, 'golang-1-1.src.rpm'),
+                                   None),
+        }
+        probed = [request.url for request in requests_mock.request_history]
+        # SRPM found with the preferred key is not probed for the other one
+        assert plugin.assemble_srpm_url(base_url, 'both-1-1.src.rpm', 'second') not in probed
+        assert len(probed) == 6
+
+    @pytest.mark.parametrize('first_available', [True, False])
+    def test_probe_srpm_urls_failure(self, requests_mock, koji_session, workflow, source_dir,
+                                     first_available):
+        mock_workflow(workflow, source_dir)
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+
+        base_url = '{}/packages/foo/1/1'.format(KOJI_ROOT)
+        srpm_filename = 'foo-1-1.src.rpm'
+        srpm_build_paths = {srpm_filename: {'base_url': base_url, 'ignore_signing_intent': False}}
+        first_url = plugin.assemble_srpm_url(base_url, srpm_filename, 'first')
+        requests_mock.register_uri('HEAD', first_url, status_code=200 if first_available else 404)
+        requests_mock.register_uri('HEAD', plugin.assemble_srpm_url(base_url, srpm_filename,
+                                                                    'second'),
+                                   exc=requests.exceptions.ConnectionError)
+
+        if first_available:
+            # the less preferred key may be probed concurrently, its failure does not matter
+            available = plugin.probe_srpm_urls(srpm_build_paths, ['first', 'second'])
+            assert available == {srpm_filename: (first_url, 'first')}
+        else:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                plugin.probe_srpm_urls(srpm_build_paths, ['first', 'second'])
+
     @pytest.mark.parametrize('typeinfo_rs', (RS_TYPEINFO, RS_TYPEINFO_NO_JSON, RS_TYPEINFO_NO_2))
     @pytest.mark.parametrize('archives_in_koji', (4, 3, 5))
     def test_fetch_sources_multiple_remote_sources(self, typeinfo_rs, archives_in_koji,
@@ -805,7 +962,7 @@ class TestFetchSources(object):
             orig_build_id = results['sources_for_koji_build_id']
             orig_build_nvr = results['sources_for_nvr']
             sources_list = os.listdir(sources_dir)
-            remote_list = set(os.listdir(remote_sources_dir))
+            remote_list = list_remote_sources(remote_sources_dir)
             maven_list = set()
             for maven_sources_subdir in os.listdir(maven_sources_dir):
                 for source_archive in os.listdir(os.path.join(maven_sources_dir,
@@ -1309,6 +1466,19 @@ class TestFetchSources(object):
          [],
          None),
 
+        # entries ending with a slash or with empty components never match
+        ({'denylist_sources': 'http://excludelist_url'},
+         {'dir1': ['toremovedir/']},
+         None,
+         [],
+         None),
+
+        ({'denylist_sources': 'http://excludelist_url'},
+         {'deps//dir1': ['toremovefile']},
+         None,
+         [],
+         None),
+
         # test removing app
         ({'denylist_sources': 'http://excludelist_url'},
          {'dir1': ['appname']},
@@ -1465,7 +1635,7 @@ class TestFetchSources(object):
                 assert remote_sources_dir is None
                 return
 
-            remote_list = set(os.listdir(remote_sources_dir))
+            remote_list = list_remote_sources(remote_sources_dir)
             expected_remotes = set()
             expected_remotes.add('-'.join([KOJI_BUILD_RS['nvr'], REMOTE_SOURCE_TARBALL_FILENAME]))
             expected_remotes.add('-'.join([KOJI_PARENT_BUILD_RS['nvr'],
@@ -1481,3 +1651,125 @@ class TestFetchSources(object):
                     if 'Keeping vendor in app' == check_msg and not vendor_exists:
                         continue
                     assert check_msg in caplog.text
+
+    @staticmethod
+    def make_remote_source_archive(path):
+        with tarfile.open(path, 'w:gz') as tar:
+            def add(name, content=None, **attrs):
+                info = tarfile.TarInfo(name)
+                for attr, value in attrs.items():
+                    setattr(info, attr, value)
+                if content is None and info.type == tarfile.REGTYPE:
+                    info.type = tarfile.DIRTYPE
+                if content is not None:
+                    info.size = len(content)
+                    content = io.BytesIO(content)
+                tar.addfile(info, content)
+
+            add('app')
+            add('app/file1', b'file1')
+            add('app/vendor')
+            add('app/vendor/vendor_file', b'vendor')
+            add('deps')
+            add('deps/dir1')
+            add('deps/dir1/toremovedir')
+            add('deps/dir1/toremovedir/subdir')
+            add('deps/dir1/toremovedir/subdir/file', b'removed')
+            add('deps/dir1/toremovefile', b'removed')
+            add('deps/dir1/link', type=tarfile.LNKTYPE, linkname='deps/dir1/toremovefile')
+            add('deps/dir2/pretoremovefile', b'kept')
+            # implicit parent directory
+            add('deps/dir3/toremovedir/file', b'removed')
+            add('./deps/dir3/symlink', type=tarfile.SYMTYPE, linkname='toremovedir/file')
+
+    @pytest.mark.parametrize(('delete_app', 'expected'), [
+        (False, {'app', 'app/file1', 'app/vendor', 'app/vendor/vendor_file', 'deps',
+                 'deps/dir1', 'deps/dir2/pretoremovefile', './deps/dir3/symlink'}),
+        (True, {'app/vendor', 'app/vendor/vendor_file', 'deps',
+                'deps/dir1', 'deps/dir2/pretoremovefile', './deps/dir3/symlink'}),
+    ])
+    def test_filter_remote_source_archive(self, koji_session, workflow, source_dir, tmp_path,
+                                          caplog, delete_app, expected):
+        mock_workflow(workflow, source_dir)
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+        archive_dir = tmp_path / 'remote_source_0'
+        archive_dir.mkdir()
+        archive = str(archive_dir / 'remote-source.tar.gz')
+        self.make_remote_source_archive(archive)
+
+        denylist = PathSuffixMatcher(['/dir1/toremovedir', '/dir1/toremovefile', '/toremovedir'])
+        plugin._filter_remote_source_archive(archive, denylist, delete_app)
+
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert set(tar.getnames()) == expected
+            assert tar.extractfile('deps/dir2/pretoremovefile').read() == b'kept'
+            if not delete_app:
+                assert tar.extractfile('app/file1').read() == b'file1'
+        assert os.listdir(archive_dir) == ['remote-source.tar.gz']
+
+        assert 'Removing excluded directory deps/dir1/toremovedir' in caplog.text
+        assert 'Removing excluded directory deps/dir3/toremovedir' in caplog.text
+        assert 'Removing excluded file deps/dir1/toremovefile' in caplog.text
+        assert 'Removing hard link deps/dir1/link' in caplog.text
+        assert ('Removing app from' in caplog.text) == delete_app
+
+    def test_filter_remote_source_archive_pigz(self, koji_session, workflow, source_dir,
+                                               tmp_path):
+        mock_workflow(workflow, source_dir)
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+        archive = str(tmp_path / 'remote-source.tar.gz')
+        self.make_remote_source_archive(archive)
+
+        pigz_args = tmp_path / 'pigz_args'
+        pigz = tmp_path / 'pigz'
+        pigz.write_text(f'#!/bin/sh\necho "$@" > {pigz_args}\nexec gzip -c\n')
+        pigz.chmod(0o755)
+        flexmock(shutil).should_receive('which').with_args('pigz').and_return(str(pigz))
+
+        plugin._filter_remote_source_archive(archive, PathSuffixMatcher(), False,
+                                             gzip_threads=4)
+
+        assert pigz_args.read_text() == '-9 -c -p 4\n'
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert 'deps/dir1/toremovefile' in tar.getnames()
+
+    def test_filter_remote_source_archive_traversal(self, koji_session, workflow, source_dir,
+                                                    tmp_path):
+        mock_workflow(workflow, source_dir)
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+        archive = str(tmp_path / 'remote-source.tar.gz')
+        with tarfile.open(archive, 'w:gz') as tar:
+            info = tarfile.TarInfo('app/../../outside')
+            tar.addfile(info, io.BytesIO())
+
+        with pytest.raises(tarfile.ExtractError, match='Attempted path traversal'):
+            plugin._filter_remote_source_archive(archive, PathSuffixMatcher(), False)
+        assert not os.path.exists(archive + '.filtered')
+
+    @pytest.mark.parametrize('corrupted', [False, True])
+    def test_filter_remote_source_archive_failure_cleanup(self, koji_session, workflow,
+                                                          source_dir, tmp_path, corrupted):
+        mock_workflow(workflow, source_dir)
+        plugin = FetchSourcesPlugin(workflow, koji_build_id=KOJI_BUILD_RS['build_id'])
+        archive = str(tmp_path / 'remote-source.tar.gz')
+        if corrupted:
+            with open(archive, 'wb') as f:
+                f.write(b'not an archive')
+        else:
+            self.make_remote_source_archive(archive)
+        with open(archive, 'rb') as f:
+            original = f.read()
+
+        pigz = tmp_path / 'pigz'
+        pigz.write_text('#!/bin/sh\ncat > /dev/null\nexit 1\n')
+        pigz.chmod(0o755)
+        flexmock(shutil).should_receive('which').with_args('pigz').and_return(str(pigz))
+
+        expected_error = tarfile.ReadError if corrupted else RuntimeError
+        with pytest.raises(expected_error):
+            plugin._filter_remote_source_archive(archive, PathSuffixMatcher(), False,
+                                                 gzip_threads=4)
+
+        assert not os.path.exists(archive + '.filtered')
+        with open(archive, 'rb') as f:
+            assert f.read() == original
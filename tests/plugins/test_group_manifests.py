@@ -6,6 +6,8 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 from functools import partial
+import logging
+import threading
 
 import pytest
 import json
@@ -24,7 +26,7 @@ from tests.mock_env import MockEnv
 from atomic_reactor.plugin import PluginFailedException
 from atomic_reactor.inner import TagConf
 from atomic_reactor.util import (registry_hostname, ManifestDigest, get_floating_images,
-                                 get_primary_images, sha256sum, RegistrySession, RegistryClient)
+                                 get_primary_images, sha256sum, RegistrySession)
 from atomic_reactor.utils.manifest import ManifestUtil
 from atomic_reactor.plugins.group_manifests import GroupManifestsPlugin, BuiltImage
 from osbs.utils import ImageName
@@ -54,6 +56,8 @@ class MockRegistry(object):
     def __init__(self, registry):
         self.hostname = registry_hostname(registry)
         self.repos = {}
+        # (target repo, digest, source repo) of every blob mount request
+        self.mounts = []
         self._add_pattern(responses.GET, r'/v2/(.*)/manifests/([^/]+)',
                           self._get_manifest)
         self._add_pattern(responses.HEAD, r'/v2/(.*)/manifests/([^/]+)',
@@ -160,6 +164,7 @@ class MockRegistry(object):
         return (200, headers, blob)
 
     def _mount_blob(self, req, target_name, digest, source_name):
+        self.mounts.append((target_name, digest, source_name))
         source_repo = self.get_repo(source_name)
         target_repo = self.get_repo(target_name)
 
@@ -528,6 +533,11 @@ def test_group_manifests(workflow, source_dir, schema_version, test_name, group,
                     repo = image.to_str(registry=False, tag=False)
                     assert image.tag not in target_registry.get_repo(repo)['tags']
 
+        for registry in mocked_registries.values():
+            # blobs are mounted once per target repository, regardless of the number of tags
+            assert len(registry.mounts) == len(set(registry.mounts))
+            assert all(target != source for target, _, source in registry.mounts)
+
         # Check that plugin returns ManifestDigest object
         plugin_results = results[GroupManifestsPlugin.key]
 
@@ -551,10 +561,14 @@ UNIQUE_IMAGE = f'{REGISTRY_V2}/namespace/httpd:2.4'
 @pytest.mark.parametrize("manifest_version", ["v2", "oci"])
 @responses.activate
 def test_get_built_images(workflow, manifest_version):
-    MockEnv(workflow).set_check_platforms_result(["ppc64le", "x86_64"])
+    (
+        MockEnv(workflow)
+        .set_check_platforms_result(["ppc64le", "x86_64"])
+        .set_reactor_config({"version": 1, "registry": {"url": f"https://{REGISTRY_V2}/v2"}})
+    )
     workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
 
-    _, platform_digests = mock_registries(
+    mocked_registries, platform_digests = mock_registries(
         [REGISTRY_V2],
         {
             "ppc64le": {REGISTRY_V2: ["namespace/httpd:2.4-ppc64le"]},
@@ -566,8 +580,6 @@ def test_get_built_images(workflow, manifest_version):
     ppc_digest = platform_digests["ppc64le"]["digests"][0]["digest"]
     x86_digest = platform_digests["x86_64"]["digests"][0]["digest"]
 
-    flexmock(ManifestUtil).should_receive("__init__")  # and do nothing, this test doesn't use it
-
     plugin = GroupManifestsPlugin(workflow)
     session = RegistrySession(REGISTRY_V2)
 
@@ -586,28 +598,171 @@ def test_get_built_images(workflow, manifest_version):
         ),
     ]
 
+    # a single request per arch, the manifests are kept for grouping
+    assert len(responses.calls) == 2
+    registry = mocked_registries[REGISTRY_V2]
+    assert {
+        key: content for key, (content, _, _) in plugin.manifests.items()
+    } == {
+        ("namespace/httpd", ppc_digest): registry.get_manifest("namespace/httpd", ppc_digest),
+        ("namespace/httpd", x86_digest): registry.get_manifest("namespace/httpd", x86_digest),
+    }
 
-@responses.activate
-def test_get_built_images_multiple_manifest_types(workflow):
-    MockEnv(workflow).set_check_platforms_result(["x86_64"])
-    workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
-
-    flexmock(ManifestUtil).should_receive("__init__")  # and do nothing, this test doesn't use it
 
+@responses.activate
+def test_get_built_images_unexpected_manifest_type(workflow):
     (
-        flexmock(RegistryClient)
-        .should_receive("get_manifest_digests")
-        .with_args(ImageName.parse(f"{UNIQUE_IMAGE}-x86_64"), versions=("v2", "oci"))
-        .and_return(ManifestDigest({"v2": make_digest("foo"), "oci": make_digest("bar")}))
+        MockEnv(workflow)
+        .set_check_platforms_result(["x86_64"])
+        .set_reactor_config({"version": 1, "registry": {"url": f"https://{REGISTRY_V2}/v2"}})
     )
+    workflow.data.tag_conf.add_unique_image(UNIQUE_IMAGE)
+
+    mock_registries([REGISTRY_V2], {"x86_64": {REGISTRY_V2: []}},
+                    manifest_list_tag="namespace/httpd:2.4-x86_64")
 
     plugin = GroupManifestsPlugin(workflow)
     session = RegistrySession(REGISTRY_V2)
 
     expect_error = (
-        f"Expected to find a single manifest digest for {UNIQUE_IMAGE}-x86_64, "
-        "but found multiple: {'v2': .*, 'oci': .*}"
+        f"Expected to find a v2 or oci manifest for {UNIQUE_IMAGE}-x86_64, "
+        "but found application/vnd.docker.distribution.manifest.list.v2\\+json"
     )
 
     with pytest.raises(RuntimeError, match=expect_error):
         plugin.get_built_images(session)
+
+
+@responses.activate
+def test_link_blobs_into_repositories():
+    registry = MockRegistry(REGISTRY_V2)
+    blob_a = registry.add_blob('source', 'a')
+    blob_b = registry.add_blob('source', 'b')
+
+    manifest_util = ManifestUtil(flexmock(conf=flexmock(registry={})), logging.getLogger(__name__))
+    session = RegistrySession(REGISTRY_V2)
+
+    manifest_util.link_blobs_into_repositories(session, [
+        (blob_a, 'source', 'target'),
+        (blob_b, 'source', 'target'),
+        (blob_a, 'source', 'target'),
+        (blob_a, 'source', 'other-target'),
+        (blob_a, 'source', 'source'),
+    ])
+
+    assert sorted(registry.mounts) == sorted([
+        ('other-target', blob_a, 'source'),
+        ('target', blob_a, 'source'),
+        ('target', blob_b, 'source'),
+    ])
+    assert registry.get_blob('target', blob_b) == 'b'
+
+    # blobs already linked are not mounted again
+    manifest_util.link_blobs_into_repositories(session, [(blob_a, 'source', 'target')])
+    assert len(registry.mounts) == 3
+
+
+@responses.activate
+def test_link_blobs_into_repositories_failure():
+    manifest_util = ManifestUtil(flexmock(conf=flexmock(registry={})), logging.getLogger(__name__))
+    session = RegistrySession(REGISTRY_V2)
+    links = [(make_digest(blob), 'source', 'target') for blob in ('a', 'b', 'c')]
+
+    def link_blob(session, digest, source_repo, target_repo):
+        if digest == links[1][0]:
+            raise RuntimeError('mount failed')
+
+    flexmock(manifest_util).should_receive('link_blob_into_repository').replace_with(link_blob)
+    with pytest.raises(RuntimeError, match='mount failed'):
+        manifest_util.link_blobs_into_repositories(session, links)
+
+    # the failed link is retried next time, the successful ones are not
+    (
+        flexmock(manifest_util)
+        .should_receive('link_blob_into_repository')
+        .with_args(session, links[1][0], 'source', 'target')
+        .once()
+    )
+    manifest_util.link_blobs_into_repositories(session, links)
+
+
+@responses.activate
+def test_link_blobs_into_repositories_not_run():
+    manifest_util = ManifestUtil(flexmock(conf=flexmock(registry={})), logging.getLogger(__name__),
+                                 max_workers=1)
+    session = RegistrySession(REGISTRY_V2)
+    links = [(make_digest(blob), 'source', 'target') for blob in ('a', 'b', 'c')]
+    linked = []
+    failing = {links[1][0]}
+
+    def link_blob(session, digest, source_repo, target_repo):
+        linked.append(digest)
+        if digest in failing:
+            failing.discard(digest)
+            raise RuntimeError('mount failed')
+
+    flexmock(manifest_util).should_receive('link_blob_into_repository').replace_with(link_blob)
+    with pytest.raises(RuntimeError, match='mount failed'):
+        manifest_util.link_blobs_into_repositories(session, links)
+    # the link after the failed one did not run
+    assert linked == [links[0][0], links[1][0]]
+
+    # both the failed link and the one which did not run are linked next time
+    manifest_util.link_blobs_into_repositories(session, links)
+    assert linked == [links[0][0], links[1][0], links[1][0], links[2][0]]
+
+
+@responses.activate
+@pytest.mark.parametrize('first_fails', [False, True])
+def test_link_blobs_into_repositories_in_flight(first_fails):
+    manifest_util = ManifestUtil(flexmock(conf=flexmock(registry={})), logging.getLogger(__name__))
+    session = RegistrySession(REGISTRY_V2)
+    links = [(make_digest('a'), 'source', 'target')]
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def link_blob(session, digest, source_repo, target_repo):
+        calls.append(digest)
+        if len(calls) == 1:
+            started.set()
+            release.wait(10)
+            if first_fails:
+                raise RuntimeError('mount failed')
+
+    flexmock(manifest_util).should_receive('link_blob_into_repository').replace_with(link_blob)
+
+    errors = []
+
+    def first():
+        try:
+            manifest_util.link_blobs_into_repositories(session, links)
+        except RuntimeError as ex:
+            errors.append(ex)
+
+    first_thread = threading.Thread(target=first)
+    first_thread.start()
+    assert started.wait(10)
+
+    second_thread = threading.Thread(
+        target=manifest_util.link_blobs_into_repositories, args=(session, links)
+    )
+    second_thread.start()
+    # the second call waits for the link in flight instead of skipping it
+    second_thread.join(0.1)
+    assert second_thread.is_alive()
+
+    release.set()
+    first_thread.join(10)
+    second_thread.join(10)
+    assert not second_thread.is_alive()
+
+    if first_fails:
+        # the waiting call links the blob itself
+        assert len(errors) == 1
+        assert calls == [links[0][0]] * 2
+    else:
+        assert not errors
+        assert calls == [links[0][0]]
+    assert manifest_util._linked_blobs == {('target', links[0][0])}
+    assert not manifest_util._linking_blobs
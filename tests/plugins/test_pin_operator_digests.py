@@ -10,6 +10,8 @@ import copy
 import io
 import os
 import pathlib
+import threading
+import time
 
 from ruamel.yaml import YAML
 from ruamel.yaml.comments import CommentedMap
@@ -679,7 +681,7 @@ class TestPinOperatorDigest(object):
 
         if not pin_digest:
             assert "User disabled digest pinning" in caplog.text
-            assert "Making sure tag is manifest list digest" not in caplog.text
+            assert "Making sure tags are manifest list digests" not in caplog.text
         if not replace_repo:
             assert "User disabled repo replacements" in caplog.text
             assert "Replacing namespace/repo" not in caplog.text
@@ -835,6 +837,107 @@ class TestPullspecReplacer(object):
         else:
             assert "{} looks like a digest, skipping query".format(digest) in caplog.text
 
+    def test_pin_digests(self, workflow):
+        other_registry = 'registry.public.example.com'
+        pullspecs = [
+            '{}/ns/{}:1'.format(SOURCE_REGISTRY_URI, repo) for repo in ('foo', 'bar', 'baz')
+        ] + [
+            '{}/ns/foo:1'.format(other_registry),
+            '{}/ns/foo@sha256:654321'.format(other_registry),
+        ]
+        images = [ImageName.parse(p) for p in pullspecs]
+        site_config = get_site_config()
+        site_config['digest_pinning'] = {'max_connections_per_registry': 2}
+        reactor_config = make_reactor_config(site_config)
+        reactor_config['pull_registries'] = [{'url': other_registry}]
+        MockEnv(workflow).set_reactor_config(reactor_config)
+
+        lock = threading.Lock()
+        running = {SOURCE_REGISTRY_URI: 0, other_registry: 0}
+        max_running = dict(running)
+        queried = []
+
+        def mocked_get_manifest_list_digest(image):
+            with lock:
+                queried.append(image.to_str())
+                running[image.registry] += 1
+                max_running[image.registry] = max(max_running[image.registry],
+                                                  running[image.registry])
+            time.sleep(0.05)
+            with lock:
+                running[image.registry] -= 1
+            return 'sha256:{}'.format(len(image.to_str()))
+
+        (flexmock(atomic_reactor.util.RegistryClient)
+            .should_receive('get_manifest_list_digest')
+            .replace_with(mocked_get_manifest_list_digest))
+
+        replacer = PullspecReplacer(user_config={}, workflow=workflow)
+        # duplicate pullspecs are queried only once
+        pinned = replacer.pin_digests(images + images[:2])
+
+        assert sorted(queried) == sorted(pullspecs[:4])
+        assert max_running == {SOURCE_REGISTRY_URI: 2, other_registry: 1}
+        assert pinned == {
+            image: image if image.tag.startswith('sha256:')
+            else ImageName(registry=image.registry, namespace=image.namespace,
+                           repo=image.repo, tag='sha256:{}'.format(len(image.to_str())))
+            for image in images
+        }
+
+        # digests are cached for the rest of the build
+        assert replacer.pin_digest(images[0]) == pinned[images[0]]
+        assert replacer.pin_digests(images) == pinned
+        assert len(queried) == 4
+
+    def test_pin_digests_digest_cache(self, workflow, tmp_path):
+        pullspecs = [
+            '{}/ns/foo:1'.format(SOURCE_REGISTRY_URI),
+            '{}/ns/bar:latest'.format(SOURCE_REGISTRY_URI),
+        ]
+        images = [ImageName.parse(p) for p in pullspecs]
+        reactor_config = make_reactor_config(get_site_config())
+        reactor_config['digest_cache'] = {'cache_dir': str(tmp_path)}
+        MockEnv(workflow).set_reactor_config(reactor_config)
+
+        mock_digest_query({pullspecs[0]: 'sha256:123456', pullspecs[1]: 'sha256:654321'})
+        pinned = PullspecReplacer(user_config={}, workflow=workflow).pin_digests(images)
+
+        # only the floating tag is queried by the next build
+        (flexmock(atomic_reactor.util.RegistryClient)
+            .should_receive('get_manifest_list_digest')
+            .with_args(images[1])
+            .and_return('sha256:654321')
+            .once())
+        replacer = PullspecReplacer(user_config={}, workflow=workflow)
+        assert replacer.pin_digests(images) == pinned
+        assert replacer.digest_cache.stats == {
+            'hits': 1, 'misses': 0, 'expired': 0, 'bypassed': 1, 'hit_ratio': 1.0,
+        }
+
+    def test_pin_digests_failure(self, workflow):
+        images = [ImageName.parse('{}/ns/foo:{}'.format(SOURCE_REGISTRY_URI, i))
+                  for i in range(10)]
+        site_config = get_site_config()
+        site_config['digest_pinning'] = {'max_workers': 1}
+        self.mock_workflow(workflow, site_config)
+
+        queried = []
+
+        def mocked_get_manifest_list_digest(image):
+            queried.append(image)
+            raise RuntimeError('manifest list not found: {}'.format(image))
+
+        (flexmock(atomic_reactor.util.RegistryClient)
+            .should_receive('get_manifest_list_digest')
+            .replace_with(mocked_get_manifest_list_digest))
+
+        replacer = PullspecReplacer(user_config={}, workflow=workflow)
+        with pytest.raises(RuntimeError, match='manifest list not found: .*/ns/foo:0'):
+            replacer.pin_digests(images)
+        # queries which have not started yet are cancelled
+        assert len(queried) < len(images)
+
     @pytest.mark.parametrize('image, replacement_registries, replaced', [
         ('old-registry/ns/foo', {'old-registry': 'new-registry'}, 'new-registry/ns/foo'),
         ('registry/ns/foo', {}, 'registry/ns/foo'),
@@ -34,6 +34,7 @@ from atomic_reactor.plugins.resolve_composes import (
 )
 from atomic_reactor.source import SourceConfig
 from atomic_reactor.utils.odcs import ODCSClient, construct_compose_url, WaitComposeToFinishTimeout
+from atomic_reactor.utils.polling import PollingStats
 from tests.mock_env import MockEnv
 from tests.util import add_koji_map_in_workflow
 
@@ -169,7 +170,7 @@ def mock_content_sets_config(source_dir: Path, data=None):
 def mock_odcs_client_start_compose():
     """
     Common mock for tests requiring basic compose operation. Typically, this
-    should be used with mock_odcs_client_wait_for_compose. However, if the
+    should be used with mock_odcs_client_wait_for_composes. However, if the
     fake data set in this mock cannot fulfill the requirement of a test, please
     write a custom one specifically.
     """
@@ -184,12 +185,17 @@ def mock_odcs_client_start_compose():
         .and_return(ODCS_COMPOSE))
 
 
-def mock_odcs_client_wait_for_compose():
-    """Refer to the doc of mock_odcs_client_start_compose"""
+def mock_odcs_client_wait_for_composes(composes=None):
+    """Refer to the doc of mock_odcs_client_start_compose
+
+    :param composes: dict, compose info returned for each compose ID, by default
+        only ODCS_COMPOSE is known
+    """
+    if composes is None:
+        composes = {ODCS_COMPOSE_ID: ODCS_COMPOSE}
     (flexmock(ODCSClient)
-        .should_receive('wait_for_compose')
-        .with_args(ODCS_COMPOSE_ID)
-        .and_return(ODCS_COMPOSE))
+        .should_receive('wait_for_composes')
+        .replace_with(lambda compose_ids: [composes[compose_id] for compose_id in compose_ids]))
 
 
 def mock_koji_session():
@@ -242,7 +248,7 @@ class TestResolveComposes(object):
 
     def test_request_compose(self, mocked_env):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
         self.run_plugin_with_args(mocked_env)
 
     @pytest.mark.parametrize('arches', (
@@ -260,7 +266,7 @@ class TestResolveComposes(object):
                 arches=arches)
             .once()
             .and_return(ODCS_COMPOSE))
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
 
@@ -329,6 +335,7 @@ class TestResolveComposes(object):
 
         parent_compose_ids = [10, 11]
         parent_repo = "http://example.com/parent.repo"
+        composes = {}
         mock_koji_parent(mocked_env,
                          parent_compose_ids=parent_compose_ids if parent_compose else None,
                          parent_repo=parent_repo if parent_repourls else None,
@@ -353,10 +360,7 @@ class TestResolveComposes(object):
                 .once()
                 .and_return(odcs_with_arches))
 
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(ODCS_COMPOSE_ID)
-                .and_return(odcs_with_arches))
+            composes[ODCS_COMPOSE_ID] = odcs_with_arches
 
         compose_ids = []
         current_repourls = ["http://example.com/current.repo"]
@@ -370,12 +374,7 @@ class TestResolveComposes(object):
                 compose = odcs_with_arches.copy()
                 compose['id'] = compose_id
                 compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
-
-                (flexmock(ODCSClient)
-                    .should_receive('wait_for_compose')
-                    .once()
-                    .with_args(compose_id)
-                    .and_return(compose))
+                composes[compose_id] = compose
 
                 compose_ids.append(compose_id)
                 for arch in arches:
@@ -386,12 +385,8 @@ class TestResolveComposes(object):
                 compose = odcs_with_arches.copy()
                 compose['id'] = compose_id
                 compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
+                composes[compose_id] = compose
 
-                (flexmock(ODCSClient)
-                 .should_receive('wait_for_compose')
-                 .once()
-                 .with_args(compose_id)
-                 .and_return(compose))
                 for arch in arches:
                     expected_yum_repourls[arch].append(compose['result_repofile'])
 
@@ -403,6 +398,7 @@ class TestResolveComposes(object):
             for arch in expected_yum_repourls or arches:
                 expected_yum_repourls[arch].append(parent_repo)
 
+        mock_odcs_client_wait_for_composes(composes)
         mocked_env.set_check_platforms_result(arches)
 
         plugin_args = {}
@@ -456,7 +452,7 @@ class TestResolveComposes(object):
             .once()
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
@@ -497,7 +493,7 @@ class TestResolveComposes(object):
             .once()
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         mocked_env.set_check_platforms_result(arches)
         self.run_plugin_with_args(mocked_env)
@@ -561,7 +557,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env)
 
@@ -593,7 +589,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env)
 
@@ -651,7 +647,7 @@ class TestResolveComposes(object):
                        arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env)
 
@@ -760,6 +756,7 @@ class TestResolveComposes(object):
                                         expected_intent, flags, expected_flags):
         content_set = ''
         pulp_composes = {}
+        composes = {}
         base_repos = ['spam', 'bacon', 'eggs']
         pulp_id = ODCS_COMPOSE_ID
         arches = arches or []
@@ -797,10 +794,7 @@ class TestResolveComposes(object):
                 .with_args(source_type='pulp', source=source, arches=[arch], sigkeys=[],
                            flags=expected_flags)
                 .and_return(pulp_composes[arch]).once())
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(pulp_id)
-                .and_return(pulp_composes[arch]).once())
+            composes[pulp_id] = pulp_composes[arch]
 
         mock_content_sets_config(mocked_env._tmpdir, content_set)
 
@@ -836,10 +830,8 @@ class TestResolveComposes(object):
                            packages=['spam', 'bacon', 'eggs'], sigkeys=sig_keys)
                 .and_return(tag_compose).once())
 
-        (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
-            .with_args(ODCS_COMPOSE_ID)
-            .and_return(tag_compose).once())
+        composes[ODCS_COMPOSE_ID] = tag_compose
+        mock_odcs_client_wait_for_composes(composes)
 
         plugin_result = self.run_plugin_with_args(mocked_env, platforms=arches, is_pulp=pulp_arches)
 
@@ -878,7 +870,7 @@ class TestResolveComposes(object):
         mock_repo_config(mocked_env._tmpdir, repo_config)
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env)
 
@@ -909,7 +901,8 @@ class TestResolveComposes(object):
             {'insecure': False, 'timeout': None}
         ),
     ))
-    def test_odcs_session_creation(self, mocked_env, plugin_args, expected_kwargs):
+    def test_odcs_session_creation(self, mocked_env, plugin_args, expected_kwargs,
+                                   monkeypatch):
         plug_args = deepcopy(plugin_args)
         exp_kwargs = deepcopy(expected_kwargs)
         mocked_env.set_reactor_config(make_reactor_config(mocked_env._tmpdir))
@@ -933,11 +926,13 @@ class TestResolveComposes(object):
             )
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         (flexmock(ODCSClient)
             .should_receive('__init__')
             .with_args(ODCS_URL, **exp_kwargs))
+        # normally set by the mocked __init__
+        monkeypatch.setattr(ODCSClient, 'polling_stats', PollingStats(), raising=False)
 
         self.run_plugin_with_args(mocked_env, plug_args)
 
@@ -967,7 +962,7 @@ class TestResolveComposes(object):
             .and_return(KOJI_TARGET))
 
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env, plugin_args)
 
@@ -1040,10 +1035,10 @@ class TestResolveComposes(object):
             .and_return(odcs_compose))
 
         (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
+            .should_receive('wait_for_composes')
             .once()
-            .with_args(odcs_compose['id'])
-            .and_return(odcs_compose))
+            .with_args([odcs_compose['id']])
+            .and_return([odcs_compose]))
 
         parent_build_info = {
             'id': 1234,
@@ -1088,15 +1083,14 @@ class TestResolveComposes(object):
             compose = ODCS_COMPOSE.copy()
             compose['id'] = compose_id
             compose['sigkeys'] = ' '.join(SIGNING_INTENTS[signing_intent])
-
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .once()
-                .with_args(compose_id)
-                .and_return(compose))
-
             composes.append(compose)
 
+        (flexmock(ODCSClient)
+            .should_receive('wait_for_composes')
+            .once()
+            .with_args([item['id'] for item in composes])
+            .and_return(composes))
+
         (flexmock(ODCSClient)
             .should_receive('start_compose')
             .never())
@@ -1149,7 +1143,7 @@ class TestResolveComposes(object):
                 arches=['x86_64'])
             .and_return(ODCS_COMPOSE))
 
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
 
         self.run_plugin_with_args(mocked_env)
 
@@ -1198,7 +1192,7 @@ class TestResolveComposes(object):
                     arches=['x86_64'])
                 .once()
                 .and_return(ODCS_COMPOSE))
-            mock_odcs_client_wait_for_compose()
+            mock_odcs_client_wait_for_composes()
             self.run_plugin_with_args(mocked_env)
         else:
             (flexmock(ODCSClient)
@@ -1245,10 +1239,10 @@ class TestResolveComposes(object):
             .never())
 
         (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
+            .should_receive('wait_for_composes')
             .once()
-            .with_args(old_odcs_compose['id'])
-            .and_return(old_odcs_compose))
+            .with_args([old_odcs_compose['id']])
+            .and_return([old_odcs_compose]))
 
         (flexmock(ODCSClient)
             .should_receive('renew_compose')
@@ -1257,10 +1251,10 @@ class TestResolveComposes(object):
             .and_return(new_odcs_compose))
 
         (flexmock(ODCSClient)
-            .should_receive('wait_for_compose')
+            .should_receive('wait_for_composes')
             .times(1 if expect_renew else 0)
-            .with_args(new_odcs_compose['id'])
-            .and_return(new_odcs_compose))
+            .with_args([new_odcs_compose['id']])
+            .and_return([new_odcs_compose]))
 
         plugin_args = {
             'compose_ids': [old_odcs_compose['id']],
@@ -1299,9 +1293,54 @@ class TestResolveComposes(object):
             assert plugin_result['composes'] == [old_odcs_compose]
             assert 'Updating signing keys' not in caplog.text
 
+    def test_renew_multiple_composes(self, mocked_env):
+        composes = []
+        renewed_composes = {}
+        for compose_id in range(3):
+            compose = ODCS_COMPOSE.copy()
+            compose['id'] = compose_id
+            # the middle compose has plenty of time left, the others expired
+            if compose_id != 1:
+                compose['state_name'] = 'removed'
+                renewed = compose.copy()
+                renewed.update({'id': compose_id + 10, 'state_name': 'done'})
+                renewed_composes[compose_id] = renewed
+            composes.append(compose)
+
+        (flexmock(ODCSClient)
+            .should_receive('start_compose')
+            .never())
+
+        (flexmock(ODCSClient)
+            .should_receive('wait_for_composes')
+            .once()
+            .with_args([0, 1, 2])
+            .and_return(composes))
+
+        for compose_id, renewed in renewed_composes.items():
+            (flexmock(ODCSClient)
+                .should_receive('renew_compose')
+                .once()
+                .with_args(compose_id, [])
+                .and_return(renewed))
+
+        # renewed composes are waited for together, in a single call
+        (flexmock(ODCSClient)
+            .should_receive('wait_for_composes')
+            .once()
+            .with_args([10, 12])
+            .and_return([renewed_composes[0], renewed_composes[2]]))
+
+        plugin_args = {'compose_ids': [0, 1, 2]}
+        plugin_result = self.run_plugin_with_args(mocked_env, plugin_args)
+
+        assert plugin_result['composes'] == [renewed_composes[0], composes[1],
+                                             renewed_composes[2]]
+        assert 'odcs' in mocked_env.workflow.data.polling_stats
+
     def test_inject_yum_repos_from_new_compose(self, mocked_env):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
         results = self.run_plugin_with_args(mocked_env)
         yum_repourls = results.get('yum_repourls') or {}
         expected_yum_repourls = defaultdict(list)
@@ -1310,22 +1349,19 @@ class TestResolveComposes(object):
 
     def test_inject_yum_repos_from_existing_composes(self, mocked_env):
         compose_ids = []
+        composes = {}
         expected_yum_repourls = defaultdict(list)
 
         for compose_id in range(3):
             compose = ODCS_COMPOSE.copy()
             compose['id'] = compose_id
             compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(compose_id)
-
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .once()
-                .with_args(compose_id)
-                .and_return(compose))
+            composes[compose_id] = compose
 
             compose_ids.append(compose_id)
             expected_yum_repourls[ODCS_COMPOSE_DEFAULT_ARCH].append(compose['result_repofile'])
 
+        mock_odcs_client_wait_for_composes(composes)
         (flexmock(ODCSClient)
             .should_receive('start_compose')
             .never())
@@ -1431,7 +1467,7 @@ class TestResolveComposes(object):
     def test_content_sets_validation(self, mocked_env,
                                      content_sets_content, expect_error):
         mock_odcs_client_start_compose()
-        mock_odcs_client_wait_for_compose()
+        mock_odcs_client_wait_for_composes()
         mock_content_sets_config(mocked_env._tmpdir, content_sets_content)
         self.run_plugin_with_args(mocked_env, expect_error=expect_error)
 
@@ -1504,21 +1540,11 @@ class TestResolveComposes(object):
         if content_sets:
             start_chain.and_return(custom_pulp_compose)
 
-        if modules:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_module_id)
-                .and_return(custom_module_compose))
-        if packages:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_package_id)
-                .and_return(custom_package_compose))
-        if content_sets:
-            (flexmock(ODCSClient)
-                .should_receive('wait_for_compose')
-                .with_args(compose_pulp_id)
-                .and_return(custom_pulp_compose))
+        mock_odcs_client_wait_for_composes({
+            compose_module_id: custom_module_compose,
+            compose_package_id: custom_package_compose,
+            compose_pulp_id: custom_pulp_compose,
+        })
 
         results = self.run_plugin_with_args(mocked_env)
 
@@ -1558,17 +1584,14 @@ class TestResolveComposes(object):
                          parent_compose_ids=parent_compose_ids,
                          parent_repo=None,
                          scratch=False, isolated=False)
+        composes = {ODCS_COMPOSE_ID: ODCS_COMPOSE}
         for parent_compose_id in parent_compose_ids:
             compose = ODCS_COMPOSE.copy()
             compose['id'] = parent_compose_id
             compose['result_repofile'] = ODCS_COMPOSE_REPO + '/odcs-{}.repo'.format(
                 parent_compose_id)
+            composes[parent_compose_id] = compose
 
-            (flexmock(ODCSClient)
-             .should_receive('wait_for_compose')
-             .once()
-             .with_args(parent_compose_id)
-             .and_return(compose))
             # Ensure ODCS responses the compose is still waiting for process before
             # checking the timeout.
             parent_url = construct_compose_url(ODCS_URL, parent_compose_id)
@@ -1582,11 +1605,7 @@ class TestResolveComposes(object):
                  .once()
                  .with_args(compose['id'], [])
                  .and_return(renew_compose))
-                (flexmock(ODCSClient)
-                 .should_receive('wait_for_compose')
-                 .once()
-                 .with_args(renew_compose['id'])
-                 .and_return(renew_compose))
+                composes[renew_compose['id']] = renew_compose
                 if renew_compose['id'] == 15:
                     responses.add(responses.GET, url=renew_parent_url, json={
                         'id': renew_compose['id'],
@@ -1609,12 +1628,19 @@ class TestResolveComposes(object):
         # No need to start a new one.
         plugin_args = {'compose_ids': [ODCS_COMPOSE_ID]}
 
-        # Ensure ODCSClient.wait_for_compose raises timeout error
+        # Ensure ODCSClient.wait_for_composes raises timeout error, either while
+        # waiting for the renewed composes or while waiting for the given ones
+        timeout_compose_id = 15 if cancel_compose else ODCS_COMPOSE_ID
+
+        def mock_wait_for_composes(compose_ids):
+            if timeout_compose_id in compose_ids:
+                raise WaitComposeToFinishTimeout(timeout_compose_id,
+                                                 ODCSClient.DEFAULT_WAIT_TIMEOUT)
+            return [composes[compose_id] for compose_id in compose_ids]
+
         (flexmock(ODCSClient)
-         .should_receive('wait_for_compose')
-         .with_args(ODCS_COMPOSE_ID)
-         .once()
-         .and_raise(WaitComposeToFinishTimeout(ODCS_COMPOSE_ID, ODCSClient.DEFAULT_WAIT_TIMEOUT)))
+         .should_receive('wait_for_composes')
+         .replace_with(mock_wait_for_composes))
 
         # Ensure ODCS responses the compose is still waiting for process before
         # checking the timeout.
@@ -1629,7 +1655,7 @@ class TestResolveComposes(object):
         with pytest.raises(PluginFailedException) as exc:
             self.run_plugin_with_args(mocked_env, plugin_args=plugin_args)
 
-        msg = 'Timeout of waiting for compose {}'.format(ODCS_COMPOSE_ID)
+        msg = 'Timeout of waiting for compose {}'.format(timeout_compose_id)
         assert msg in str(exc.value)
         if cancel_compose:
             msg = 'Canceling the compose 15'
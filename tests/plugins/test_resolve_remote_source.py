@@ -609,6 +609,7 @@ def test_resolve_remote_source(workflow, scratch, dr_strs, dependency_replacemen
     }
     # https://github.com/openshift/imagebuilder/issues/139
     assert not workflow.data.buildargs["REMOTE_SOURCE"].startswith("/")
+    assert 'cachito' in workflow.data.polling_stats
 
 
 @pytest.mark.parametrize(
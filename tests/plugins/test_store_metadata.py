@@ -79,19 +79,22 @@ def prepare(workflow, registry=None, no_dockerfile=True, init_dirs=True):
     (flexmock(RegistryClient)
      .should_receive('get_manifest_digests')
      .with_args(image=ImageName.parse(f'{registry}/{TEST_IMAGE_NAME}'),
-                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True)
+                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True,
+                concurrent=True)
      .and_return(ManifestDigest(v1=DIGEST_NOT_USED, v2=DIGEST1)))
 
     (flexmock(RegistryClient)
      .should_receive('get_manifest_digests')
      .with_args(image=ImageName.parse(f'{registry}/namespace/image:version-release'),
-                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True)
+                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True,
+                concurrent=True)
      .and_return(None))
 
     (flexmock(RegistryClient)
      .should_receive('get_manifest_digests')
      .with_args(image=ImageName.parse(f'{registry}/namespace/image:asd123'),
-                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True)
+                versions=('v1', 'v2', 'v2_list', 'oci', 'oci_index'), require_digest=True,
+                concurrent=True)
      .and_return(ManifestDigest(v1=DIGEST_NOT_USED, v2=DIGEST2)))
 
     flexmock(workflow.imageutil).should_receive('base_image_inspect').and_return({'Id': '01234567'})
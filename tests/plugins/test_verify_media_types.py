@@ -225,31 +225,33 @@ class TestVerifyImageTypes(object):
         v2_header_v2 = {'Accept': MEDIA_TYPE_DOCKER_V2_SCHEMA2}
         manifest_header = {'Accept': MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST}
 
-        (flexmock(requests.Session)
-            .should_receive('get')
-            .with_args(actual_v2_url, headers=v2_header_v1,
-                       auth=HTTPRegistryAuth, verify=False)
-            .and_return(v1_response))
-        (flexmock(requests.Session)
-            .should_receive('get')
-            .with_args(actual_v2_url, headers=v2_header_v2,
-                       auth=HTTPRegistryAuth, verify=False)
-            .and_return(v2_response))
-        (flexmock(requests.Session)
-            .should_receive('get')
-            .with_args(actual_v2_url, headers={'Accept': MEDIA_TYPE_OCI_V1},
-                       auth=HTTPRegistryAuth, verify=False)
-            .and_return(v1_oci_response))
-        (flexmock(requests.Session)
-            .should_receive('get')
-            .with_args(actual_v2_url, headers={'Accept': MEDIA_TYPE_OCI_V1_INDEX},
-                       auth=HTTPRegistryAuth, verify=False)
-            .and_return(v1_oci_index_response))
-        (flexmock(requests.Session)
-            .should_receive('get')
-            .with_args(actual_v2_url, headers=manifest_header,
-                       auth=HTTPRegistryAuth, verify=False)
-            .and_return(v2_list_response))
+        # manifest digests are looked up with HEAD requests, falling back to GET
+        for method in ('get', 'head'):
+            (flexmock(requests.Session)
+                .should_receive(method)
+                .with_args(actual_v2_url, headers=v2_header_v1,
+                           auth=HTTPRegistryAuth, verify=False)
+                .and_return(v1_response))
+            (flexmock(requests.Session)
+                .should_receive(method)
+                .with_args(actual_v2_url, headers=v2_header_v2,
+                           auth=HTTPRegistryAuth, verify=False)
+                .and_return(v2_response))
+            (flexmock(requests.Session)
+                .should_receive(method)
+                .with_args(actual_v2_url, headers={'Accept': MEDIA_TYPE_OCI_V1},
+                           auth=HTTPRegistryAuth, verify=False)
+                .and_return(v1_oci_response))
+            (flexmock(requests.Session)
+                .should_receive(method)
+                .with_args(actual_v2_url, headers={'Accept': MEDIA_TYPE_OCI_V1_INDEX},
+                           auth=HTTPRegistryAuth, verify=False)
+                .and_return(v1_oci_index_response))
+            (flexmock(requests.Session)
+                .should_receive(method)
+                .with_args(actual_v2_url, headers=manifest_header,
+                           auth=HTTPRegistryAuth, verify=False)
+                .and_return(v2_list_response))
 
         digests = {'media_type': MEDIA_TYPE_DOCKER_V2_MANIFEST_LIST}
         if not group:
@@ -6,11 +6,12 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
-import io
 import json
+import os
 import re
 import shutil
 import subprocess
+import threading
 import time
 from copy import deepcopy
 from json import JSONDecodeError
@@ -41,8 +42,10 @@ from atomic_reactor.tasks.binary_container_build import (
     # helpers
     PodmanRemote,
     get_authfile_path,
+    read_output_lines,
     which_podman,
 )
+from atomic_reactor.tasks import binary_container_build
 from atomic_reactor.utils import remote_host
 from atomic_reactor.utils import retries
 
@@ -175,16 +178,26 @@ def mock_config(registry_config: Dict[str, Any],
     return cfg
 
 
+def make_pipe(*chunks: bytes):
+    """Get the read end of a pipe the chunks are written into by another thread."""
+    read_fd, write_fd = os.pipe()
+
+    def write():
+        with os.fdopen(write_fd, "wb", buffering=0) as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    threading.Thread(target=write, daemon=True).start()
+    return os.fdopen(read_fd, "rb")
+
+
 class MockedPopen:
     def __init__(self, rc: int, output_lines: List[str]):
         self._rc = rc
-        self.stdout = io.StringIO("".join(output_lines))
+        self.stdout = make_pipe("".join(output_lines).encode())
 
-    def poll(self):
-        if self.stdout.tell() >= len(self.stdout.getvalue()):
-            # no more output, the process has ended
-            return self._rc
-        return None
+    def wait(self):
+        return self._rc
 
 
 def mock_popen(
@@ -419,6 +432,30 @@ def test_which_podman(podman_path, podman_remote_path, expect_path):
         assert which_podman() == expect_path
 
 
+@pytest.mark.parametrize("chunks, expected_lines", [
+    ([], []),
+    ([b"no newline"], ["no newline"]),
+    ([b"line 1\nline", b" 2\n", b"\nline 4\n"], ["line 1\n", "line 2\n", "\n", "line 4\n"]),
+    # newlines are translated
+    ([b"crlf\r\ncr\rlf\n", b"split crlf\r", b"\n"],
+     ["crlf\n", "cr\n", "lf\n", "split crlf\n"]),
+    # multi-byte characters split between chunks, invalid bytes are replaced
+    (["p\u00e1d".encode()[:2], "p\u00e1d".encode()[2:] + b"\xff\n"], ["p\u00e1d\ufffd\n"]),
+])
+def test_read_output_lines(chunks, expected_lines):
+    with make_pipe(*chunks) as stream:
+        assert list(read_output_lines(stream)) == expected_lines
+
+
+def test_read_output_lines_split_long_lines():
+    flexmock(binary_container_build, BUILD_OUTPUT_MAX_LINE_LENGTH=4)
+
+    with make_pipe(b"0123456789\nabc", b"de", b"fgh", b"ij\n1234\n") as stream:
+        assert list(read_output_lines(stream)) == [
+            "0123", "4567", "89\n", "abcd", "efgh", "ij\n", "1234\n",
+        ]
+
+
 class TestPodmanRemote:
     """Tests for the PodmanRemote class."""
 
@@ -513,6 +550,26 @@ class TestPodmanRemote:
 
         assert list(output_lines) == ["starting the build\n", "finished successfully\n"]
 
+    @pytest.mark.parametrize("output_lines", [
+        ["STEP 1\n", "\n", "STEP 2\n", "\n", "DONE\n"],
+        ["\n", "STEP 1\n", "\n", "  \n", "DONE\n", "\n"],
+        [],
+    ])
+    def test_build_container_keeps_order(self, output_lines, x86_build_dir):
+        mock_popen(0, output_lines)
+
+        podman_remote = PodmanRemote("connection-name")
+        returned_lines = podman_remote.build_container(
+            build_dir=x86_build_dir,
+            build_args=BUILD_ARGS,
+            dest_tag=X86_UNIQUE_IMAGE,
+            flatpak=False,
+            memory_limit=None,
+            podman_capabilities=None,
+        )
+
+        assert list(returned_lines) == output_lines
+
     @pytest.mark.parametrize(
         "output_lines, expected_lines, expect_err_line",
         [
@@ -521,6 +578,8 @@ class TestPodmanRemote:
              "failed and printed an empty line"),
             ([], [], "<no output!>"),
             (["\n"], [], "<no output!>"),
+            (["starting the build\n", "failed :(\n", "\n", "  \n"],
+             ["starting the build\n", "\n", "  \n"], "failed :("),
         ]
     )
     def test_build_container_fails(
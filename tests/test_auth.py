@@ -6,12 +6,14 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 from atomic_reactor.auth import HTTPBearerAuth, HTTPRegistryAuth, HTTPBasicAuthWithB64
+from flexmock import flexmock
 from requests.auth import HTTPBasicAuth
 import base64
 import json
 import pytest
 import requests
 import responses
+import time
 
 
 BEARER_TOKEN = 'the-token'
@@ -124,6 +126,48 @@ class TestHTTPBearerAuth(object):
 
         assert len(responses.calls) == 8
 
+    @responses.activate
+    @pytest.mark.parametrize(('token_info', 'lifetime'), (
+        ({'token': 'first-token', 'expires_in': 300}, 290),
+        ({'access_token': 'first-token', 'expires_in': 300}, 290),
+        # default lifetime of 60 seconds
+        ({'token': 'first-token'}, 50),
+    ))
+    def test_token_expiration(self, token_info, lifetime):
+        now = {'time': 1000.0}
+        flexmock(time).should_receive('monotonic').replace_with(lambda: now['time'])
+
+        realm_url = BEARER_REALM_URL + '?scope=repository:fedora:pull'
+        responses.add(responses.GET, realm_url, json=token_info, match_querystring=True)
+        responses.add(responses.GET, realm_url, json={'token': 'second-token'},
+                      match_querystring=True)
+
+        def expect_token(token):
+            def callback(request):
+                assert request.headers['Authorization'] == 'Bearer {}'.format(token)
+                return (200, {}, json.dumps('success'))
+            return callback
+
+        url = 'https://registry.example.com/v2/fedora/tags/list'
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add_callback(responses.GET, url, callback=expect_token('first-token'))
+        responses.add_callback(responses.GET, url, callback=expect_token('first-token'))
+        responses.add_callback(responses.GET, url, callback=bearer_unauthorized_callback)
+        responses.add_callback(responses.GET, url, callback=expect_token('second-token'))
+
+        auth = HTTPBearerAuth()
+
+        assert requests.get(url, auth=auth).json() == 'success'
+        now['time'] += lifetime - 1
+        assert requests.get(url, auth=auth).json() == 'success'
+        now['time'] += 1
+        assert requests.get(url, auth=auth).json() == 'success'
+
+        assert len(responses.calls) == 7
+        assert auth.tokens_fetched == 2
+        assert auth.token_cache_hits == 1
+        assert auth.tokens_expired == 1
+
     @responses.activate
     @pytest.mark.parametrize(('partial_url', 'repo'), (
         ('tags/list', 'fedora'),
@@ -28,7 +28,8 @@ from osbs.exceptions import OsbsValidationException
 from tests.constants import REACTOR_CONFIG_MAP
 from flexmock import flexmock
 from atomic_reactor.config import (Configuration, ODCSConfig, get_koji_session, get_odcs_session,
-                                   get_cachito_session, get_smtp_session, get_openshift_session)
+                                   get_cachito_session, get_smtp_session, get_openshift_session,
+                                   get_download_cache, get_digest_cache)
 from atomic_reactor.constants import REACTOR_CONFIG_ENV_NAME
 
 
@@ -288,6 +289,13 @@ remote_hosts:
          """,
          "{!r} is a required property".format("pools")),
         ("""\
+remote_hosts:
+  slots_dir: path/foo
+  probe_workers: 0
+  pools: {}
+         """,
+         "0 is less than the minimum of 1"),
+        ("""\
 remote_hosts:
   pools:
     x86_64:
@@ -687,6 +695,142 @@ platform_descriptors:
             assert platform_to_goarch[plat] == goarch
             assert goarch_to_platform[goarch] == plat
 
+    @pytest.mark.parametrize(('config', 'expect'), [
+        ("""\
+         """,
+         {'max_workers': 8, 'max_connections_per_host': 4, 'cache_dir': None,
+          'cache_size_limit': 0, 'segments': 1}),
+        ("""\
+downloads: {}
+         """,
+         {'max_workers': 8, 'max_connections_per_host': 4, 'cache_dir': None,
+          'cache_size_limit': 0, 'segments': 1}),
+        ("""\
+downloads:
+  max_workers: 16
+  max_connections_per_host: 2
+  cache_dir: /var/cache/atomic-reactor
+  cache_size_limit: 1073741824
+  segments: 4
+         """,
+         {'max_workers': 16, 'max_connections_per_host': 2,
+          'cache_dir': '/var/cache/atomic-reactor', 'cache_size_limit': 1073741824,
+          'segments': 4}),
+    ])
+    def test_get_downloads(self, config, expect):
+        config += "\n" + REQUIRED_CONFIG
+        config_json = read_yaml(config, 'schemas/config.json')
+
+        conf = Configuration(raw_config=config_json)
+
+        assert conf.downloads == expect
+
+    @pytest.mark.parametrize('config', [
+        """\
+downloads:
+  max_workers: 0
+        """,
+        """\
+downloads:
+  cache_size_limit: -1
+        """,
+        """\
+downloads:
+  unknown: 1
+        """,
+    ])
+    def test_get_downloads_schema_validation(self, config):
+        config += "\n" + REQUIRED_CONFIG
+        with pytest.raises(OsbsValidationException):
+            read_yaml(config, 'schemas/config.json')
+
+    @pytest.mark.parametrize(('config', 'expect'), [
+        ("", {'max_workers': 1, 'profiling': 'off'}),
+        ("plugins_runner: {}", {'max_workers': 1, 'profiling': 'off'}),
+        ("plugins_runner: {max_workers: 4, profiling: cprofile}",
+         {'max_workers': 4, 'profiling': 'cprofile'}),
+    ])
+    def test_get_plugins_runner(self, config, expect):
+        config += "\n" + REQUIRED_CONFIG
+        config_json = read_yaml(config, 'schemas/config.json')
+
+        conf = Configuration(raw_config=config_json)
+
+        assert conf.plugins_runner == expect
+
+    @pytest.mark.parametrize('config', [
+        "plugins_runner: {max_workers: 0}",
+        "plugins_runner: {unknown: 1}",
+        "plugins_runner: {profiling: sampling}",
+    ])
+    def test_get_plugins_runner_schema_validation(self, config):
+        config += "\n" + REQUIRED_CONFIG
+        with pytest.raises(OsbsValidationException):
+            read_yaml(config, 'schemas/config.json')
+
+    @pytest.mark.parametrize('cache_dir', [None, 'cache'])
+    def test_get_download_cache(self, tmp_path, cache_dir):
+        config = {'version': 1}
+        if cache_dir:
+            config['downloads'] = {'cache_dir': str(tmp_path / cache_dir),
+                                   'cache_size_limit': 1024}
+        conf = Configuration(raw_config=config)
+
+        cache = get_download_cache(conf)
+
+        if cache_dir:
+            assert cache.path == tmp_path / cache_dir
+            assert cache.size_limit == 1024
+            assert cache.path.is_dir()
+        else:
+            assert cache is None
+
+    @pytest.mark.parametrize(('config', 'expect'), [
+        ("", {'cache_dir': None, 'ttl': 300, 'floating_tags': ['latest']}),
+        ("digest_cache: {}", {'cache_dir': None, 'ttl': 300, 'floating_tags': ['latest']}),
+        ("""\
+digest_cache:
+  cache_dir: /var/cache/digests
+  ttl: 60
+  floating_tags: []
+         """,
+         {'cache_dir': '/var/cache/digests', 'ttl': 60, 'floating_tags': []}),
+    ])
+    def test_get_digest_cache_config(self, config, expect):
+        config += "\n" + REQUIRED_CONFIG
+        config_json = read_yaml(config, 'schemas/config.json')
+
+        conf = Configuration(raw_config=config_json)
+
+        assert conf.digest_cache == expect
+
+    @pytest.mark.parametrize('config', [
+        "digest_cache: {ttl: -1}",
+        "digest_cache: {floating_tags: latest}",
+        "digest_cache: {unknown: 1}",
+    ])
+    def test_get_digest_cache_schema_validation(self, config):
+        config += "\n" + REQUIRED_CONFIG
+        with pytest.raises(OsbsValidationException):
+            read_yaml(config, 'schemas/config.json')
+
+    @pytest.mark.parametrize('cache_dir', [None, 'cache'])
+    def test_get_digest_cache(self, tmp_path, cache_dir):
+        config = {'version': 1}
+        if cache_dir:
+            config['digest_cache'] = {'cache_dir': str(tmp_path / cache_dir), 'ttl': 30}
+        conf = Configuration(raw_config=config)
+
+        cache = get_digest_cache(conf)
+
+        if cache_dir:
+            assert cache.path == tmp_path / cache_dir
+            assert cache.ttl == 30
+            assert cache.floating_tags == ['latest']
+            assert cache.path.is_dir()
+        else:
+            assert cache is None
+
     @pytest.mark.parametrize(('config', 'expect'), [
         ("""\
 flatpak:
@@ -1191,6 +1335,7 @@ cachito:
         auth_info = {
             'insecure': config_json['cachito'].get('insecure', False),
             'timeout': config_json['cachito'].get('timeout'),
+            'download_segments': 1,
         }
 
         ssl_dir_raise = False
@@ -1413,6 +1558,19 @@ operator_manifests:
     - registry: foo
       package_mappings_url: mapping.yaml
         """, False),  # package mappings url is not a url
+        ("""\
+operator_manifests:
+  allowed_registries: null
+  digest_pinning:
+    max_workers: 16
+    max_connections_per_registry: 8
+        """, True),
+        ("""\
+operator_manifests:
+  allowed_registries: null
+  digest_pinning:
+    max_connections_per_registry: 0
+        """, False),  # at least 1 connection is required
     ])
     def test_get_operator_manifests(self, tmpdir, config, valid):
         config += "\n" + REQUIRED_CONFIG
@@ -5,8 +5,10 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
+import logging
 import os
 import tempfile
+import threading
 from pathlib import Path
 from typing import Any, Iterable
 import shutil
@@ -202,10 +204,11 @@ def handle_platform(build_dir: BuildDir) -> Any:
     return "the test does not care about this value"
 
 
-def test_rootbuilddir_for_each_platform(build_dir, mock_source):
+@pytest.mark.parametrize("parallel", [False, True])
+def test_rootbuilddir_for_each_platform(parallel, build_dir, mock_source):
     root = RootBuildDir(build_dir)
     root.init_build_dirs(["x86_64", "s390x"], mock_source)
-    results = root.for_each_platform(handle_platform)
+    results = root.for_each_platform(handle_platform, parallel=parallel)
     expected = {
         "x86_64": "handled x86_64",
         "s390x": {"reserved_build_id": 1000},
@@ -224,11 +227,105 @@ def failure_action(build_dir: BuildDir) -> Any:
     return "the test does not care about this value"
 
 
-def test_rootbuilddir_for_each_platform_failure_from_action(build_dir, mock_source):
+@pytest.mark.parametrize("parallel", [False, True])
+def test_rootbuilddir_for_each_platform_failure_from_action(parallel, build_dir, mock_source):
     root = RootBuildDir(build_dir)
     root.init_build_dirs(["x86_64", "s390x"], mock_source)
     with pytest.raises(ValueError, match="Error is raised"):
-        root.for_each_platform(failure_action)
+        root.for_each_platform(failure_action, parallel=parallel)
+
+
+def test_rootbuilddir_for_each_platform_parallel_first_error(build_dir, mock_source):
+    root = RootBuildDir(build_dir)
+    root.init_build_dirs(["aarch64", "ppc64le", "s390x", "x86_64"], mock_source)
+    s390x_failed = threading.Event()
+
+    def action(build_dir: BuildDir) -> Any:
+        if build_dir.platform == "s390x":
+            s390x_failed.set()
+            raise ValueError("s390x failed")
+        if build_dir.platform == "ppc64le":
+            # fails after s390x, but ppc64le comes first in the order of platforms
+            s390x_failed.wait(timeout=10)
+            raise ValueError("ppc64le failed")
+        return build_dir.platform
+
+    with pytest.raises(ValueError, match="ppc64le failed"):
+        root.for_each_platform(action, parallel=True)
+
+
+def test_rootbuilddir_for_each_platform_parallel_failure_runs_all(build_dir, mock_source):
+    root = RootBuildDir(build_dir)
+    root.init_build_dirs(["aarch64", "ppc64le", "s390x", "x86_64"], mock_source)
+    called = []
+
+    def action(build_dir: BuildDir) -> Any:
+        called.append(build_dir.platform)
+        if build_dir.platform == "aarch64":
+            raise ValueError("aarch64 failed")
+        return build_dir.platform
+
+    with pytest.raises(ValueError, match="aarch64 failed"):
+        root.for_each_platform(action, parallel=True)
+    assert sorted(called) == ["aarch64", "ppc64le", "s390x", "x86_64"]
+
+
+def test_rootbuilddir_for_each_platform_parallel_logs(build_dir, mock_source, caplog):
+    root = RootBuildDir(build_dir)
+    root.init_build_dirs(["aarch64", "ppc64le", "s390x", "x86_64"], mock_source)
+    logger = logging.getLogger("test_dirs")
+    barrier = threading.Barrier(len(root.platforms), timeout=10)
+
+    def action(build_dir: BuildDir) -> Any:
+        logger.info("start %s", build_dir.platform)
+        # make sure all the actions are running at the same time
+        barrier.wait()
+        logger.info("end %s", build_dir.platform)
+        return build_dir.platform
+
+    with caplog.at_level(logging.INFO, logger="test_dirs"):
+        results = root.for_each_platform(action, parallel=True)
+
+    assert results == {platform: platform for platform in root.platforms}
+    # logs are not interleaved, but grouped by platform in the order of platforms
+    assert [record.getMessage() for record in caplog.records
+            if record.name == "test_dirs"] == [
+        f"{step} {platform}" for platform in root.platforms for step in ("start", "end")
+    ]
+
+
+def test_rootbuilddir_for_each_platform_parallel_logs_non_root_handler(build_dir, mock_source):
+    root = RootBuildDir(build_dir)
+    root.init_build_dirs(["aarch64", "ppc64le", "s390x", "x86_64"], mock_source)
+    barrier = threading.Barrier(len(root.platforms), timeout=10)
+    messages = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            messages.append(record.getMessage())
+
+    # like the handler added to the atomic_reactor logger by set_logging()
+    parent_logger = logging.getLogger("test_dirs_parent")
+    handler = ListHandler()
+    parent_logger.addHandler(handler)
+    parent_logger.setLevel(logging.INFO)
+    parent_logger.propagate = False
+    logger = logging.getLogger("test_dirs_parent.child")
+
+    def action(build_dir: BuildDir) -> Any:
+        logger.info("start %s", build_dir.platform)
+        barrier.wait()
+        logger.info("end %s", build_dir.platform)
+        return build_dir.platform
+
+    try:
+        root.for_each_platform(action, parallel=True)
+    finally:
+        parent_logger.removeHandler(handler)
+
+    assert messages == [
+        f"{step} {platform}" for platform in root.platforms for step in ("start", "end")
+    ]
 
 
 def create_dockerfile(build_dir: BuildDir) -> Iterable[Path]:
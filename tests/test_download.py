@@ -6,18 +6,23 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 
+import base64
 from io import BufferedReader, BytesIO
+import hashlib
 import os
+import re
 import requests
 import responses
 import tempfile
+import threading
 import time
 
 import pytest
 from flexmock import flexmock
 
+from atomic_reactor import download
 from atomic_reactor.util import get_retrying_requests_session
-from atomic_reactor.download import download_url
+from atomic_reactor.download import ArtifactCache, download_url, download_urls
 from atomic_reactor.constants import CACHITO_ALG_STR
 
 
@@ -80,7 +85,7 @@ class TestDownloadUrl(object):
         dest_dir = tempfile.mkdtemp()
         session = get_retrying_requests_session()
         # get response shows successful connection
-        response = flexmock()
+        response = flexmock(status_code=200, headers={})
         (response
          .should_receive('raise_for_status'))
         # but streaming from the response fails
@@ -96,3 +101,526 @@ class TestDownloadUrl(object):
          .should_receive('sleep'))
         with pytest.raises(requests.exceptions.RequestException):
             download_url(url, dest_dir, session=session)
+
+    def test_resume(self, tmp_path):
+        url = 'https://example.com/path/file'
+        content = b'abcdef'
+        session = get_retrying_requests_session()
+
+        def interrupted_stream(chunk_size):
+            yield content[:3]
+            raise requests.exceptions.ChunkedEncodingError('connection reset')
+
+        first = flexmock(status_code=200, headers={'Accept-Ranges': 'bytes', 'ETag': '"v1"'},
+                         raise_for_status=lambda: None, iter_content=interrupted_stream)
+        rest = flexmock(status_code=206, headers={'Content-Range': 'bytes 3-5/6'},
+                        raise_for_status=lambda: None,
+                        iter_content=lambda chunk_size: iter([content[3:]]))
+        (flexmock(session)
+         .should_receive('get')
+         .with_args(url, stream=True, verify=True, headers={})
+         .and_return(first)
+         .once())
+        (flexmock(session)
+         .should_receive('get')
+         .with_args(url, stream=True, verify=True,
+                    headers={'Range': 'bytes=3-', 'If-Range': '"v1"'})
+         .and_return(rest)
+         .once())
+        (flexmock(time)
+         .should_receive('sleep'))
+
+        result = download_url(url, str(tmp_path), session=session,
+                              expected_checksums=make_checksums(content))
+
+        with open(result, 'rb') as f:
+            assert f.read() == content
+
+    @pytest.mark.parametrize('accept_ranges', [True, False])
+    def test_resume_not_possible(self, tmp_path, accept_ranges):
+        url = 'https://example.com/path/file'
+        content = b'abcdef'
+        session = get_retrying_requests_session()
+        calls = []
+
+        def get(url, stream, verify, headers=None):
+            calls.append(headers)
+            if len(calls) == 1:
+                def interrupted_stream(chunk_size):
+                    yield content[:3]
+                    raise requests.exceptions.ChunkedEncodingError('connection reset')
+
+                return flexmock(status_code=200,
+                                headers={'Accept-Ranges': 'bytes'} if accept_ranges else {},
+                                raise_for_status=lambda: None, iter_content=interrupted_stream)
+            # the server ignores the range and sends the whole file
+            return flexmock(status_code=200, headers={}, raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([content]))
+
+        flexmock(session, get=get)
+        (flexmock(time)
+         .should_receive('sleep'))
+
+        result = download_url(url, str(tmp_path), session=session,
+                              expected_checksums=make_checksums(content))
+
+        with open(result, 'rb') as f:
+            assert f.read() == content
+        if accept_ranges:
+            assert calls == [{}, {'Range': 'bytes=3-'}]
+        else:
+            assert calls == [{}, {}]
+
+    def test_resume_wrong_range(self, tmp_path):
+        url = 'https://example.com/path/file'
+        content = b'abcdef'
+        session = get_retrying_requests_session()
+        calls = []
+
+        def get(url, stream, verify, headers=None):
+            calls.append(headers)
+            if len(calls) == 1:
+                def interrupted_stream(chunk_size):
+                    yield content[:3]
+                    raise requests.exceptions.ChunkedEncodingError('connection reset')
+
+                return flexmock(status_code=200, headers={'Accept-Ranges': 'bytes'},
+                                raise_for_status=lambda: None, iter_content=interrupted_stream)
+            if len(calls) == 2:
+                # the server sends a range other than the requested one
+                return flexmock(status_code=206, headers={'Content-Range': 'bytes 4-5/6'},
+                                raise_for_status=lambda: None,
+                                iter_content=lambda chunk_size: iter([content[4:]]))
+            return flexmock(status_code=200, headers={}, raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([content]))
+
+        flexmock(session, get=get)
+        (flexmock(time)
+         .should_receive('sleep'))
+
+        result = download_url(url, str(tmp_path), session=session,
+                              expected_checksums=make_checksums(content))
+
+        with open(result, 'rb') as f:
+            assert f.read() == content
+        assert calls == [{}, {'Range': 'bytes=3-'}, None]
+
+    def test_partial_content_of_whole_file(self, tmp_path):
+        url = 'https://example.com/path/file'
+        response = flexmock(status_code=206, headers={'Content-Range': 'bytes 0-2/6'},
+                            raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([b'abc']))
+        session = flexmock(get=lambda url, stream, verify, headers: response)
+
+        with pytest.raises(RuntimeError, match='returned a part of the file'):
+            download_url(url, str(tmp_path), session=session)
+
+    @pytest.mark.parametrize('verify_cachito_digest', [True, False])
+    def test_segments(self, tmp_path, verify_cachito_digest):
+        url = 'https://example.com/path/file'
+        content = b'0123456789abcdefghij'
+        digest = base64.b64encode(hashlib.sha256(content).digest()).decode()
+        ranges = []
+
+        def head(url, verify, allow_redirects):
+            return flexmock(status_code=200,
+                            headers={'Content-Length': str(len(content)),
+                                     'Accept-Ranges': 'bytes', 'ETag': '"v1"',
+                                     'Digest': f'{CACHITO_ALG_STR}={digest}'},
+                            raise_for_status=lambda: None)
+
+        def get(url, stream, verify, headers):
+            assert headers['If-Range'] == '"v1"'
+            start, end = re.fullmatch(r'bytes=(\d+)-(\d+)', headers['Range']).groups()
+            start, end = int(start), int(end)
+            ranges.append((start, end))
+            return flexmock(status_code=206,
+                            headers={'Content-Range': f'bytes {start}-{end}/{len(content)}'},
+                            raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([content[start:end + 1]]))
+
+        session = flexmock(head=head, get=get)
+        flexmock(download, DEFAULT_DOWNLOAD_BLOCK_SIZE=4)
+
+        result = download_url(url, str(tmp_path), session=session, segments=3,
+                              expected_checksums=make_checksums(content),
+                              verify_cachito_digest=verify_cachito_digest)
+
+        with open(result, 'rb') as f:
+            assert f.read() == content
+        assert sorted(ranges) == [(0, 6), (7, 13), (14, 19)]
+
+    @pytest.mark.parametrize('mismatch', ['range ignored', 'other range'])
+    def test_segments_mismatch(self, tmp_path, mismatch):
+        url = 'https://example.com/path/file'
+        content = b'0123456789abcdefghij'
+        calls = []
+
+        def head(url, verify, allow_redirects):
+            return flexmock(status_code=200,
+                            headers={'Content-Length': str(len(content)),
+                                     'Accept-Ranges': 'bytes', 'ETag': '"v1"'},
+                            raise_for_status=lambda: None)
+
+        def get(url, stream, verify, headers):
+            calls.append(headers)
+            if 'Range' not in headers or mismatch == 'range ignored':
+                return flexmock(status_code=200, headers={},
+                                raise_for_status=lambda: None,
+                                iter_content=lambda chunk_size: iter([content]))
+            return flexmock(status_code=206,
+                            headers={'Content-Range': f'bytes 1-5/{len(content)}'},
+                            raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([content[1:6]]))
+
+        session = flexmock(head=head, get=get)
+        flexmock(download, DEFAULT_DOWNLOAD_BLOCK_SIZE=4)
+
+        result = download_url(url, str(tmp_path), session=session, segments=3,
+                              expected_checksums=make_checksums(content))
+
+        # the segments are discarded and the file is downloaded as a whole
+        with open(result, 'rb') as f:
+            assert f.read() == content
+        assert calls[-1] == {}
+        assert all('Range' in headers for headers in calls[:-1])
+
+    @pytest.mark.parametrize('matches', [True, False])
+    def test_segments_without_digest(self, tmp_path, matches):
+        url = 'https://example.com/path/file'
+        content = b'0123456789abcdefghij'
+        digest = base64.b64encode(hashlib.sha256(content if matches else b'x').digest()).decode()
+        calls = []
+
+        def head(url, verify, allow_redirects):
+            return flexmock(status_code=200,
+                            headers={'Content-Length': str(len(content)),
+                                     'Accept-Ranges': 'bytes'},
+                            raise_for_status=lambda: None)
+
+        def get(url, stream, verify, headers):
+            calls.append(headers)
+            return flexmock(status_code=200,
+                            headers={'Digest': f'{CACHITO_ALG_STR}={digest}'},
+                            raise_for_status=lambda: None,
+                            iter_content=lambda chunk_size: iter([content]))
+
+        session = flexmock(head=head, get=get)
+        flexmock(download, DEFAULT_DOWNLOAD_BLOCK_SIZE=4)
+
+        # the digest of the whole file is only sent with the file
+        if matches:
+            result = download_url(url, str(tmp_path), session=session, segments=3,
+                                  verify_cachito_digest=True)
+            with open(result, 'rb') as f:
+                assert f.read() == content
+        else:
+            with pytest.raises(ValueError, match='does not match expected digest'):
+                download_url(url, str(tmp_path), session=session, segments=3,
+                             verify_cachito_digest=True)
+        assert calls == [{}]
+
+    @responses.activate
+    def test_segments_not_supported(self, tmp_path):
+        url = 'https://example.com/path/file'
+        content = b'abc'
+        responses.add(responses.HEAD, url)
+        responses.add(responses.GET, url, body=content)
+
+        result = download_url(url, str(tmp_path), segments=4,
+                              expected_checksums=make_checksums(content))
+
+        with open(result, 'rb') as f:
+            assert f.read() == content
+
+
+class TestHashingWriter(object):
+    def test_write(self, tmp_path):
+        chunks = [os.urandom(1024) for _ in range(50)]
+        hashers = {'md5': hashlib.md5(), 'sha256': hashlib.sha256()}
+
+        with open(tmp_path / 'file', 'wb') as f:
+            writer = download._HashingWriter(f, hashers, queue_size=2)
+            for chunk in chunks:
+                writer.write(chunk)
+            writer.close()
+
+        content = b''.join(chunks)
+        assert (tmp_path / 'file').read_bytes() == content
+        assert writer.written == len(content)
+        assert {algo: hasher.hexdigest() for algo, hasher in hashers.items()} == \
+            make_checksums(content)
+
+    def test_write_error(self):
+        f = flexmock()
+        (f.should_receive('write')
+         .and_raise(OSError, 'No space left on device'))
+
+        writer = download._HashingWriter(f, {'md5': hashlib.md5()}, queue_size=1)
+        for _ in range(5):
+            try:
+                writer.write(b'abc')
+            except OSError:
+                break
+
+        with pytest.raises(OSError, match='No space left on device'):
+            writer.close()
+        assert writer.written == 0
+
+
+class TestDownloadUrls(object):
+    @responses.activate
+    def test_happy_path(self):
+        dest_dir = tempfile.mkdtemp()
+        downloads = []
+        for index in range(10):
+            url = 'https://example.com/path/file{}'.format(index)
+            responses.add(responses.GET, url, body='content{}'.format(index))
+            downloads.append({'url': url, 'dest_dir': dest_dir})
+
+        result = download_urls(downloads, max_workers=4, max_connections_per_host=2)
+
+        assert result == [os.path.join(dest_dir, 'file{}'.format(index)) for index in range(10)]
+        for index, path in enumerate(result):
+            with open(path) as f:
+                assert f.read() == 'content{}'.format(index)
+
+    def test_no_downloads(self):
+        assert download_urls([]) == []
+
+    @pytest.mark.parametrize('max_connections_per_host', [1, 2])
+    def test_connections_per_host(self, max_connections_per_host):
+        dest_dir = tempfile.mkdtemp()
+        lock = threading.Lock()
+        running = {}
+        max_running = {}
+
+        def mock_download_url(url, dest_dir, **kwargs):
+            host = url.split('/')[2]
+            with lock:
+                running[host] = running.get(host, 0) + 1
+                max_running[host] = max(max_running.get(host, 0), running[host])
+            time.sleep(0.01)
+            with lock:
+                running[host] -= 1
+            path = os.path.join(dest_dir, host + url.rsplit('/', 1)[-1])
+            with open(path, 'w') as f:
+                f.write(url)
+            return path
+
+        flexmock(download, download_url=mock_download_url)
+
+        downloads = [
+            {'url': 'https://{}/file{}'.format(host, index), 'dest_dir': dest_dir}
+            for host in ('one.example.com', 'two.example.com')
+            for index in range(6)
+        ]
+        result = download_urls(downloads, max_workers=8,
+                               max_connections_per_host=max_connections_per_host)
+
+        assert len(result) == len(downloads)
+        assert all(count <= max_connections_per_host for count in max_running.values())
+
+    @responses.activate
+    def test_checksum_mismatch(self):
+        dest_dir = tempfile.mkdtemp()
+        url = 'https://example.com/path/file'
+        responses.add(responses.GET, url, body='corrupted')
+        downloads = [
+            {'url': url, 'dest_dir': dest_dir, 'expected_checksums': {'md5': 'abc'}},
+        ]
+
+        with pytest.raises(ValueError, match='does not match expected checksum'):
+            download_urls(downloads)
+
+    def test_fail_fast(self):
+        dest_dir = tempfile.mkdtemp()
+        started = []
+
+        def mock_download_url(url, dest_dir, **kwargs):
+            started.append(url)
+            if url.endswith('/file0'):
+                raise ValueError('Computed md5 checksum does not match expected checksum')
+            time.sleep(0.05)
+            return os.path.join(dest_dir, url.rsplit('/', 1)[-1])
+
+        flexmock(download, download_url=mock_download_url)
+
+        downloads = [
+            {'url': 'https://example.com/file{}'.format(index), 'dest_dir': dest_dir}
+            for index in range(20)
+        ]
+        with pytest.raises(ValueError, match='does not match expected checksum'):
+            download_urls(downloads, max_workers=1, max_connections_per_host=1)
+
+        assert len(started) < len(downloads)
+
+
+def make_checksums(content, algorithms=('md5', 'sha256')):
+    return {algorithm: hashlib.new(algorithm, content).hexdigest() for algorithm in algorithms}
+
+
+class TestArtifactCache(object):
+    def test_store_and_fetch(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache')
+        content = b'abc'
+        checksums = make_checksums(content)
+        src = tmp_path / 'src'
+        src.write_bytes(content)
+
+        cache.store(str(src), checksums)
+
+        for algorithm, checksum in checksums.items():
+            assert (tmp_path / 'cache' / algorithm / checksum).read_bytes() == content
+
+        dest = tmp_path / 'dest'
+        assert cache.fetch({'md5': checksums['md5']}, str(dest))
+        assert dest.read_bytes() == content
+        assert cache.stats == {'hits': 1, 'misses': 0, 'bytes_saved': len(content)}
+
+    def test_miss(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache')
+
+        assert not cache.fetch(make_checksums(b'abc'), str(tmp_path / 'dest'))
+        assert not (tmp_path / 'dest').exists()
+        assert cache.stats == {'hits': 0, 'misses': 1, 'bytes_saved': 0}
+
+    def test_source_not_linked(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache')
+        checksums = make_checksums(b'abc', ['sha256'])
+        src = tmp_path / 'src'
+        src.write_bytes(b'abc')
+
+        cache.store(str(src), checksums)
+        src.write_bytes(b'modified')
+
+        assert (tmp_path / 'cache' / 'sha256' / checksums['sha256']).read_bytes() == b'abc'
+
+    @pytest.mark.parametrize('key', [None, 'https://example.com/foo-1-1.src.rpm'])
+    def test_fetched_file_not_linked(self, tmp_path, key):
+        cache = ArtifactCache(tmp_path / 'cache')
+        checksums = make_checksums(b'abc', ['sha256'])
+        src = tmp_path / 'src'
+        src.write_bytes(b'abc')
+        cache.store(str(src), checksums, key=key)
+
+        dest = tmp_path / 'dest'
+        assert cache.fetch({} if key else checksums, str(dest), key=key)
+        # modify the fetched file in place, like filtering a tarball does
+        with open(dest, 'r+b') as f:
+            f.write(b'xyz')
+
+        entry = tmp_path / 'cache' / 'sha256' / checksums['sha256']
+        assert entry.read_bytes() == b'abc'
+        assert not os.path.samefile(entry, dest)
+        if key:
+            entry = tmp_path / 'cache' / 'keys' / hashlib.sha256(key.encode()).hexdigest()
+            assert entry.read_bytes() == b'abc'
+
+    def test_corrupted_entry(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache')
+        checksums = make_checksums(b'abc', ['sha256'])
+        entry = tmp_path / 'cache' / 'sha256' / checksums['sha256']
+        entry.parent.mkdir()
+        entry.write_bytes(b'corrupted')
+
+        assert not cache.fetch(checksums, str(tmp_path / 'dest'))
+        assert not entry.exists()
+
+    def test_store_and_fetch_by_key(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache')
+        key = 'https://example.com/packages/foo/1/1/data/signed/abc/src/foo-1-1.src.rpm'
+        src = tmp_path / 'src'
+        src.write_bytes(b'abc')
+
+        cache.store(str(src), {}, key=key)
+
+        entry = tmp_path / 'cache' / 'keys' / hashlib.sha256(key.encode()).hexdigest()
+        assert entry.read_bytes() == b'abc'
+
+        dest = tmp_path / 'dest'
+        assert not cache.fetch({}, str(dest), key='https://example.com/other')
+        assert cache.fetch({}, str(dest), key=key)
+        assert dest.read_bytes() == b'abc'
+        # keyed entries are verified if checksums are known
+        assert not cache.fetch(make_checksums(b'other', ['sha256']), str(tmp_path / 'other'),
+                               key=key)
+        assert not entry.exists()
+
+    @pytest.mark.parametrize('checksums', [
+        {'md5': '../../etc/passwd'},
+        {'unknown': 'abc'},
+    ])
+    def test_invalid_keys(self, tmp_path, checksums):
+        cache = ArtifactCache(tmp_path / 'cache')
+        src = tmp_path / 'src'
+        src.write_bytes(b'abc')
+
+        cache.store(str(src), checksums)
+
+        assert list((tmp_path / 'cache').iterdir()) == []
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache', size_limit=10)
+        stored = []
+        for index in range(3):
+            content = '{}'.format(index).encode() * 4
+            src = tmp_path / 'src{}'.format(index)
+            src.write_bytes(content)
+            checksums = make_checksums(content, ['sha256'])
+            cache.store(str(src), checksums)
+            entry = tmp_path / 'cache' / 'sha256' / checksums['sha256']
+            os.utime(entry, (index, index))
+            stored.append((entry, checksums))
+            if index == 1:
+                # use the oldest entry, so that the second one is least recently used
+                assert cache.fetch(stored[0][1], str(tmp_path / 'dest'))
+                os.utime(stored[0][0], (10, 10))
+
+        assert stored[0][0].exists()
+        assert not stored[1][0].exists()
+        assert stored[2][0].exists()
+
+    def test_file_larger_than_cache(self, tmp_path):
+        cache = ArtifactCache(tmp_path / 'cache', size_limit=2)
+        src = tmp_path / 'src'
+        src.write_bytes(b'abc')
+
+        cache.store(str(src), make_checksums(b'abc'))
+
+        assert list((tmp_path / 'cache').iterdir()) == []
+
+    @responses.activate
+    def test_download_url_with_cache(self, tmp_path):
+        url = 'https://example.com/path/file'
+        content = b'abc'
+        checksums = make_checksums(content)
+        responses.add(responses.GET, url, body=content)
+        cache = ArtifactCache(tmp_path / 'cache')
+
+        first_dir = tmp_path / 'first'
+        first_dir.mkdir()
+        download_url(url, str(first_dir), expected_checksums=checksums, cache=cache)
+        second_dir = tmp_path / 'second'
+        second_dir.mkdir()
+        result = download_url(url, str(second_dir), expected_checksums=checksums, cache=cache)
+
+        assert len(responses.calls) == 1
+        with open(result, 'rb') as f:
+            assert f.read() == content
+        assert cache.stats == {'hits': 1, 'misses': 1, 'bytes_saved': len(content)}
+
+    @responses.activate
+    def test_download_url_with_cache_key(self, tmp_path):
+        url = 'https://example.com/path/file'
+        responses.add(responses.GET, url, body=b'abc')
+        cache = ArtifactCache(tmp_path / 'cache')
+
+        for dest_dir in (tmp_path / 'first', tmp_path / 'second'):
+            dest_dir.mkdir()
+            result = download_url(url, str(dest_dir), cache=cache, cache_key=url)
+            with open(result, 'rb') as f:
+                assert f.read() == b'abc'
+
+        assert len(responses.calls) == 1
+        assert cache.stats == {'hits': 1, 'misses': 1, 'bytes_saved': 3}
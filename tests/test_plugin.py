@@ -6,6 +6,7 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 import os.path
+import threading
 import time
 import inspect
 import sys
@@ -14,6 +15,8 @@ from typing import Any, Dict, List, Final
 from flexmock import flexmock
 import pytest
 
+from atomic_reactor import plugin as plugin_module
+from atomic_reactor.constants import PLUGINS_PROFILING_RESOURCES
 from atomic_reactor.inner import DockerBuildWorkflow
 from atomic_reactor.plugin import (
     Plugin,
@@ -23,6 +26,12 @@ from atomic_reactor.plugin import (
     SleepPlugin,
 )
 from atomic_reactor.plugins.add_filesystem import AddFilesystemPlugin
+from atomic_reactor.plugins.add_help import AddHelpPlugin
+from atomic_reactor.plugins.add_labels_in_df import AddLabelsPlugin
+from atomic_reactor.plugins.bump_release import BumpReleasePlugin
+from atomic_reactor.plugins.koji_parent import KojiParentPlugin
+from atomic_reactor.plugins.pin_operator_digest import PinOperatorDigestsPlugin
+from atomic_reactor.plugins.resolve_composes import ResolveComposesPlugin
 from atomic_reactor.plugins.tag_and_push import TagAndPushPlugin
 
 from tests.constants import DOCKERFILE_GIT
@@ -63,6 +72,55 @@ class WriteRemoteLogsPlugin(Plugin):
         raise IOError("remote host is unavailable.")
 
 
+class WaitForBuildargsPlugin(Plugin):
+    key = 'wait_for_buildargs'
+    reads = frozenset()
+    writes = frozenset({'buildargs'})
+
+    def run(self):
+        # does not return until WaitForAnnotationsPlugin runs concurrently
+        self.workflow.test_barrier.wait()
+        self.workflow.data.buildargs['x'] = '1'
+
+
+class WaitForAnnotationsPlugin(Plugin):
+    key = 'wait_for_annotations'
+    reads = frozenset()
+    writes = frozenset({'annotations'})
+
+    def run(self):
+        self.workflow.test_barrier.wait()
+        return 'annotated'
+
+
+class ReadBuildargsPlugin(Plugin):
+    key = 'read_buildargs'
+    reads = frozenset({'buildargs.x'})
+    writes = frozenset()
+
+    def run(self):
+        return self.workflow.data.buildargs.get('x')
+
+
+class FailAnnotationsPlugin(Plugin):
+    is_allowed_to_fail = False
+    key = 'fail_annotations'
+    reads = frozenset()
+    writes = frozenset({'annotations'})
+
+    def run(self):
+        raise IOError("annotations are read-only")
+
+
+class UpdateDockerfileImagesPlugin(Plugin):
+    key = 'update_dockerfile_images'
+    reads = frozenset()
+    writes = frozenset({'dockerfile_images'})
+
+    def run(self):
+        pass
+
+
 def teardown_function(function):
     module_name, _, _ = os.path.basename(__file__).partition(".")
     if module_name in sys.modules:
@@ -283,3 +341,125 @@ def test_run_plugins_in_keep_going_mode(
     # The subsequent plug should get a chance to run after previous error.
     assert "continuing..." in caplog.text
     assert runner.plugins_results[CleanupPlugin.key] is None
+
+
+def test_get_dependencies(workflow: DockerBuildWorkflow):
+    plugins_conf = [
+        {"name": WaitForBuildargsPlugin.key},
+        {"name": WaitForAnnotationsPlugin.key},
+        {"name": ReadBuildargsPlugin.key},
+        {"name": FailAnnotationsPlugin.key},
+        {"name": PushImagePlugin.key},
+        {"name": ReadBuildargsPlugin.key},
+    ]
+    runner = PluginsRunner(workflow, plugins_conf, plugin_files=[THIS_FILE])
+
+    assert runner.get_dependencies() == [
+        set(),
+        set(),
+        # reads a part of the buildargs
+        {0},
+        # writes the annotations
+        {1},
+        # does not declare the data it uses
+        {0, 1, 2, 3},
+        # also stores the result of the same plugin
+        {0, 2, 4},
+    ]
+
+
+def test_get_dependencies_of_image_inspecting_plugins(workflow: DockerBuildWorkflow):
+    # these plugins inspect images through workflow.imageutil, which reads
+    # the dockerfile_images, they must wait for any update of them
+    inspecting_plugins = [
+        AddHelpPlugin,
+        AddLabelsPlugin,
+        BumpReleasePlugin,
+        KojiParentPlugin,
+        PinOperatorDigestsPlugin,
+        ResolveComposesPlugin,
+    ]
+    plugins_conf = [{"name": UpdateDockerfileImagesPlugin.key}]
+    plugins_conf += [{"name": plugin_class.key} for plugin_class in inspecting_plugins]
+    runner = PluginsRunner(workflow, plugins_conf, plugin_files=[THIS_FILE])
+
+    assert [plugin.plugin_class for plugin in runner.available_plugins[1:]] == inspecting_plugins
+    dependencies = runner.get_dependencies()
+    for plugin_class, plugin_dependencies in zip(inspecting_plugins, dependencies[1:]):
+        assert 0 in plugin_dependencies, plugin_class.key
+
+
+def test_run_plugins_concurrently(workflow: DockerBuildWorkflow):
+    workflow.test_barrier = threading.Barrier(2, timeout=10)
+    plugins_conf = [
+        {"name": WaitForBuildargsPlugin.key},
+        {"name": ReadBuildargsPlugin.key},
+        {"name": WaitForAnnotationsPlugin.key},
+        {"name": PushImagePlugin.key},
+    ]
+    runner = PluginsRunner(workflow, plugins_conf, plugin_files=[THIS_FILE], max_workers=4)
+    runner.run()
+
+    assert runner.plugins_results == {
+        WaitForBuildargsPlugin.key: None,
+        ReadBuildargsPlugin.key: '1',
+        WaitForAnnotationsPlugin.key: 'annotated',
+        PushImagePlugin.key: 'pushed',
+    }
+    for plugin_conf in plugins_conf:
+        assert plugin_conf["name"] in workflow.data.plugins_timestamps
+        assert plugin_conf["name"] in workflow.data.plugins_durations
+    # the plugin waits for the plugins running before it
+    assert (workflow.data.plugins_timestamps[PushImagePlugin.key] >=
+            workflow.data.plugins_timestamps[WaitForAnnotationsPlugin.key])
+
+
+@pytest.mark.parametrize("keep_going", [True, False])
+def test_run_plugins_concurrently_failure(keep_going: bool, workflow: DockerBuildWorkflow):
+    plugins_conf = [
+        {"name": FailAnnotationsPlugin.key},
+        {"name": ReadBuildargsPlugin.key},
+        {"name": PushImagePlugin.key},
+    ]
+    runner = PluginsRunner(workflow, plugins_conf, plugin_files=[THIS_FILE],
+                           keep_going=keep_going, max_workers=2)
+
+    with pytest.raises(PluginFailedException, match="annotations are read-only"):
+        runner.run()
+
+    assert "read-only" in workflow.data.plugins_errors[FailAnnotationsPlugin.key]
+    assert runner.plugins_results[ReadBuildargsPlugin.key] is None
+    # no more plugins are started after a fatal failure
+    assert (PushImagePlugin.key in runner.plugins_results) == keep_going
+
+
+def test_run_plugins_concurrently_interrupted(workflow: DockerBuildWorkflow):
+    workflow.test_barrier = threading.Barrier(2, timeout=10)
+    plugins_conf = [
+        {"name": WaitForBuildargsPlugin.key},
+        {"name": WaitForAnnotationsPlugin.key},
+    ]
+    runner = PluginsRunner(workflow, plugins_conf, plugin_files=[THIS_FILE], max_workers=2)
+    flexmock(plugin_module).should_receive("wait").and_raise(KeyboardInterrupt)
+
+    with pytest.raises(KeyboardInterrupt):
+        runner.run()
+
+    # the running plugins are finished before the interruption is propagated
+    assert workflow.data.buildargs == {'x': '1'}
+    assert runner.plugins_results[WaitForAnnotationsPlugin.key] == 'annotated'
+
+
+def test_run_plugins_with_profiling(workflow: DockerBuildWorkflow):
+    runner = PluginsRunner(
+        workflow,
+        [{"name": CleanupPlugin.key}, {"name": PushImagePlugin.key}],
+        plugin_files=[THIS_FILE],
+        profiling=PLUGINS_PROFILING_RESOURCES,
+    )
+    runner.run()
+
+    profile_dir = workflow.context_dir.plugins_profile_dir
+    for plugin_key in (CleanupPlugin.key, PushImagePlugin.key):
+        assert (profile_dir / f"{plugin_key}.json").exists()
+        assert plugin_key in workflow.data.plugins_durations
@@ -166,7 +166,24 @@ def get_workflow_data_json():
                 "local_filename": "/path/to/dir1/remote-source.tar.gz",
                 "dest_filename": "remote-source.tar.gz",
             },
-        ]
+        ],
+        polling_stats={
+            "odcs": {
+                "polls": 3,
+                "wait_time": 2.0,
+                "wasted_wait_time": 1.0,
+                "latency_histogram": {"1": 0, "5": 1, "+Inf": 0},
+            },
+        },
+        digest_cache_stats={
+            "check_base_image": {
+                "hits": 1,
+                "misses": 1,
+                "expired": 0,
+                "bypassed": 0,
+                "hit_ratio": 0.5,
+            },
+        },
     )
 
     wf_data.image_components = {'x86_64': [{'type': 'rpm', 'name': 'python-docker-py',
@@ -12,6 +12,8 @@ import logging
 import os
 import tempfile
 import tarfile
+import threading
+import time
 from typing import List
 
 import pytest
@@ -39,7 +41,8 @@ from atomic_reactor.util import (figure_out_build_file,
                                  get_checksums, print_version_of_tools,
                                  get_version_of_tools,
                                  human_size, CommandResult,
-                                 registry_hostname, Dockercfg, RegistrySession,
+                                 registry_hostname, Dockercfg, RegistrySession, RegistryClient,
+                                 registry_session_pool,
                                  get_manifest_digests, ManifestDigest,
                                  get_manifest_list, get_all_manifests,
                                  get_inspect_for_image, get_manifest,
@@ -64,7 +67,9 @@ from atomic_reactor.util import (figure_out_build_file,
                                  terminal_key_paths,
                                  map_to_user_params,
                                  create_tar_gz_archive,
-                                 safe_extractall
+                                 safe_extractall,
+                                 PathSuffixMatcher,
+                                 map_concurrently
                                  )
 from tests.constants import MOCK, REACTOR_CONFIG_MAP
 import atomic_reactor.util
@@ -186,6 +191,12 @@ def test_process_substitutions(dct, subst, expected):
       'sha256sum': 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'},
      False),
     (b'abc', ['md5'], {'md5sum': '900150983cd24fb0d6963f7d28e17f72'}, False),
+    (b'abc', ['sha1', 'sha512'],
+     {'sha1sum': 'a9993e364706816aba3e25717850c26c9cd0d89d',
+      'sha512sum': 'ddaf35a193617abacc417349ae20413112e6fa4e89a97ea20a9eeee64b55d39a'
+                   '2192992a274fc1a836ba3c23a3feebbd454d4423643ce80e2a9ac94fa54ca49f'},
+     False),
+    (b'', ['md5'], {'md5sum': 'd41d8cd98f00b204e9800998ecf8427e'}, False),
     (b'abc', [], {}, False),
     (b'abc', [''], {}, True),
     (b'abc', ['invalid'], {}, True),
@@ -209,6 +220,51 @@ def test_get_hexdigests(tmpdir, content, algorithms, expected, write_to_file, sh
         assert checksums == expected
 
 
+def test_get_checksums_file_rewritten_in_place(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'abc')
+    stat = os.stat(path)
+    assert get_checksums(str(path), ['md5']) == {'md5sum': '900150983cd24fb0d6963f7d28e17f72'}
+
+    # same size and modification time, different content
+    path.write_bytes(b'xyz')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert get_checksums(str(path), ['md5']) == {'md5sum': 'd16fb36f0911f878998c136191af705e'}
+
+
+def test_get_checksums_empty_file(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'')
+    # an empty file cannot be memory-mapped
+    flexmock(atomic_reactor.util.mmap).should_receive('mmap').never()
+
+    assert get_checksums(str(path), ['md5', 'sha256']) == {
+        'md5sum': 'd41d8cd98f00b204e9800998ecf8427e',
+        'sha256sum': 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855',
+    }
+
+
+def test_get_checksums_pipe(tmp_path):
+    path = tmp_path / 'pipe'
+    os.mkfifo(path)
+
+    def write():
+        with open(path, 'wb') as f:
+            f.write(b'abc')
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        checksums = get_checksums(str(path), ['md5', 'sha256'])
+    finally:
+        writer.join(10)
+
+    assert checksums == {
+        'md5sum': '900150983cd24fb0d6963f7d28e17f72',
+        'sha256sum': 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad',
+    }
+
+
 @pytest.mark.parametrize('image_type, expected', [
     (IMAGE_TYPE_DOCKER_ARCHIVE, 'docker-image-XXX.x86_64.tar.gz'),
     (IMAGE_TYPE_OCI_TAR, 'oci-image-XXX.x86_64.tar.gz'),
@@ -458,6 +514,55 @@ def test_registry_create_from_config(workflow, registry, reactor_config, matched
     RegistrySession.create_from_config(workflow.conf, registry, access)
 
 
+@responses.activate
+def test_registry_session_pool(tmpdir):
+    with open(os.path.join(str(tmpdir), '.dockercfg'), 'w') as dockerconfig:
+        json.dump({'other.com': {'username': 'john.doe', 'password': 'letmein'}}, dockerconfig)
+    responses.add(responses.GET, 'https://example.com/v2/test/image/manifests/latest', body='ok')
+    responses.add(responses.GET, 'https://other.com/v2/test/image/manifests/latest', body='ok')
+
+    session = registry_session_pool.get_session('example.com')
+    assert registry_session_pool.get_session('example.com') is session
+    assert registry_session_pool.get_session('example.com', insecure=True) is not session
+    assert registry_session_pool.get_session('example.com', access=['pull', 'push']) is \
+        registry_session_pool.get_session('example.com', access=('pull', 'push'))
+    other_session = registry_session_pool.get_session('other.com', dockercfg_path=str(tmpdir))
+
+    session.get('/v2/test/image/manifests/latest')
+    session.get('/v2/test/image/manifests/latest')
+    other_session.get('/v2/test/image/manifests/latest')
+
+    stats = registry_session_pool.stats()
+    assert stats['sessions'] == 4
+    assert stats['hits'] == 2
+    assert stats['misses'] == 4
+    assert stats['registries']['example.com']['sessions'] == 3
+    assert stats['registries']['example.com']['requests'] == 2
+    assert stats['registries']['other.com'] == {
+        'sessions': 1,
+        'requests': 1,
+        'tokens_fetched': 0,
+        'token_cache_hits': 0,
+        'tokens_expired': 0,
+    }
+
+    registry_session_pool.clear()
+    assert registry_session_pool.get_session('example.com') is not session
+
+
+@pytest.mark.parametrize('access', [None, ('pull', 'push')])
+def test_registry_create_from_config_pooled(workflow, access):
+    workflow.conf.conf = {
+        'version': 1,
+        'source_registry': {'url': 'source_registry.com', 'insecure': False},
+    }
+
+    session = RegistrySession.create_from_config(workflow.conf, access=access)
+
+    assert RegistrySession.create_from_config(workflow.conf, access=access) is session
+    assert RegistrySession.create_from_config(workflow.conf, access=['push']) is not session
+
+
 @pytest.mark.parametrize('registry, reactor_config, error', [
     # Registry not specified, no registries in config
     (None,
@@ -813,6 +918,85 @@ def test_get_manifest_digests_missing(tmpdir, has_content_type_header, has_conte
             assert actual_digests.oci_index is True
 
 
+def mock_registry_manifest(url, stored_version, can_convert_v2_v1=False, support_head=True):
+    """Mock a registry storing a single manifest, converting it like docker distribution"""
+    def callback(request):
+        accepted = [media_type.strip() for media_type in request.headers['Accept'].split(',')]
+        version = None
+        if get_manifest_media_type(stored_version) in accepted:
+            version = stored_version
+        elif stored_version == 'v2' and get_manifest_media_type('v1') in accepted:
+            if not can_convert_v2_v1:
+                return (400, {}, json.dumps({"errors": [{"code": "MANIFEST_INVALID"}]}))
+            version = 'v1'
+        if version is None:
+            return (404, {}, json.dumps({"errors": [{"code": "MANIFEST_UNKNOWN"}]}))
+
+        headers = {
+            'Content-Type': get_manifest_media_type(version),
+            'Docker-Content-Digest': f'{version}-digest',
+        }
+        if request.method == 'HEAD':
+            return (200, headers, '')
+        return (200, headers, json.dumps({'mediaType': get_manifest_media_type(version)}))
+
+    responses.add_callback(responses.GET, url, callback=callback)
+    if support_head:
+        responses.add_callback(responses.HEAD, url, callback=callback)
+    else:
+        responses.add(responses.HEAD, url, status=405)
+
+
+@responses.activate
+@pytest.mark.parametrize('versions', [
+    ('v1', 'v2', 'v2_list', 'oci', 'oci_index'),
+    ('v2', 'oci'),
+    ('v1', 'v2'),
+])
+@pytest.mark.parametrize(('stored_version', 'can_convert_v2_v1'), [
+    ('v1', False),
+    ('v2', False),
+    ('v2', True),
+    ('v2_list', False),
+    ('oci', False),
+    ('oci_index', False),
+])
+def test_get_manifest_digests_concurrent(versions, stored_version, can_convert_v2_v1):
+    image = ImageName.parse('example.com/spam:latest')
+    mock_registry_manifest('https://example.com/v2/spam/manifests/latest',
+                           stored_version, can_convert_v2_v1)
+    client = RegistryClient(RegistrySession('https://example.com'))
+
+    try:
+        expected = client.get_manifest_digests(image, versions=versions, require_digest=False)
+    except requests.HTTPError:
+        # not stored in any of the versions
+        with pytest.raises(requests.HTTPError):
+            client.get_manifest_digests(image, versions=versions, concurrent=True)
+        return
+    responses.calls.reset()
+
+    digests = client.get_manifest_digests(image, versions=versions, require_digest=False,
+                                          concurrent=True)
+
+    assert digests == expected
+    assert [call.request.method for call in responses.calls] == ['HEAD'] * len(versions)
+
+
+@responses.activate
+def test_get_manifest_digests_concurrent_without_head():
+    image = ImageName.parse('example.com/spam:latest')
+    mock_registry_manifest('https://example.com/v2/spam/manifests/latest', 'v2',
+                           can_convert_v2_v1=True, support_head=False)
+    client = RegistryClient(RegistrySession('https://example.com'))
+
+    digests = client.get_manifest_digests(image, versions=('v1', 'v2'), concurrent=True)
+
+    assert digests == {'v1': 'v1-digest', 'v2': 'v2-digest'}
+    methods = [call.request.method for call in responses.calls]
+    assert sorted(methods) == ['GET', 'GET', 'HEAD', 'HEAD']
+
+
 @responses.activate
 def test_get_manifest_digests_connection_error(tmpdir):
     # Test that our code to handle falling back from https to http
@@ -1991,3 +2175,82 @@ def test_safe_extractall_exception(tmpdir):
         # Specifically, 'Attempted path traversal in tar file'
         with pytest.raises(tarfile.ExtractError):
             safe_extractall(tar_handle, tmpdir_path)
+
+
+@pytest.mark.parametrize(('path', 'expected'), [
+    ('vendor/foo', True),
+    ('src/vendor/foo', True),
+    ('/src/vendor/foo/', True),
+    ('src/vendor/xfoo', False),
+    ('src/vendor/foo/baz', False),
+    ('foo', False),
+    ('deps/x/bar', True),
+    ('bar', True),
+    ('deps/xbar', False),
+    ('', False),
+])
+def test_path_suffix_matcher(path, expected):
+    matcher = PathSuffixMatcher(['/vendor/foo', 'bar/', 'deps//x/bar', 'vendor/foo'])
+    assert len(matcher) == 3
+    assert matcher.matches(path) == expected
+
+
+def test_path_suffix_matcher_empty():
+    matcher = PathSuffixMatcher()
+    assert len(matcher) == 0
+    assert not matcher.matches('foo')
+
+    with pytest.raises(ValueError, match='empty path'):
+        matcher.add('//')
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_map_concurrently(max_workers):
+    threads = set()
+
+    def double(item):
+        threads.add(threading.get_ident())
+        return item * 2
+
+    results = map_concurrently(double, [1, 2, 3], max_workers)
+
+    assert sorted(results) == [(0, 2), (1, 4), (2, 6)]
+    # no threads are started without concurrency
+    assert (threads == {threading.get_ident()}) == (max_workers == 1)
+
+
+def test_map_concurrently_max_per_key():
+    lock = threading.Lock()
+    running = {'a': 0, 'b': 0}
+    max_running = {'a': 0, 'b': 0}
+
+    def call(item):
+        with lock:
+            running[item] += 1
+            max_running[item] = max(max_running[item], running[item])
+        time.sleep(0.01)
+        with lock:
+            running[item] -= 1
+
+    list(map_concurrently(call, ['a', 'b'] * 5, 10, limit_key=lambda item: item,
+                          max_per_key=2))
+
+    assert max_running == {'a': 2, 'b': 2}
+
+
+def test_map_concurrently_fails_fast():
+    called = []
+
+    def call(item):
+        called.append(item)
+        if item == 0:
+            raise RuntimeError('failed')
+        time.sleep(0.01)
+
+    # all calls share a key, so they run one by one, those waiting when
+    # the failure is noticed are skipped
+    with pytest.raises(RuntimeError, match='failed'):
+        list(map_concurrently(call, range(10), 4, limit_key=lambda item: None))
+
+    assert 0 in called
+    assert len(called) < 10
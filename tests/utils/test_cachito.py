@@ -133,10 +133,13 @@ def test_wait_for_request(burst_params, cachito_request, caplog):
         content_type='application/json',
         callback=handle_wait_for_request)
 
-    response = CachitoAPI(CACHITO_URL).wait_for_request(cachito_request, **burst_params)
+    api = CachitoAPI(CACHITO_URL)
+    response = api.wait_for_request(cachito_request, **burst_params)
     assert response['id'] == CACHITO_REQUEST_ID
     assert response['state'] == expected_final_state
     assert len(responses.calls) == expected_total_responses_calls
+    assert api.polling_stats.polls == expected_total_responses_calls
+    assert sum(api.polling_stats.latency_histogram.values()) == 1
 
     expect_in_logs = dedent(
         """\
@@ -148,6 +151,32 @@ def test_wait_for_request(burst_params, cachito_request, caplog):
     assert re.sub(r'\s+', " ", expect_in_logs) in re.sub(r'\s+', r" ", caplog.text)
 
 
+@responses.activate
+def test_wait_for_request_retry_after():
+    states = ['in_progress', 'complete']
+    updated = datetime.utcnow().isoformat()
+
+    def handle_wait_for_request(http_request):
+        state = states.pop(0)
+        body = json.dumps({'id': CACHITO_REQUEST_ID, 'state': state, 'updated': updated})
+        return (200, {'Retry-After': '5'}, body)
+
+    request_url = '{}/api/v1/requests/{}'.format(CACHITO_URL, CACHITO_REQUEST_ID)
+    responses.add_callback(
+        responses.GET,
+        request_url,
+        content_type='application/json',
+        callback=handle_wait_for_request)
+
+    # Retry-After takes precedence over burst_retry
+    flexmock(time).should_receive('sleep').with_args(5).once()
+
+    api = CachitoAPI(CACHITO_URL)
+    api.wait_for_request(CACHITO_REQUEST_ID, burst_retry=0.01)
+    assert api.polling_stats.wait_time == 5
+    assert api.polling_stats.wasted_wait_time == 5
+
+
 @responses.activate
 @pytest.mark.parametrize('timeout', (0, 60))
 def test_wait_for_request_timeout(timeout, caplog):
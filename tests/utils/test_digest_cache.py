@@ -0,0 +1,138 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import os
+import time
+
+import pytest
+from flexmock import flexmock
+from osbs.utils import ImageName
+
+from atomic_reactor.utils.digest_cache import DigestCache
+
+DIGEST = 'sha256:' + '1' * 64
+
+
+@pytest.mark.parametrize(('image', 'cacheable'), [
+    ('registry.example.com/ns/ubi:8.6', True),
+    ('registry.example.com/ns/ubi:latest', False),
+    ('registry.example.com/ns/ubi', False),
+    ('registry.example.com/ns/ubi:8-nightly', False),
+    ('registry.example.com/ns/ubi@' + DIGEST, False),
+])
+def test_is_cacheable(tmp_path, image, cacheable):
+    cache = DigestCache(tmp_path, ttl=60, floating_tags=['latest', '*-nightly'])
+    assert cache.is_cacheable(ImageName.parse(image)) == cacheable
+
+
+def test_get_put(tmp_path):
+    image = ImageName.parse('registry.example.com/ns/ubi:8.6')
+    cache = DigestCache(tmp_path / 'cache', ttl=60)
+
+    assert cache.get('manifest_list_digest', image) is None
+    cache.put('manifest_list_digest', image, DIGEST)
+    assert cache.get('manifest_list_digest', image) == DIGEST
+    # entries are separated by kind
+    assert cache.get('parent_image', image) is None
+
+    # the cache is shared by builds
+    other_cache = DigestCache(tmp_path / 'cache', ttl=60)
+    assert other_cache.get('manifest_list_digest', image) == DIGEST
+
+    assert cache.stats == {
+        'hits': 1, 'misses': 2, 'expired': 0, 'bypassed': 0, 'hit_ratio': 0.333,
+    }
+    assert [path.name for path in (tmp_path / 'cache').iterdir()
+            if path.name.startswith('.')] == []
+
+
+def test_ttl(tmp_path):
+    now = {'time': 1000.0}
+    flexmock(time).should_receive('time').replace_with(lambda: now['time'])
+
+    image = ImageName.parse('registry.example.com/ns/ubi:8.6')
+    cache = DigestCache(tmp_path, ttl=60)
+    cache.put('manifest_list_digest', image, DIGEST)
+
+    now['time'] += 59
+    assert cache.get('manifest_list_digest', image) == DIGEST
+    now['time'] += 1
+    assert cache.get('manifest_list_digest', image) is None
+    # expired entries are removed
+    assert list(tmp_path.iterdir()) == []
+    assert cache.stats['expired'] == 1
+
+
+def test_prune(tmp_path):
+    cache = DigestCache(tmp_path, ttl=60)
+    old = time.time() - 61
+    for name in ('old.json', '.old.json.tmp', 'fresh.json', 'unrelated'):
+        (tmp_path / name).write_text('{}')
+        if name != 'fresh.json':
+            os.utime(tmp_path / name, (old, old))
+
+    assert cache.prune() == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['fresh.json', 'unrelated']
+
+
+def test_put_prunes(tmp_path):
+    now = {'time': 1000.0}
+    flexmock(time).should_receive('monotonic').replace_with(lambda: now['time'])
+    image = ImageName.parse('registry.example.com/ns/ubi:8.6')
+    cache = DigestCache(tmp_path, ttl=60)
+    (flexmock(cache)
+     .should_receive('prune')
+     .and_return(0)
+     .twice())
+
+    cache.put('manifest_list_digest', image, DIGEST)
+    now['time'] += cache.prune_interval - 1
+    cache.put('parent_image', image, DIGEST)
+    now['time'] += 1
+    cache.put('manifest_list_digest', image, DIGEST)
+
+
+def test_bypass(tmp_path):
+    image = ImageName.parse('registry.example.com/ns/ubi:latest')
+    cache = DigestCache(tmp_path, ttl=60, floating_tags=['latest'])
+
+    cache.put('manifest_list_digest', image, DIGEST)
+    assert cache.get('manifest_list_digest', image) is None
+    assert list(tmp_path.iterdir()) == []
+    assert cache.stats == {
+        'hits': 0, 'misses': 0, 'expired': 0, 'bypassed': 1, 'hit_ratio': 0.0,
+    }
+
+
+def test_corrupted_entry(tmp_path, caplog):
+    image = ImageName.parse('registry.example.com/ns/ubi:8.6')
+    cache = DigestCache(tmp_path, ttl=60)
+    cache.put('manifest_list_digest', image, DIGEST)
+    entry, = tmp_path.iterdir()
+    entry.write_text('{"value": ')
+
+    assert cache.get('manifest_list_digest', image) is None
+    assert 'removing corrupted entry' in caplog.text
+    assert not entry.exists()
+
+
+def test_add_to(tmp_path):
+    digest_cache_stats = {}
+    image = ImageName.parse('registry.example.com/ns/ubi:8.6')
+    cache = DigestCache(tmp_path, ttl=60)
+    cache.put('manifest_list_digest', image, DIGEST)
+    cache.get('manifest_list_digest', image)
+
+    cache.add_to(digest_cache_stats, 'check_base_image')
+    assert digest_cache_stats['check_base_image'] == cache.stats
+
+    cache.get('manifest_list_digest', ImageName.parse('registry.example.com/ns/ubi:9'))
+    cache.add_to(digest_cache_stats, 'check_base_image')
+    assert digest_cache_stats['check_base_image'] == {
+        'hits': 2, 'misses': 1, 'expired': 0, 'bypassed': 0, 'hit_ratio': 0.667,
+    }
@@ -13,6 +13,7 @@ from tests.retry_mock import mock_get_retry_session
 from flexmock import flexmock
 import pytest
 import responses
+import itertools
 import json
 import time
 
@@ -187,6 +188,55 @@ def test_wait_for_compose(odcs_client, final_state_id, final_state_name, expect_
         odcs_client.wait_for_compose(COMPOSE_ID)
 
 
+@responses.activate
+def test_wait_for_composes(odcs_client):
+    compose_ids = [COMPOSE_ID, COMPOSE_ID + 1, COMPOSE_ID + 2]
+    # number of polls each compose needs before it is done
+    polls_needed = {COMPOSE_ID: 3, COMPOSE_ID + 1: 1, COMPOSE_ID + 2: 2}
+    polls = {compose_id: 0 for compose_id in compose_ids}
+
+    def handle_composes_get(request):
+        assert_request_token(request, odcs_client.session)
+        compose_id = int(request.url.rsplit('/', 1)[-1])
+        polls[compose_id] += 1
+        if polls[compose_id] < polls_needed[compose_id]:
+            return (200, {}, compose_json(1, 'generating', compose_id=compose_id))
+        return (200, {}, compose_json(2, 'done', compose_id=compose_id))
+
+    for compose_id in compose_ids:
+        responses.add_callback(responses.GET, '{}composes/{}'.format(ODCS_URL, compose_id),
+                               content_type='application/json',
+                               callback=handle_composes_get)
+
+    # all composes are polled in one loop, so it sleeps only between the rounds
+    (flexmock(time)
+        .should_receive('sleep')
+        .times(2)
+        .and_return(None))
+
+    composes = odcs_client.wait_for_composes(compose_ids)
+
+    assert [compose['id'] for compose in composes] == compose_ids
+    assert all(compose['state_name'] == 'done' for compose in composes)
+    # finished composes are not polled anymore
+    assert polls == polls_needed
+    assert odcs_client.polling_stats.polls == 3
+    assert sum(odcs_client.polling_stats.latency_histogram.values()) == len(compose_ids)
+
+
+@responses.activate
+def test_wait_for_composes_failed(odcs_client):
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, COMPOSE_ID),
+                  body=compose_json(2, 'done'))
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, COMPOSE_ID + 1),
+                  body=compose_json(4, 'failed', compose_id=COMPOSE_ID + 1,
+                                    state_reason='Uh oh!'))
+
+    with pytest.raises(RuntimeError, match='Failed request for compose_id={}: Uh oh!'
+                       .format(COMPOSE_ID + 1)):
+        odcs_client.wait_for_composes([COMPOSE_ID, COMPOSE_ID + 1])
+
+
 @responses.activate
 def test_renew_compose(odcs_client):
     new_compose_id = COMPOSE_ID + 1
@@ -225,3 +275,19 @@ def test_wait_for_compose_timeout(timeout):
     expected_error = r'Timeout of waiting for compose \d+'
     with pytest.raises(WaitComposeToFinishTimeout, match=expected_error):
         odcs_client.wait_for_compose(COMPOSE_ID)
+
+
+@responses.activate
+def test_wait_for_composes_timeout():
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, COMPOSE_ID),
+                  body=compose_json(2, 'done'))
+    responses.add(responses.GET, '{}composes/{}'.format(ODCS_URL, COMPOSE_ID + 1),
+                  body=compose_json(0, 'generating', compose_id=COMPOSE_ID + 1))
+    # every call, logging included, moves the clock past the timeout
+    clock = itertools.count(1000, 100)
+    flexmock(time).should_receive('time').replace_with(lambda: next(clock))
+
+    odcs_client = ODCSClient(ODCS_URL, timeout=20)
+    expected_error = 'Timeout of waiting for compose {}'.format(COMPOSE_ID + 1)
+    with pytest.raises(WaitComposeToFinishTimeout, match=expected_error):
+        odcs_client.wait_for_composes([COMPOSE_ID, COMPOSE_ID + 1])
@@ -0,0 +1,139 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import random
+import time
+from email.utils import formatdate
+
+import pytest
+from flexmock import flexmock
+
+from atomic_reactor.utils.polling import Poller, PollingStats, get_retry_after
+
+
+def make_response(headers=None):
+    return flexmock(headers=headers or {})
+
+
+@pytest.fixture
+def clock():
+    """Fake monotonic clock, advanced by sleeping"""
+    now = {'time': 0.0}
+
+    def sleep(seconds):
+        now['time'] += seconds
+
+    flexmock(time).should_receive('monotonic').replace_with(lambda: now['time'])
+    flexmock(time).should_receive('sleep').replace_with(sleep)
+    return now
+
+
+@pytest.mark.parametrize(('headers', 'expected'), [
+    ({}, None),
+    ({'Retry-After': ''}, None),
+    ({'Retry-After': '7'}, 7),
+    ({'Retry-After': '2.5'}, 2.5),
+    ({'Retry-After': '-3'}, 0),
+    ({'Retry-After': 'soon'}, None),
+    # already passed date
+    ({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}, 0),
+])
+def test_get_retry_after(headers, expected):
+    assert get_retry_after(make_response(headers)) == expected
+
+
+def test_get_retry_after_date():
+    retry_at = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < get_retry_after(make_response({'Retry-After': retry_at})) <= 60
+
+
+def test_poller_backoff(clock):
+    flexmock(random).should_receive('random').and_return(0)
+    poller = Poller(initial_delay=1, burst_length=3, max_delay=10)
+
+    delays = [poller.wait() for _ in range(10)]
+
+    # 1 second delays during the burst, then exponential backoff up to max_delay
+    assert delays == [1, 1, 1, 1, 2, 4, 8, 10, 10, 10]
+    assert poller.polls == 10
+    assert poller.wait_time == sum(delays)
+
+
+def test_poller_jitter(clock):
+    flexmock(random).should_receive('random').and_return(1)
+    poller = Poller(initial_delay=4, burst_length=0, max_delay=10, jitter=0.25)
+
+    # jitter only shortens the delays, so max_delay is respected
+    assert [poller.wait() for _ in range(3)] == [3, 6, 7.5]
+
+
+def test_poller_reset(clock):
+    flexmock(random).should_receive('random').and_return(0)
+    poller = Poller(initial_delay=1, burst_length=0, max_delay=10)
+
+    assert [poller.wait() for _ in range(3)] == [1, 2, 4]
+    poller.reset()
+    assert [poller.wait() for _ in range(2)] == [1, 2]
+
+
+def test_poller_retry_after(clock):
+    poller = Poller(initial_delay=1, max_delay=10)
+
+    delay = poller.wait(make_response(), make_response({'Retry-After': '20'}),
+                        make_response({'Retry-After': '5'}))
+
+    # the longest requested delay is honored, even above max_delay
+    assert delay == 20
+    assert clock['time'] == 20
+
+
+def test_poller_done(clock):
+    stats = PollingStats()
+    poller = Poller(stats, initial_delay=2)
+    poller.wait()
+    poller.wait()
+    poller.done()
+
+    assert stats.as_dict() == {
+        'polls': 3,
+        'wait_time': 4,
+        'wasted_wait_time': 2,
+        'latency_histogram': {
+            '1': 0, '5': 1, '10': 0, '30': 0, '60': 0, '120': 0, '300': 0,
+            '600': 0, '1800': 0, '3600': 0, '+Inf': 0,
+        },
+    }
+
+    poller = Poller(stats)
+    poller.done([0.5, 7, 4000])
+
+    assert stats.polls == 4
+    assert stats.latency_histogram['1'] == 1
+    assert stats.latency_histogram['5'] == 1
+    assert stats.latency_histogram['10'] == 1
+    assert stats.latency_histogram['+Inf'] == 1
+
+
+def test_polling_stats_add_to():
+    polling_stats = {}
+
+    stats = PollingStats()
+    stats.polls = 2
+    stats.wait_time = 1.5
+    stats.wasted_wait_time = 0.5
+    stats.observe_latency(3)
+
+    stats.add_to(polling_stats, 'odcs')
+    stats.add_to(polling_stats, 'odcs')
+    stats.add_to(polling_stats, 'cachito')
+
+    assert polling_stats['cachito'] == stats.as_dict()
+    assert polling_stats['odcs']['polls'] == 4
+    assert polling_stats['odcs']['wait_time'] == 3
+    assert polling_stats['odcs']['wasted_wait_time'] == 1
+    assert polling_stats['odcs']['latency_histogram']['5'] == 2
@@ -0,0 +1,111 @@
+"""
+Copyright (c) 2026 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+
+import json
+import pstats
+import subprocess
+from contextlib import contextmanager
+
+import pytest
+import requests
+import responses
+from flexmock import flexmock
+
+from atomic_reactor.constants import PLUGINS_PROFILING_CPROFILE, PLUGINS_PROFILING_RESOURCES
+from atomic_reactor.utils import profiling
+from atomic_reactor.utils.profiling import PluginsProfiler
+
+PROFILE_KEYS = {
+    'wall_time', 'cpu_time', 'thread_cpu_time', 'subprocess_cpu_time',
+    'network_requests', 'subprocesses', 'peak_rss', 'peak_rss_since_start',
+}
+
+
+@responses.activate
+def test_profile(tmp_path):
+    responses.add(responses.GET, 'https://example.com/', body='ok')
+    profiler = PluginsProfiler(PLUGINS_PROFILING_RESOURCES, tmp_path / 'profile')
+
+    with profiler.profile('some_plugin'):
+        requests.get('https://example.com/')
+        requests.Session().get('https://example.com/')
+        subprocess.run(['true'], check=True)
+
+    profile = profiler.profiles['some_plugin']
+    assert PROFILE_KEYS <= set(profile)
+    assert profile['network_requests'] == 2
+    assert profile['subprocesses'] == 1
+    assert profile['wall_time'] >= 0
+    assert profile['peak_rss'] > 0
+
+    with open(tmp_path / 'profile' / 'some_plugin.json') as f:
+        assert json.load(f) == profile
+    assert not (tmp_path / 'profile' / 'some_plugin.pstats').exists()
+
+
+def test_profile_restores_patched_functions(tmp_path):
+    send = requests.Session.send
+    popen_init = subprocess.Popen.__init__
+    profiler = PluginsProfiler(PLUGINS_PROFILING_RESOURCES, tmp_path)
+
+    with profiler.profile('some_plugin'):
+        with profiler.profile('other_plugin'):
+            assert requests.Session.send is not send
+        # still counting for the plugin running concurrently
+        assert requests.Session.send is not send
+        subprocess.run(['true'], check=True)
+
+    assert requests.Session.send is send
+    assert subprocess.Popen.__init__ is popen_init
+    assert profiler.profiles['some_plugin']['subprocesses'] == 1
+    assert profiler.profiles['other_plugin']['subprocesses'] == 0
+
+
+def test_profile_cprofile(tmp_path):
+    profiler = PluginsProfiler(PLUGINS_PROFILING_CPROFILE, tmp_path)
+
+    with profiler.profile('some_plugin'):
+        sorted(range(1000))
+
+    stats = pstats.Stats(str(tmp_path / 'some_plugin.pstats'))
+    assert any(function == "<built-in method builtins.sorted>"
+               for _, _, function in stats.stats)
+    assert (tmp_path / 'some_plugin.json').exists()
+
+
+def test_profile_failed_plugin(tmp_path):
+    profiler = PluginsProfiler(PLUGINS_PROFILING_CPROFILE, tmp_path)
+
+    with pytest.raises(ValueError, match='oops'):
+        with profiler.profile('some_plugin'):
+            raise ValueError('oops')
+
+    assert 'some_plugin' in profiler.profiles
+    assert (tmp_path / 'some_plugin.json').exists()
+    assert (tmp_path / 'some_plugin.pstats').exists()
+
+
+def test_profile_span_attributes(tmp_path):
+    attributes = {}
+    span = flexmock(set_attribute=attributes.__setitem__)
+
+    @contextmanager
+    def start_as_current_span(name, context=None):
+        assert name == 'plugin_some_plugin'
+        yield span
+
+    flexmock(profiling.tracer).should_receive('start_as_current_span').replace_with(
+        start_as_current_span
+    )
+    profiler = PluginsProfiler(PLUGINS_PROFILING_RESOURCES, tmp_path)
+
+    with profiler.profile('some_plugin'):
+        pass
+
+    assert attributes == profiler.profiles['some_plugin']
+    assert PROFILE_KEYS <= set(attributes)
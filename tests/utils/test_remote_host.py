@@ -28,18 +28,27 @@ def _do_nothing_decorator(func):
 flexmock(backoff).should_receive("on_exception").and_return(_do_nothing_decorator)
 
 
+from atomic_reactor.utils import remote_host  # noqa
 from atomic_reactor.utils.remote_host import (  # noqa
-    SSHRetrySession, RemoteHost, RemoteHostsPool
+    SSHRetrySession, RemoteHost, RemoteHostsPool, HostLoad, SlotLockError, SlotReadError,
+    ssh_connection_pool
 )
 
 
 SOCKET_PATH = "/run/user/2022/podman/podman.sock"
+LOAD_OUTPUT = """\
+2.00 1.50 1.00 2/345 6789
+8
+Filesystem     1024-blocks      Used Available Capacity Mounted on
+/dev/vda1        100000000  25000000  75000000      25% /
+"""
 
 
 @pytest.fixture(autouse=True)
 def _mock_ssh_session(request):
     """ Mock the ssh session with things we don't want to test or change """
     flexmock(time).should_receive('sleep')
+    ssh_connection_pool.clear()
 
     if "disable_autouse" in request.keywords:
         yield
@@ -67,6 +76,21 @@ def make_ssh_result(
     return None, out, err
 
 
+def is_read_slots_command(cmd: str, slots_dir: str = "/home/builder/osbs_slots") -> bool:
+    return cmd.startswith(f"cd {slots_dir} && for i in ")
+
+
+def is_lock_free_slot_command(cmd: str, slots_dir: str = "/home/builder/osbs_slots") -> bool:
+    return cmd.startswith(f"cd {slots_dir} || exit 1; for i in ")
+
+
+def make_read_slots_result(*contents: str) -> Tuple[None, Mock, Mock]:
+    """ Produce a fake result of reading all the slots, with the slot contents in order """
+    output = "".join(f"\n--- slot {slot_id}\n{content}"
+                     for slot_id, content in enumerate(contents))
+    return make_ssh_result(stdout=output.strip())
+
+
 def make_flock_ssh_result(
     stdout: str = "",
     stderr: str = "",
@@ -85,6 +109,7 @@ def make_flock_ssh_result(
 
     chan = flexmock()
     chan.should_receive("recv_exit_status").and_return(code)
+    chan.should_receive("close")
     out = flexmock(channel=chan)
     out.should_receive("read.decode.strip").and_return(stdout)
     out.should_receive("readline").and_return(stdout)
@@ -413,6 +438,9 @@ def test_pool_lock_resource(slot_content, expected_log, expected_result, failure
          .should_receive('available_slots')
          .and_raise(Exception))
     elif failure == 'lock':
+        (flexmock(RemoteHost)
+         .should_receive('lock_free_slot')
+         .and_raise(Exception))
         (flexmock(RemoteHost)
          .should_receive('lock')
          .and_raise(Exception))
@@ -421,21 +449,15 @@ def test_pool_lock_resource(slot_content, expected_log, expected_result, failure
         if cmd == "mkdir -p /var/tmp/osbs_slots":
             return make_ssh_result()
 
-        read_patt = re.compile(
-            r"touch /var/tmp/osbs_slots/slot_.* && cat /var/tmp/osbs_slots/slot_.*"
-        )
-        if read_patt.match(cmd):
-            return make_ssh_result(stdout=slot_content)
+        if is_read_slots_command(cmd, "/var/tmp/osbs_slots"):
+            return make_read_slots_result(slot_content, slot_content, slot_content)
 
-        flock_patt = re.compile(
-            r"flock --conflict-exit-code 42 --nonblocking /var/tmp/osbs_slots/slot_.*.lock cat"
-        )
-        if flock_patt.match(cmd):
-            return make_flock_ssh_result(stdout="verify lock")
+        if is_lock_free_slot_command(cmd, "/var/tmp/osbs_slots"):
+            assert "echo pr123@" in cmd
+            return make_ssh_result(stdout="busy 1\nlocked 2")
 
-        write_patt = re.compile(r"echo pr123@.*> /var/tmp/osbs_slots/slot_.*")
-        if write_patt.match(cmd):
-            return make_ssh_result()
+        if cmd == "cat /proc/loadavg; nproc; df -Pk /var/tmp/osbs_slots":
+            return make_ssh_result(stdout=LOAD_OUTPUT)
 
         assert False, f"Unexpected command: {cmd}"
 
@@ -454,10 +476,132 @@ def test_pool_lock_resource(slot_content, expected_log, expected_result, failure
     if failure == 'slot':
         assert 'unable to get available slots:' in caplog.text
     elif failure == 'lock':
+        assert 'remote-host-001: unable to lock a slot for pipelinerun pr123:' in caplog.text
         assert 'remote-host-001: unable to lock slot 0 for pipelinerun pr123:' in caplog.text
         assert 'remote-host-001: unable to lock slot 1 for pipelinerun pr123:' in caplog.text
         assert 'remote-host-001: unable to lock slot 2 for pipelinerun pr123:' in caplog.text
 
+    stats = pool.stats.as_dict()
+    assert stats['lock_rounds'] == 1
+    assert stats['probes'] == 1
+    assert stats['probe_failures'] == (1 if failure == 'slot' else 0)
+    if failure == 'lock':
+        # the slots are locked one by one when they cannot be locked at once
+        assert stats['lock_attempts'] == 4
+        assert stats['contention_retries'] == 3
+    else:
+        assert stats['lock_attempts'] == (1 if expected_result else 0)
+    assert stats['locked_host'] == ('remote-host-001' if expected_result else '')
+
+
+@pytest.mark.parametrize(("output", "load_per_cpu", "disk_free_ratio"), (
+    (LOAD_OUTPUT, 0.25, 0.75),
+    ("2.00 1.50 1.00 2/345 6789\n8\n", 0.25, None),
+    ("df: /var/tmp/osbs_slots: No such file or directory", None, None),
+    ("", None, None),
+))
+def test_host_load_from_string(output, load_per_cpu, disk_free_ratio):
+    load = HostLoad.from_string(output)
+    assert load.load_per_cpu == load_per_cpu
+    assert load.disk_free_ratio == disk_free_ratio
+
+
+def test_host_probe():
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=2, socket_path=SOCKET_PATH)
+
+    def mocked_command(cmd, *args, **kwargs):
+        if is_read_slots_command(cmd):
+            return make_read_slots_result("pr123@2022-02-15T10:22:33.234234", "")
+
+        if cmd == "cat /proc/loadavg; nproc; df -Pk /home/builder/osbs_slots":
+            return make_ssh_result(stdout=LOAD_OUTPUT)
+
+        assert False, f"Unexpected command: {cmd}"
+
+    flexmock(SSHRetrySession).should_receive("exec_command").replace_with(mocked_command)
+    # slots and load are read over a single connection
+    flexmock(SSHRetrySession).should_receive("connect").once()
+
+    available_slots, load = host.probe()
+    assert available_slots == [1]
+    assert load.load_per_cpu == 0.25
+    assert load.disk_free_ratio == 0.75
+
+
+@pytest.mark.parametrize(("available_slots", "load", "expected_score"), (
+    ([0, 1], HostLoad(), 0.5),
+    ([0, 1], HostLoad(load_per_cpu=0.5), 0.375),
+    ([0, 1], HostLoad(load_per_cpu=3), 0.25),
+    ([0, 1], HostLoad(disk_free_ratio=0.5), 0.375),
+    ([0, 1, 2, 3], HostLoad(load_per_cpu=1, disk_free_ratio=0), 0.25),
+))
+def test_pool_score(available_slots, load, expected_score):
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=4, socket_path=SOCKET_PATH)
+    assert RemoteHostsPool.score(host, available_slots, load) == expected_score
+
+
+@pytest.mark.parametrize("probe_workers", (1, 3))
+def test_pool_lock_resource_by_score(probe_workers):
+    hosts = {
+        hostname: RemoteHost(hostname=hostname, username="builder",
+                             ssh_keyfile="/path/to/key", slots=2, socket_path=SOCKET_PATH)
+        for hostname in ("busy-host", "idle-host", "full-host")
+    }
+    probes = {
+        "busy-host": ([0, 1], HostLoad(load_per_cpu=1, disk_free_ratio=0.1)),
+        "idle-host": ([1], HostLoad(load_per_cpu=0, disk_free_ratio=1)),
+        "full-host": ([], HostLoad()),
+    }
+    locks = []
+
+    def mock_host(hostname):
+        def lock_free_slot(prid, slot_ids):
+            slot_ids = list(slot_ids)
+            locks.append((hostname, slot_ids))
+            # the slot of idle-host was taken by another pipelinerun since the probe
+            return (None if hostname == "idle-host" else slot_ids[0]), [], []
+
+        flexmock(hosts[hostname]).should_receive("probe").and_return(probes[hostname])
+        flexmock(hosts[hostname]).should_receive("lock_free_slot").replace_with(lock_free_slot)
+        flexmock(hosts[hostname]).should_receive("lock").never()
+
+    flexmock(RemoteHost).should_receive("is_operational").and_return(True)
+    for hostname in hosts:
+        mock_host(hostname)
+
+    pool = RemoteHostsPool(list(hosts.values()), "x86_64", probe_workers=probe_workers)
+    resource = pool.lock_resource("pr123")
+
+    assert resource.host is hosts["busy-host"]
+    assert locks[0] == ("idle-host", [1])
+    assert locks[1][0] == "busy-host"
+    assert resource.slot == locks[1][1][0]
+
+    stats = pool.stats.as_dict()
+    assert stats['probes'] == 3
+    assert stats['probe_failures'] == 0
+    assert stats['lock_attempts'] == 2
+    assert stats['contention_retries'] == 1
+    assert stats['locked_host'] == "busy-host"
+
+
+def test_pool_from_config_probe_workers():
+    config = {
+        "slots_dir": "/var/tmp/osbs_slots",
+        "probe_workers": 4,
+        "pools": {"x86_64": {}},
+    }
+    config["pools"]["x86_64"]["remote-host-001"] = {
+        "enabled": True, "auth": "/path/to/key", "username": "builder", "slots": 3,
+        "socket_path": SOCKET_PATH,
+    }
+    assert RemoteHostsPool.from_config(config, "x86_64").probe_workers == 4
+
+    del config["probe_workers"]
+    assert RemoteHostsPool.from_config(config, "x86_64").probe_workers == 1
+
 
 @pytest.mark.parametrize(("slot0", "slot1", "slot2", "available", "occupied"), (
     ("", "", "", {0, 1, 2}, set()),
@@ -471,14 +615,8 @@ def test_available_and_occupied_slots(caplog, slot0, slot1, slot2, available, oc
                       ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
 
     def mocked_command(cmd, *args, **kwargs):
-        if cmd == "touch /home/builder/osbs_slots/slot_0 && cat /home/builder/osbs_slots/slot_0":
-            return make_ssh_result(stdout=slot0)
-
-        if cmd == "touch /home/builder/osbs_slots/slot_1 && cat /home/builder/osbs_slots/slot_1":
-            return make_ssh_result(stdout=slot1)
-
-        if cmd == "touch /home/builder/osbs_slots/slot_2 && cat /home/builder/osbs_slots/slot_2":
-            return make_ssh_result(stdout=slot2)
+        if is_read_slots_command(cmd):
+            return make_read_slots_result(slot0, slot1, slot2)
 
         assert False, f"Unexpected command: {cmd}"
 
@@ -525,3 +663,260 @@ def test_prid_in_slot(caplog, slot0, slot1, slot2, prid0, prid1, prid2):
     assert host.prid_in_slot(0) == prid0
     assert host.prid_in_slot(1) == prid1
     assert host.prid_in_slot(2) == prid2
+
+
+def make_transport(active=True):
+    transport = flexmock(is_active=lambda: active)
+    transport.should_receive("set_keepalive").with_args(remote_host.SSH_KEEPALIVE_INTERVAL)
+    transport.should_receive("send_ignore")
+    return transport
+
+
+def test_ssh_connection_pool_reuses_connections():
+    transport = make_transport()
+    flexmock(SSHRetrySession).should_receive("get_transport").and_return(transport)
+    flexmock(SSHRetrySession).should_receive("connect").once()
+
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+
+    def mocked_command(cmd, *args, **kwargs):
+        if cmd.startswith("touch /home/builder/osbs_slots/slot_"):
+            return make_ssh_result()
+        if is_read_slots_command(cmd):
+            return make_read_slots_result("", "", "")
+        if cmd == ("flock --conflict-exit-code 42 --nonblocking "
+                   "/home/builder/osbs_slots/slot_0.lock cat"):
+            return make_flock_ssh_result(stdout="verify lock")
+        if cmd.startswith("echo pr123@"):
+            return make_ssh_result()
+        if cmd == "mkdir -p /home/builder/osbs_slots":
+            return make_ssh_result()
+        assert False, f"Unexpected command: {cmd}"
+
+    flexmock(SSHRetrySession).should_receive("exec_command").replace_with(mocked_command)
+    flexmock(SSHRetrySession).should_receive("close").never()
+
+    assert host.is_operational
+    assert host.available_slots() == [0, 1, 2]
+    assert host.lock(0, "pr123")
+    assert host.prid_in_slot(1) is None
+
+    assert ssh_connection_pool.stats() == {
+        'connections': 1, 'hits': 3, 'misses': 1, 'reconnects': 0,
+    }
+
+
+def test_ssh_connection_pool_health_check():
+    healthy = make_transport()
+    broken = make_transport(active=False)
+    clock = {'now': 0}
+    flexmock(time).should_receive("monotonic").replace_with(lambda: clock['now'])
+    # the transport of the first connection breaks after it is connected
+    transports = iter([broken, broken])
+    (
+        flexmock(SSHRetrySession)
+        .should_receive("get_transport")
+        .replace_with(lambda: next(transports, healthy))
+    )
+    flexmock(SSHRetrySession).should_receive("connect").twice()
+    flexmock(SSHRetrySession).should_receive("close").once()
+
+    first = ssh_connection_pool.get_connection("remote-host-001", "builder", "/path/to/key")
+    second = ssh_connection_pool.get_connection("remote-host-001", "builder", "/path/to/key")
+    assert second is not first
+
+    # idle connections are checked before they are reused
+    healthy.should_receive("send_ignore").once()
+    clock['now'] += remote_host.SSH_HEALTH_CHECK_INTERVAL + 1
+    assert ssh_connection_pool.get_connection(
+        "remote-host-001", "builder", "/path/to/key"
+    ) is second
+
+    assert ssh_connection_pool.stats() == {
+        'connections': 1, 'hits': 1, 'misses': 2, 'reconnects': 1,
+    }
+
+
+def test_ssh_connection_pool_discards_failed_connections():
+    flexmock(SSHRetrySession).should_receive("get_transport").and_return(make_transport())
+    flexmock(SSHRetrySession).should_receive("connect").twice()
+
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    (
+        flexmock(SSHRetrySession)
+        .should_receive("exec_command")
+        .and_raise(remote_host.paramiko.ssh_exception.SSHException("connection reset"))
+        .and_return(make_ssh_result())
+    )
+
+    assert not host.is_operational
+    assert host.is_operational
+    assert ssh_connection_pool.stats()['misses'] == 2
+
+
+def test_read_slots():
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    commands = []
+
+    def mocked_command(cmd, *args, **kwargs):
+        commands.append(cmd)
+        # content without a trailing newline and corrupted multi-line content
+        return make_ssh_result(stdout=("--- slot 0\n"
+                                       "pr123@2022-02-15T10:22:33.234234\n"
+                                       "--- slot 1\n"
+                                       "--- slot 2\n"
+                                       "corrupted\ncontent"))
+
+    flexmock(SSHRetrySession).should_receive("exec_command").replace_with(mocked_command)
+
+    slots = host.read_slots()
+    assert len(commands) == 1
+    assert is_read_slots_command(commands[0])
+    assert "for i in 0 1 2;" in commands[0]
+
+    assert sorted(slots) == [0, 1, 2]
+    assert slots[0].prid == "pr123"
+    assert slots[0].is_valid
+    assert slots[1].is_empty
+    assert not slots[2].is_valid
+    assert host.available_slots() == [1, 2]
+
+
+@pytest.mark.parametrize(("stdout", "stderr", "code", "error"), (
+    ("", "cd: /home/builder/osbs_slots: No such file or directory", 1,
+     "cannot read content of slots: cd: /home/builder/osbs_slots"),
+    ("--- slot 0\n--- slot 1", "", 0, "cannot read content of slots: unexpected output"),
+))
+def test_read_slots_fails(stdout, stderr, code, error):
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    (
+        flexmock(SSHRetrySession)
+        .should_receive("exec_command")
+        .and_return(make_ssh_result(stdout, stderr, code))
+    )
+
+    with pytest.raises(SlotReadError, match=error):
+        host.read_slots()
+
+
+@pytest.mark.parametrize(("stdout", "expected_slot", "expected_busy", "expected_invalid"), (
+    ("locked 2", 2, [], []),
+    ("busy 2\nused 0 pr124@2022-02-15T10:22:33.234234\nlocked 1", 1, [2], []),
+    ("used 2 corrupted content \nbusy 0\nused 1 pr124@2022-02-15T10:22:33.234234",
+     None, [0], [2]),
+    ("", None, [], []),
+))
+def test_lock_free_slot(stdout, expected_slot, expected_busy, expected_invalid):
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+
+    def mocked_command(cmd, *args, **kwargs):
+        assert is_lock_free_slot_command(cmd)
+        assert "for i in 2 0 1;" in cmd
+        assert re.search(r"echo pr123@\S+ > slot_\$i", cmd)
+        return make_ssh_result(stdout=stdout)
+
+    flexmock(SSHRetrySession).should_receive("exec_command").replace_with(mocked_command).once()
+
+    # invalid slot IDs are skipped
+    assert host.lock_free_slot("pr123", [2, 0, 3, 1]) == (
+        expected_slot, expected_busy, expected_invalid
+    )
+
+
+def test_lock_free_slot_fails():
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    (
+        flexmock(SSHRetrySession)
+        .should_receive("exec_command")
+        .and_return(make_ssh_result(stderr="permission denied", code=1))
+    )
+
+    with pytest.raises(SlotLockError, match="failed to lock a slot for pipelinerun pr123: "
+                                            "permission denied"):
+        host.lock_free_slot("pr123", [0, 1])
+
+    assert host.lock_free_slot("pr123", [3]) == (None, [], [])
+
+
+@pytest.mark.parametrize(("available_slots", "contention_retries"), (
+    # slot 1 got taken since the probe
+    ([1, 2], 1),
+    ([2], 0),
+))
+def test_pool_lock_resource_invalid_slots(available_slots, contention_retries):
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    flexmock(host).should_receive("is_operational").and_return(True)
+    flexmock(host).should_receive("probe").and_return((available_slots, HostLoad()))
+    # slot 2 has invalid content
+    flexmock(host).should_receive("lock_free_slot").and_return((None, [], [2])).once()
+    flexmock(host).should_receive("lock").with_args(2, "pr123").and_return(True).once()
+
+    pool = RemoteHostsPool([host], "x86_64")
+    resource = pool.lock_resource("pr123")
+
+    assert resource.slot == 2
+    assert pool.stats.lock_attempts == 2
+    assert pool.stats.contention_retries == contention_retries
+
+
+def test_pool_lock_resource_busy_slots():
+    host = RemoteHost(hostname="remote-host-001", username="builder",
+                      ssh_keyfile="/path/to/key", slots=3, socket_path=SOCKET_PATH)
+    flexmock(host).should_receive("is_operational").and_return(True)
+    flexmock(host).should_receive("probe").and_return(([0, 1, 2], HostLoad()))
+    # the flock of slots 0 and 1 was held by others, slot 2 is used
+    flexmock(host).should_receive("lock_free_slot").and_return((None, [0, 1], [])).once()
+    # lock() waits for the flock, slot 0 got used meanwhile, slot 1 got released
+    flexmock(host).should_receive("lock").with_args(0, "pr123").and_return(False).once()
+    flexmock(host).should_receive("lock").with_args(1, "pr123").and_return(True).once()
+
+    pool = RemoteHostsPool([host], "x86_64")
+    resource = pool.lock_resource("pr123")
+
+    assert resource.slot == 1
+    assert pool.stats.lock_attempts == 3
+    assert pool.stats.contention_retries == 2
+
+
+@pytest.mark.disable_autouse
+def test_pool_lock_resource_round_trips():
+    hosts_config = {
+        "slots_dir": "/var/tmp/osbs_slots",
+        "pools": {
+            "x86_64": {
+                "remote-host-001": {
+                    "enabled": True,
+                    "auth": "/path/to/key",
+                    "username": "builder",
+                    "slots": 10,
+                    "socket_path": SOCKET_PATH,
+                }
+            }
+        }
+    }
+    commands = []
+
+    def mocked_command(cmd, *args, **kwargs):
+        commands.append(cmd)
+        if is_read_slots_command(cmd, "/var/tmp/osbs_slots"):
+            return make_read_slots_result(*[""] * 10)
+        if is_lock_free_slot_command(cmd, "/var/tmp/osbs_slots"):
+            return make_ssh_result(stdout="locked 7")
+        return make_ssh_result(stdout=LOAD_OUTPUT)
+
+    flexmock(SSHRetrySession).should_receive("connect")
+    flexmock(SSHRetrySession).should_receive("exec_command").replace_with(mocked_command)
+
+    pool = RemoteHostsPool.from_config(hosts_config, platform="x86_64")
+    resource = pool.lock_resource("pr123")
+
+    assert resource.slot == 7
+    # mkdir, read all slots, host load and lock, regardless of the number of slots
+    assert len(commands) == 4